@@ -0,0 +1,277 @@
+import os
+import re
+import copy
+import logging
+
+import numpy as np
+
+from .bf2types import COLTYPE, D3DDECLTYPE, D3DDECLUSAGE
+from .visiblemesh import VisibleMesh, _bf2geom
+from .collisionmesh import CollisionMesh, rotation_matrix
+from .collisionmesh import _bf2colgeom, _bf2colsubgeom, _bf2collod
+
+# bakes many placed static objects into single mesh to cut draw calls and objects count
+#   placements = [('objects/.../24m_1.staticmesh', (491.567, 24.653, 495.454), (0.2, 0.0, 0.0)), ...]
+#   center = bake.bake_files(placements, 'objects/.../24m_1_merge/meshes/24m_1_merge.staticmesh')
+# instances of same mesh are transformed at once with stacked matrices, materials with same
+# shader and textures are batched together, new material started when 16bit indices overflow.
+# meshes with fewer geoms or lods give their last geom or lod to missing ones.
+
+MAX_VERTICES = 0xffff + 1  # indices are unsigned shorts, local to material or collision lod
+ROTATED_USAGES = [D3DDECLUSAGE.NORMAL, D3DDECLUSAGE.TANGENT, D3DDECLUSAGE.BINORMAL]
+
+PATTERN_CREATE = re.compile(r'^\s*Object\.create\s+(\S+)', re.IGNORECASE)
+PATTERN_VECTOR = re.compile(r'^\s*Object\.(absolutePosition|rotation)\s+(\S+)', re.IGNORECASE)
+
+def read_placements(filename):
+    '''
+    (template name, position, rotation) of every object created in staticobjects.con like file
+    '''
+    placements = []
+    with open(filename) as fo:
+        for line in fo:
+            match = PATTERN_CREATE.match(line)
+            if match:
+                placements.append([match.group(1), (0.0, 0.0, 0.0), (0.0, 0.0, 0.0)])
+                continue
+            match = PATTERN_VECTOR.match(line)
+            if match and placements:
+                vector = tuple(float(value) for value in match.group(2).split('/'))
+                placements[-1][1 if match.group(1).lower() == 'absoluteposition' else 2] = vector
+    logging.debug('read %d placements from %s' % (len(placements), filename))
+    return [tuple(placement) for placement in placements]
+
+def transform_vertices(vmesh, vertices, matrices, offsets):
+    '''
+    (instances, vertnum, vertex_size) copies of vertices array, positions rotated and moved,
+    normals and tangents rotated by every of (instances, 3, 3) matrices
+    '''
+    matrices = np.asarray(matrices, dtype=np.float64)
+    transformed = np.repeat(vertices[None], len(matrices), axis=0)
+    for usage in [D3DDECLUSAGE.POSITION] + ROTATED_USAGES:
+        attrib = vmesh.get_attribute(usage)
+        if attrib is None or len(D3DDECLTYPE(attrib.vartype)) != 3: continue
+        start = int(attrib.offset / vmesh.vertformat)
+        columns = np.einsum('nij,vj->nvi', matrices, vertices[:, start:start + 3].astype(np.float64))
+        if usage == D3DDECLUSAGE.POSITION: columns += np.asarray(offsets, dtype=np.float64)[:, None, :]
+        transformed[:, :, start:start + 3] = columns
+    return transformed
+
+def _material_key(material):
+    return (material.alphamode, material.fxfile, material.technique, tuple(material.maps))
+
+def _instances(placements, meshes):
+    # transformed vertices of every placement, instances of same mesh transformed together
+    groups = {}
+    for placementId, (filename, position, rotation) in enumerate(placements):
+        groups.setdefault(filename, []).append(placementId)
+    instances = [None] * len(placements)
+    for filename, placementIds in groups.items():
+        mesh = meshes[filename]
+        matrices = np.array([rotation_matrix(placements[placementId][2]) for placementId in placementIds])
+        offsets = np.array([placements[placementId][1] for placementId in placementIds], dtype=np.float64)
+        if isinstance(mesh, VisibleMesh):
+            transformed = transform_vertices(mesh, mesh.get_vertices_array(), matrices, offsets)
+            for placementId, vertices in zip(placementIds, transformed):
+                instances[placementId] = vertices
+        else:
+            for placementId, matrix, offset in zip(placementIds, matrices, offsets):
+                instances[placementId] = [[lod.vertices.astype(np.float64) @ matrix.T + offset for lod in subgeom.lods]
+                                          for geom in mesh.geoms for subgeom in geom.subgeoms]
+    return instances
+
+def _source_lod(mesh, geomId, lodId):
+    # missing geoms and lods taken from last ones
+    geom = mesh.geoms[min(geomId, len(mesh.geoms) - 1)]
+    return geom.lods[min(lodId, len(geom.lods) - 1)]
+
+def _skeleton(meshes):
+    # geoms and lods of all meshes, every lod copied from first mesh having it
+    geoms = []
+    for geomId in range(max(len(mesh.geoms) for mesh in meshes)):
+        geom = _bf2geom()
+        for lodId in range(max(len(mesh.geoms[min(geomId, len(mesh.geoms) - 1)].lods) for mesh in meshes)):
+            exact = [mesh for mesh in meshes if geomId < len(mesh.geoms) and lodId < len(mesh.geoms[geomId].lods)]
+            lod = copy.deepcopy(_source_lod(exact[0] if exact else meshes[0], geomId, lodId))
+            lod.materials, lod.sample = [], None
+            geom.lods.append(lod)
+        geom.lodnum = len(geom.lods)
+        geoms.append(geom)
+    return geoms
+
+def bake_visible(placements, meshes, max_vertices=MAX_VERTICES):
+    '''
+    Single VisibleMesh from (filename, position, rotation) placements of loaded meshes
+    '''
+    template = meshes[placements[0][0]]
+    layout = [(attrib.flag, attrib.offset, attrib.vartype, attrib.usage) for attrib in template.vertex_attributes]
+    for filename, _, _ in placements:
+        if [(attrib.flag, attrib.offset, attrib.vartype, attrib.usage) for attrib in meshes[filename].vertex_attributes] != layout:
+            raise AttributeError('%s vertex layout differs from %s' % (filename, template.filename))
+    instances = _instances(placements, meshes)
+    indices = {filename: np.array(meshes[filename].index, dtype=np.int64) for filename in meshes}
+
+    baked = VisibleMesh(isSkinnedMesh=template.isSkinnedMesh, isBundledMesh=template.isBundledMesh, isStaticMesh=template.isStaticMesh)
+    baked.head = copy.deepcopy(template.head)
+    baked.u1 = template.u1
+    baked.u2 = template.u2
+    baked.vertattribnum = template.vertattribnum
+    baked.vertex_attributes = copy.deepcopy(template.vertex_attributes)
+    baked.vertformat = template.vertformat
+    baked.vertstride = template.vertstride
+    baked.geoms = _skeleton([meshes[filename] for filename, _, _ in placements])
+    baked.geomnum = len(baked.geoms)
+    vertices, index = [], []
+    vstart = istart = 0
+    for geomId, geom in enumerate(baked.geoms):
+        for lodId, lod in enumerate(geom.lods):
+            # chunks of every material key, each chunk is [material, vertices list, faces list, vnum]
+            chunks = {}
+            order = []
+            for (filename, _, _), instance in zip(placements, instances):
+                for material in _source_lod(meshes[filename], geomId, lodId).materials:
+                    if material.vnum > max_vertices:
+                        raise OverflowError('%s material has %d vertices' % (filename, material.vnum))
+                    key = _material_key(material)
+                    if key not in chunks or chunks[key][-1][3] + material.vnum > max_vertices:
+                        chunks.setdefault(key, []).append([material, [], [], 0])
+                        order.append((key, len(chunks[key]) - 1))
+                    chunk = chunks[key][-1]
+                    chunk[1].append(instance[material.vstart:material.vstart + material.vnum])
+                    chunk[2].append(indices[filename][material.istart:material.istart + material.inum] + chunk[3])
+                    chunk[3] += material.vnum
+
+            lod.materials = []
+            for key, chunkId in order:
+                source_material, chunk_vertices, chunk_faces, vnum = chunks[key][chunkId]
+                material = copy.deepcopy(source_material)
+                material.vstart, material.vnum = vstart, vnum
+                material.istart, material.inum = istart, sum(len(faces) for faces in chunk_faces)
+                vertices.extend(chunk_vertices)
+                index.extend(chunk_faces)
+                vstart += material.vnum
+                istart += material.inum
+                lod.materials.append(material)
+            lod.matnum = len(lod.materials)
+            logging.debug('baked geoms[%d].lods[%d] of %d instances into %d materials' % (geomId, lodId, len(placements), lod.matnum))
+
+    baked.set_vertices_array(np.concatenate(vertices) if vertices else np.zeros((0, template.vertex_size)))
+    baked.index = tuple(np.concatenate(index).tolist()) if index else ()
+    baked.indexnum = len(baked.index)
+    return baked
+
+def bake_collision(placements, meshes, max_vertices=MAX_VERTICES):
+    '''
+    Single CollisionMesh from placements of loaded collision meshes, subgeoms are
+    split when any coltype lod would index more vertices than faces can hold
+    '''
+    template = meshes[placements[0][0]]
+    instances = _instances(placements, meshes)
+
+    baked = CollisionMesh()
+    baked.version = template.version
+    baked.geomnum = max(meshes[filename].geomnum for filename, _, _ in placements)
+    baked.geoms = []
+    for geomId in range(baked.geomnum):
+        # every bucket is future subgeom, {coltype: [vertices list, faces list, vertnum, u7]}
+        buckets = [{}]
+        for (filename, _, _), instance in zip(placements, instances):
+            mesh = meshes[filename]
+            sourceId = min(geomId, mesh.geomnum - 1)
+            first = sum(geom.subgeomnum for geom in mesh.geoms[:sourceId])
+            for subgeomId, subgeom in enumerate(mesh.geoms[sourceId].subgeoms):
+                for lod in subgeom.lods:
+                    if lod.vertnum > max_vertices:
+                        raise OverflowError('%s lod has %d vertices' % (filename, lod.vertnum))
+                    if lod.coltype in buckets[-1] and buckets[-1][lod.coltype][2] + lod.vertnum > max_vertices:
+                        buckets.append({})
+                        break
+                for lod, lod_vertices in zip(subgeom.lods, instance[first + subgeomId]):
+                    bucket = buckets[-1].setdefault(lod.coltype, [[], [], 0, lod.u7])
+                    faces = lod.faces.astype(np.int64)
+                    faces[:, :3] += bucket[2]
+                    bucket[0].append(lod_vertices)
+                    bucket[1].append(faces)
+                    bucket[2] += lod.vertnum
+
+        geom = _bf2colgeom()
+        for bucket in buckets:
+            subgeom = _bf2colsubgeom()
+            for coltype in sorted(bucket):
+                lod_vertices, lod_faces, vertnum, u7 = bucket[coltype]
+                lod = _bf2collod()
+                lod.coltype = COLTYPE(coltype)
+                lod.vertices = np.concatenate(lod_vertices).astype(np.float32)
+                lod.vertnum = vertnum
+                lod.vertids = np.zeros(vertnum, dtype=np.uint16)
+                lod.faces = np.concatenate(lod_faces).astype(np.uint16)
+                lod.facenum = len(lod.faces)
+                lod.u7 = u7
+                lod.rebuild_tree()
+                subgeom.lods.append(lod)
+            subgeom.lodnum = len(subgeom.lods)
+            geom.subgeoms.append(subgeom)
+        geom.subgeomnum = len(geom.subgeoms)
+        baked.geoms.append(geom)
+        logging.debug('baked collision geoms[%d] into %d subgeoms' % (geomId, geom.subgeomnum))
+    return baked
+
+def _update_bounds(vmesh):
+    # real bounds of lods and materials, vectorized
+    positions = vmesh.get_attribute_array(D3DDECLUSAGE.POSITION)
+    for geom in vmesh.geoms:
+        for lod in geom.lods:
+            lod_positions = [positions[material.vstart:material.vstart + material.vnum] for material in lod.materials]
+            for material, material_positions in zip(lod.materials, lod_positions):
+                if not vmesh.isSkinnedMesh and vmesh.head.version == 11 and len(material_positions):
+                    material.mmin = tuple(material_positions.min(axis=0).tolist())
+                    material.mmax = tuple(material_positions.max(axis=0).tolist())
+            lod_positions = np.concatenate(lod_positions or [np.zeros((0, 3), dtype=np.float32)])
+            if len(lod_positions):
+                lod.min = tuple(lod_positions.min(axis=0).tolist())
+                lod.max = tuple(lod_positions.max(axis=0).tolist())
+
+def bake(placements, recenter=True, max_vertices=MAX_VERTICES):
+    '''
+    Bakes (visible mesh filename, position, rotation) placements, sibling .collisionmesh
+    files are baked too when every placed mesh has one.
+    Returns (VisibleMesh, CollisionMesh or None, center), center is placement of baked object
+    '''
+    if not placements: raise AttributeError('nothing to bake')
+    filenames = sorted({filename for filename, _, _ in placements})
+    meshes = {filename: VisibleMesh(filename) for filename in filenames}
+    vmesh = bake_visible(placements, meshes, max_vertices)
+
+    colnames = {filename: os.path.splitext(filename)[0] + '.collisionmesh' for filename in filenames}
+    colmesh = None
+    if all(os.path.exists(colname) for colname in colnames.values()):
+        colmeshes = {colnames[filename]: CollisionMesh(colnames[filename]) for filename in filenames}
+        colmesh = bake_collision([(colnames[filename], position, rotation) for filename, position, rotation in placements], colmeshes, max_vertices)
+    else:
+        logging.info('not every placed mesh has collision, skipping collision baking')
+
+    center = np.zeros(3)
+    if recenter:
+        vertices = vmesh.get_vertices_array()
+        positions = vmesh.get_attribute_array(D3DDECLUSAGE.POSITION, vertices)
+        lod = vmesh.geoms[0].lods[0]
+        lod_positions = np.concatenate([positions[material.vstart:material.vstart + material.vnum] for material in lod.materials])
+        center = (lod_positions.min(axis=0).astype(np.float64) + lod_positions.max(axis=0)) / 2
+        positions -= center.astype(np.float32)
+        vmesh.set_vertices_array(vertices)
+    _update_bounds(vmesh)
+
+    if colmesh is not None and recenter:
+        colmesh.translate(-center)
+    logging.info('baked %d placements of %d meshes, center (%g, %g, %g)' % (len(placements), len(filenames), *center))
+    return vmesh, colmesh, tuple(center.tolist())
+
+def bake_files(placements, filename, recenter=True):
+    '''
+    Bakes placements and writes visible and collision meshes, returns center
+    '''
+    vmesh, colmesh, center = bake(placements, recenter)
+    vmesh.export(filename, update_bounds=False)
+    if colmesh is not None:
+        colmesh.export(os.path.splitext(filename)[0] + '.collisionmesh')
+    return center
@@ -0,0 +1,75 @@
+import os
+import glob
+import logging
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# runs same operation over many mesh files on process pool
+# operation is any picklable callable taking filename as first argument,
+# e.g. module level function or functools.partial of one
+#   results, errors = batch.run(partial(translate, offset=(0, 0, 1)), 'mods/pr/objects/**/*.staticmesh')
+
+PENDING_PER_WORKER = 2  # files submitted ahead per worker, bounds memory held by queued results
+
+def expand(patterns):
+    '''
+    Sorted unique filenames matching glob patterns, ** matches subdirectories
+    '''
+    if isinstance(patterns, str): patterns = [patterns]
+    filenames = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches and not glob.has_magic(pattern):
+            matches = [pattern]  # missing file reported as error by run
+        filenames.update(matches)
+    return sorted(filenames)
+
+def _call(operation, filename):
+    # exceptions may not be picklable, passing back formatted traceback instead
+    try:
+        return filename, True, operation(filename)
+    except Exception:
+        return filename, False, traceback.format_exc()
+
+def _log_progress(done, total, filename, ok):
+    logging.info('[%d/%d] %s%s' % (done, total, filename, '' if ok else ' FAILED'))
+
+def run(operation, patterns, workers=None, pending=None, progress=_log_progress):
+    '''
+    Calls operation on every file matching patterns, returns (results, errors) dicts
+    with operation return values and tracebacks by filename.
+    workers defaults to cpu count, 0 or 1 runs in current process.
+    progress is called as progress(done, total, filename, ok) after every file
+    '''
+    filenames = expand(patterns)
+    total = len(filenames)
+    if workers is None: workers = os.cpu_count() or 1
+    results, errors = {}, {}
+
+    def collect(filename, ok, value):
+        if ok:
+            results[filename] = value
+        else:
+            errors[filename] = value
+            logging.error('%s: %s' % (filename, value.strip().splitlines()[-1]))
+        if progress: progress(len(results) + len(errors), total, filename, ok)
+
+    if workers <= 1 or total <= 1:
+        for filename in filenames:
+            collect(*_call(operation, filename))
+        return results, errors
+
+    if pending is None: pending = workers * PENDING_PER_WORKER
+    queue = iter(filenames)
+    with ProcessPoolExecutor(max_workers=min(workers, total)) as executor:
+        running = set()
+        for filename in queue:
+            running.add(executor.submit(_call, operation, filename))
+            if len(running) < pending: continue
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                collect(*future.result())
+        for future in running:
+            collect(*future.result())
+    logging.debug('processed %d files with %d workers, %d failed' % (total, workers, len(errors)))
+    return results, errors
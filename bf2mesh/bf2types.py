@@ -50,4 +50,13 @@ class D3DDECLUSAGE(enum.IntEnum):
     UV2 = 261
     UV3 = 517
     UV4 = 773
-    UV5 = 1029
\ No newline at end of file
+    UV5 = 1029
+
+
+# collision lod types, each lod of collision subgeom used by different physics
+class COLTYPE(enum.IntEnum):
+    PROJECTILE = 0
+    VEHICLE = 1
+    SOLDIER = 2
+    AI = 3
+    UNKNOWN = 4
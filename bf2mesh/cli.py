@@ -0,0 +1,195 @@
+import os
+import sys
+import logging
+import argparse
+from functools import partial
+
+from . import batch
+
+# bf2mesh command line tool, every subcommand takes files or globs and runs on process pool
+#   bf2mesh translate --offset 0 0 1.5 "objects/**/*.staticmesh"
+# mesh modules import numpy and are heavy, operations import them lazily in workers
+
+def _open_mesh(filename):
+    if os.path.splitext(filename)[1].lower() == '.collisionmesh':
+        from .collisionmesh import CollisionMesh
+        return CollisionMesh(filename)
+    from .visiblemesh import VisibleMesh
+    return VisibleMesh(filename)
+
+def _get_output(filename, output):
+    if not output: return filename
+    return os.path.join(output, os.path.basename(filename))
+
+def info(filename):
+    mesh = _open_mesh(filename)
+    lines = [filename]
+    if mesh.isCollisionMesh:
+        lines.append('  collisionmesh version %d, %d geoms' % (mesh.version, mesh.geomnum))
+        for geomId, geom in enumerate(mesh.geoms):
+            for subgeomId, subgeom in enumerate(geom.subgeoms):
+                for lod in subgeom.lods:
+                    lines.append('  geom%d subgeom%d %s: %d faces, %d vertices' % (geomId, subgeomId, lod.coltype.name,
+                                                                                    lod.facenum, lod.vertnum))
+    else:
+        lines.append('  version %d, %d vertices, %d indices, %d geoms' % (mesh.head.version, mesh.vertnum, mesh.indexnum, mesh.geomnum))
+        for geomId, geom in enumerate(mesh.geoms):
+            for lodId, lod in enumerate(geom.lods):
+                lines.append('  geom%d lod%d: %d materials, %d triangles' % (geomId, lodId, lod.matnum,
+                                                                           sum(material.inum for material in lod.materials) // 3))
+    return '\n'.join(lines)
+
+def translate(filename, offset, output=None):
+    mesh = _open_mesh(filename)
+    mesh.translate(offset)
+    mesh.export(_get_output(filename, output))
+
+def rotate(filename, rotation, output=None):
+    mesh = _open_mesh(filename)
+    mesh.rotate(rotation)
+    mesh.export(_get_output(filename, output))
+
+def reorder(filename, order, output=None):
+    mesh = _open_mesh(filename)
+    if mesh.isCollisionMesh:
+        raise AttributeError('reordering collision mesh geoms is not supported')
+    mesh.change_geoms_order(order)
+    mesh.export(_get_output(filename, output))
+
+def validate(filename):
+    '''
+    List of problems found in mesh data, empty for valid mesh
+    '''
+    import numpy as np
+    from .bf2types import D3DDECLUSAGE
+    from .collisiontree import LEFT_LEAF, RIGHT_LEAF
+
+    mesh = _open_mesh(filename)
+    problems = []
+    if mesh.isCollisionMesh:
+        for geomId, geom in enumerate(mesh.geoms):
+            for subgeomId, subgeom in enumerate(geom.subgeoms):
+                for lod in subgeom.lods:
+                    name = 'geom%d subgeom%d %s' % (geomId, subgeomId, lod.coltype.name)
+                    if lod.facenum and lod.faces[:, :3].max() >= lod.vertnum:
+                        problems.append('%s: faces index missing vertices' % name)
+                    if lod.vertnum and not np.all(np.isfinite(lod.vertices)):
+                        problems.append('%s: vertices are not finite' % name)
+                    if lod.zdata is not None and len(lod.zdata) and lod.zdata.max() >= lod.facenum:
+                        problems.append('%s: tree leaves index missing faces' % name)
+                    for side, leaf_flag, key in [(0, LEFT_LEAF, 'left'), (1, RIGHT_LEAF, 'right')]:
+                        leaf = (lod.ydata['flags'] & leaf_flag) != 0
+                        end = lod.ydata[key] + ((lod.ydata['counts'].astype(np.int64) >> (8 * side)) & 0xff)
+                        if np.any(leaf & (end > lod.znum)) or np.any(~leaf & (lod.ydata[key] >= lod.ynum)):
+                            problems.append('%s: tree %s children out of bounds' % (name, key))
+        return problems
+
+    positions = mesh.get_attribute_array(D3DDECLUSAGE.POSITION)
+    if not np.all(np.isfinite(positions)):
+        problems.append('vertices positions are not finite')
+    index = np.array(mesh.index, dtype=np.int64)
+    for geomId, geom in enumerate(mesh.geoms):
+        for lodId, lod in enumerate(geom.lods):
+            for materialId, material in enumerate(lod.materials):
+                name = 'geom%d lod%d material%d' % (geomId, lodId, materialId)
+                if material.vstart + material.vnum > mesh.vertnum:
+                    problems.append('%s: vertices out of buffer' % name)
+                if material.istart + material.inum > mesh.indexnum or material.inum % 3:
+                    problems.append('%s: indices out of buffer' % name)
+                    continue
+                faces = index[material.istart:material.istart + material.inum]
+                if len(faces) and faces.max() >= material.vnum:
+                    problems.append('%s: indices out of material vertices' % name)
+    return problems
+
+def optimize(filename, output=None):
+    mesh = _open_mesh(filename)
+    if mesh.isCollisionMesh:
+        mesh.rebuild_trees()
+        summary = 'rebuilt collision trees'
+    else:
+        removed = mesh.remove_degenerate_triangles()
+        saved = sum(sum(lods) for lods in mesh.merge_materials())
+        summary = 'removed %d degenerate triangles, merged %d materials' % (removed, saved)
+    mesh.export(_get_output(filename, output))
+    return summary
+
+def convert(filename, version, output=None):
+    mesh = _open_mesh(filename)
+    mesh.change_version(version)
+    if mesh.isCollisionMesh:
+        mesh.export(_get_output(filename, output))
+    else:
+        mesh.export(_get_output(filename, output), update_bounds=False)
+
+def merge(filenames, output):
+    # merging is sequential, every next mesh merged into first one
+    mesh = _open_mesh(filenames[0])
+    for filename in filenames[1:]:
+        other = _open_mesh(filename)
+        if not mesh.canMerge(other):
+            raise AttributeError('%s can not be merged into %s' % (filename, filenames[0]))
+        mesh.merge(other)
+    mesh.export(output)
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='bf2mesh', description='Battlefield 2 mesh files tool')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='-v for progress, -vv for debug log')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes, defaults to cpu count')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    def add_command(name, help, output=True):
+        command = commands.add_parser(name, help=help)
+        command.add_argument('files', nargs='+', help='mesh files or glob patterns')
+        if output: command.add_argument('-o', '--output', help='directory to save meshes into, overwrites by default')
+        return command
+
+    add_command('info', 'print geoms and lods summary', output=False)
+    add_command('translate', 'move meshes by offset').add_argument(
+                                        '--offset', required=True, nargs=3, type=float, metavar=('X', 'Y', 'Z'))
+    add_command('rotate', 'rotate meshes by yaw, pitch, roll degrees').add_argument(
+                                        '--rotation', required=True, nargs=3, type=float, metavar=('YAW', 'PITCH', 'ROLL'))
+    add_command('reorder', 'change visible meshes geoms order').add_argument('--order', required=True, nargs='+', type=int)
+    add_command('validate', 'check indices, bounds and trees', output=False)
+    add_command('optimize', 'drop degenerate triangles and merge materials, rebuild collision trees')
+    add_command('convert', 'change file version, 4, 6, 10, 11 for visible and 8, 9, 10 for collision meshes').add_argument('--version', required=True, type=int)
+
+    command = commands.add_parser('merge', help='merge meshes into one file')
+    command.add_argument('files', nargs='+', help='mesh files or glob patterns, merged in order into first one')
+    command.add_argument('-o', '--output', required=True, help='merged mesh filename')
+    return parser
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    logging.basicConfig(level=[logging.WARNING, logging.INFO, logging.DEBUG][min(args.verbose, 2)], format='%(message)s')
+
+    if args.command == 'merge':
+        filenames = [filename for pattern in args.files for filename in batch.expand(pattern)]
+        merge(filenames, args.output)
+        return 0
+
+    operations = {
+        'info': lambda: info,
+        'translate': lambda: partial(translate, offset=tuple(args.offset), output=args.output),
+        'rotate': lambda: partial(rotate, rotation=tuple(args.rotation), output=args.output),
+        'reorder': lambda: partial(reorder, order=args.order, output=args.output),
+        'validate': lambda: validate,
+        'optimize': lambda: partial(optimize, output=args.output),
+        'convert': lambda: partial(convert, version=args.version, output=args.output),
+        }
+    results, errors = batch.run(operations[args.command](), args.files, workers=args.jobs)
+
+    failed = bool(errors)
+    for filename in sorted(results):
+        result = results[filename]
+        if args.command == 'validate':
+            for problem in result:
+                print('%s: %s' % (filename, problem))
+            failed |= bool(result)
+        elif result:
+            print(result if args.command == 'info' else '%s: %s' % (filename, result))
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import os
+import logging
+
+import numpy as np
+
+from .bf2types import COLTYPE, D3DDECLUSAGE
+from .visiblemesh import VisibleMesh
+from .collisionmesh import CollisionMesh
+from .collisiontree import build_tree
+from .collisionquery import closest_point
+
+# visible vs collision surfaces mismatch
+# both surfaces sampled on every face corners, edges middles and center, large faces
+# subdivided so samples are no further than spacing apart, distance from face samples
+# to other surface is one-sided Hausdorff distance of that face
+
+TOLERANCE = 0.1  # meters
+SPACING = 1.0  # meters
+
+def _barycentric_grid(steps):
+    # weights of triangle subdivided into steps x steps grid points + center
+    i, j = np.triu_indices(steps + 1)
+    weights = np.column_stack([steps - j, j - i, i]) / steps
+    return np.concatenate([weights, [(1.0 / 3.0, ) * 3]])
+
+def face_samples(vertices, faces, spacing=SPACING):
+    '''
+    (samplenum, 3) samples and (samplenum, ) face ids, at least corners, edges middles
+    and center of every face, longer edges split so samples are at most spacing apart
+    '''
+    triangles = np.asarray(vertices, dtype=np.float64)[np.asarray(faces)[:, :3].astype(np.int64)]
+    lenghts = np.linalg.norm(triangles - np.roll(triangles, -1, axis=1), axis=2).max(axis=1)
+    steps = np.maximum(np.ceil(lenghts / spacing), 2).astype(np.int64)
+    samples, faceIds = [np.zeros((0, 3))], [np.zeros(0, dtype=np.int64)]
+    for step in np.unique(steps):
+        ids = np.flatnonzero(steps == step)
+        weights = _barycentric_grid(int(step))
+        samples.append(np.einsum('kj,fjx->fkx', weights, triangles[ids]).reshape(-1, 3))
+        faceIds.append(np.repeat(ids, len(weights)))
+    return np.concatenate(samples), np.concatenate(faceIds)
+
+def faces_distances(vertices, faces, other_vertices, other_faces, spacing=SPACING):
+    '''
+    Max distance from every face samples to other surface, inf if other surface is empty
+    '''
+    if len(faces) == 0: return np.zeros(0)
+    samples, faceIds = face_samples(vertices, faces, spacing)
+    ydata, zdata = build_tree(other_vertices, other_faces)
+    _, distances, _ = closest_point(other_vertices, other_faces, ydata, zdata, samples)
+    result = np.zeros(len(faces))
+    np.maximum.at(result, faceIds, distances)
+    return result
+
+def get_visible_surface(vmesh, geomId=0, lodId=0):
+    positions = vmesh.get_attribute_array(D3DDECLUSAGE.POSITION).astype(np.float64)
+    index = np.array(vmesh.index, dtype=np.int64)
+    faces = [index[material.istart:material.istart + material.inum].reshape(-1, 3) + material.vstart
+             for material in vmesh.geoms[geomId].lods[lodId].materials]
+    return positions, np.concatenate(faces or [np.zeros((0, 3), dtype=np.int64)])
+
+def get_collision_surface(colmesh, geomId=0, coltype=COLTYPE.PROJECTILE):
+    # all subgeoms lods of coltype as single surface
+    vertices, faces = [np.zeros((0, 3))], [np.zeros((0, 3), dtype=np.int64)]
+    vertnum = 0
+    for lod in colmesh.get_lods(coltype, geomId):
+        vertices.append(lod.vertices.astype(np.float64))
+        faces.append(lod.faces[:, :3].astype(np.int64) + vertnum)
+        vertnum += lod.vertnum
+    return np.concatenate(vertices), np.concatenate(faces)
+
+def find_mismatches(vmesh, colmesh, geomId=0, lodId=0, coltype=COLTYPE.PROJECTILE, tolerance=TOLERANCE, spacing=SPACING):
+    '''
+    Compares visible lod against collision lods of coltype, returns dict with
+    one-sided Hausdorff distances both ways and faces further than tolerance:
+        visible_faces - visible faces with no collision surface nearby, bullets pass through them
+        collision_faces - collision faces far from any visible surface, invisible walls
+    Faces are sampled at most spacing apart. Subgeoms transforms of bundled meshes are not applied.
+    '''
+    positions, faces = get_visible_surface(vmesh, geomId, lodId)
+    col_vertices, col_faces = get_collision_surface(colmesh, geomId, coltype)
+
+    visible_distances = faces_distances(positions, faces, col_vertices, col_faces, spacing)
+    collision_distances = faces_distances(col_vertices, col_faces, positions, faces, spacing)
+    report = {
+        'visible_hausdorff': float(visible_distances.max()) if len(visible_distances) else 0.0,
+        'collision_hausdorff': float(collision_distances.max()) if len(collision_distances) else 0.0,
+        'visible_faces': np.flatnonzero(visible_distances > tolerance),
+        'collision_faces': np.flatnonzero(collision_distances > tolerance),
+        }
+    logging.debug('%s: visible -> collision %f, collision -> visible %f, %d visible and %d collision faces mismatched' % (
+                                                                                    vmesh.filename,
+                                                                                    report['visible_hausdorff'],
+                                                                                    report['collision_hausdorff'],
+                                                                                    len(report['visible_faces']),
+                                                                                    len(report['collision_faces'])))
+    return report
+
+def find_mismatches_batch(filenames, **kwargs):
+    '''
+    Checks every visible mesh file against its sibling .collisionmesh, returns reports by filename.
+    Meshes without collision are skipped
+    '''
+    reports = {}
+    for filename in filenames:
+        colfilename = os.path.splitext(filename)[0] + '.collisionmesh'
+        if not os.path.exists(colfilename):
+            logging.info('%s: no collision mesh, skipping' % filename)
+            continue
+        with VisibleMesh(filename) as vmesh, CollisionMesh(colfilename) as colmesh:
+            reports[filename] = find_mismatches(vmesh, colmesh, **kwargs)
+        if len(reports[filename]['visible_faces']) or len(reports[filename]['collision_faces']):
+            logging.info('%s: %d visible and %d collision faces mismatched' % (
+                                                                    filename,
+                                                                    len(reports[filename]['visible_faces']),
+                                                                    len(reports[filename]['collision_faces'])))
+    return reports
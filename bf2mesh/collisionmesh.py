@@ -0,0 +1,708 @@
+import os
+import logging
+
+import numpy as np
+
+from . import simplify
+from .mesh import BF2Mesh
+from .visiblemesh import VisibleMesh
+from .bf2types import COLTYPE, D3DDECLUSAGE
+from .io import read_long
+from .io import read_byte
+from .io import read_float3
+from .io import read_array
+from .io import write_long
+from .io import write_byte
+from .io import write_float3
+from .io import write_array
+from .collisiontree import YSTRUCT
+from .collisiontree import build_tree
+from .collisiontree import build_adjacency
+from .collisiontree import translate_tree
+from .collisiontree import rotate_tree
+from .collisionquery import raycast
+from .collisionquery import closest_point
+from .collisionquery import tree_bounds
+
+VERSIONS = (8, 9, 10)  # lods have coltype since 9, adjacency since 10
+
+# max faces of generated collision lods, projectile lod is the most detailed one
+COLLISION_BUDGETS = {
+    COLTYPE.PROJECTILE: 2048,
+    COLTYPE.VEHICLE: 512,
+    COLTYPE.SOLDIER: 256,
+    }
+WELD_TOLERANCE = 1e-4
+SMALL_PART = 1.0  # parts with smaller bounds diagonal replaced by convex hull in coarse lods
+U7 = 49  # unknown lod byte, same in every exported mesh we have
+
+def rotation_matrix(rotation):
+    # yaw around y, pitch around x, roll around z, applied roll first
+    yaw, pitch, roll = (np.radians(angle) for angle in rotation)
+    Ryaw = np.array([[np.cos(yaw), 0.0, np.sin(yaw)], [0.0, 1.0, 0.0], [-np.sin(yaw), 0.0, np.cos(yaw)]])
+    Rpitch = np.array([[1.0, 0.0, 0.0], [0.0, np.cos(pitch), -np.sin(pitch)], [0.0, np.sin(pitch), np.cos(pitch)]])
+    Rroll = np.array([[np.cos(roll), -np.sin(roll), 0.0], [np.sin(roll), np.cos(roll), 0.0], [0.0, 0.0, 1.0]])
+    return Ryaw @ Rpitch @ Rroll
+
+class CollisionMesh(BF2Mesh):
+
+    def __init__(self, filename=None):
+        BF2Mesh.__init__(self, filename=filename, isCollisionMesh=True)
+        self.__meshfile = None
+
+        ### MESH DATA ###
+        self.u1 = 0
+        self.version = 0  # 8, 9, 10 supported
+
+        # geom > subgeom > lod, lods are coltypes
+        self.geomnum = 0
+        self.geoms = [_bf2colgeom() for i in range(self.geomnum)]
+        ### MESH DATA ###
+
+        self.__enter__()
+
+    def __enter__(self):
+        if self.filename and not self.isLoaded:
+            self.__meshfile = open(file=self.filename, mode='rb')
+            self.__load()
+            self.__meshfile.close()
+        return self
+
+    def __exit__(self, type, value, tracebacks):
+        if self.__meshfile:
+            if not self.__meshfile.closed:
+                self.__meshfile.close()
+
+    def __eq__(self, other):
+        if self.u1 != other.u1: return False
+        if self.version != other.version: return False
+        if self.geomnum != other.geomnum: return False
+        for geomId, geom in enumerate(self.geoms):
+            if geom != other.geoms[geomId]: return False
+        return True
+
+    def __load(self):
+        self.u1 = read_long(self.__meshfile)
+        self.version = read_long(self.__meshfile)
+        logging.debug('u1 = %d, version = %d' % (self.u1, self.version))
+
+        self.geomnum = read_long(self.__meshfile)
+        logging.debug('geomnum = %d' % self.geomnum)
+        self.geoms = [_bf2colgeom() for i in range(self.geomnum)]
+        for geom in self.geoms:
+            geom.load(self.__meshfile, self.version)
+
+        # make sure we did read whole file, not missing any byte!
+        if self.__meshfile.tell() == os.stat(self.filename).st_size:
+            logging.debug('loaded %d bytes from %s' % (self.__meshfile.tell(), self.filename))
+            self.isLoaded = True
+        else:
+            raise AttributeError('did not parsed all bytes from %s' % self.filename)
+
+    def export(self, filename=None):
+        if not filename: filename = self.filename
+        logging.debug('saving collision mesh as %s' % filename)
+
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        with open(filename, 'wb') as colmesh:
+            self.__export(colmesh)
+            self.filename = filename
+
+    def __export(self, fo):
+        write_long(fo, self.u1)
+        write_long(fo, self.version)
+        write_long(fo, self.geomnum)
+        for geom in self.geoms:
+            geom.export(fo, self.version)
+        logging.debug('exported %d bytes' % fo.tell())
+
+    def canMerge(self, other):
+        if len(self.geoms) != len(other.geoms):
+            logging.debug('geoms %d != geoms %d %s: %s' % (len(self.geoms), len(other.geoms), self.filename, other.filename))
+            return False
+        for geomId, geom in enumerate(self.geoms):
+            other_geom = other.geoms[geomId]
+            if len(geom.subgeoms) != len(other_geom.subgeoms):
+                logging.debug('geom[%d].subgeoms %d != geom[%d].subgeoms %d %s: %s' % (geomId, len(geom.subgeoms), geomId, len(other_geom.subgeoms), self.filename, other.filename))
+                return False
+            for subgeomId, subgeom in enumerate(geom.subgeoms):
+                other_subgeom = other_geom.subgeoms[subgeomId]
+                if len(subgeom.lods) != len(other_subgeom.lods):
+                    logging.debug('geom[%d].subgeom[%d].lods %d != geom[%d].subgeom[%d].lods %d %s: %s' % (geomId, subgeomId, len(subgeom.lods), geomId, subgeomId, len(other_subgeom.lods), self.filename, other.filename))
+                    return False
+                for lodId, lod in enumerate(subgeom.lods):
+                    other_lod = other_subgeom.lods[lodId]
+                    if lod.coltype != other_lod.coltype:
+                        logging.debug('geom[%d].subgeom[%d].lod[%d].coltype %s != %s %s: %s' % (geomId, subgeomId, lodId, lod.coltype, other_lod.coltype, self.filename, other.filename))
+                        return False
+                    # vertex indices are unsigned short
+                    if lod.vertnum + other_lod.vertnum > 0xffff + 1:
+                        logging.debug('geom[%d].subgeom[%d].lod[%d] too many vertices %s: %s' % (geomId, subgeomId, lodId, self.filename, other.filename))
+                        return False
+        return True
+
+    def merge(self, other, rebuild=True):
+        '''
+        Appends other mesh faces and vertices to every lod, other mesh is not modified.
+        When merging many meshes pass rebuild=False and call rebuild_trees() once at the end
+        '''
+        logging.debug('merging %s to %s' % (other.filename, self.filename))
+        if not self.canMerge(other):
+            raise AttributeError('can not merge %s to %s' % (other.filename, self.filename))
+        for geomId, geom in enumerate(self.geoms):
+            geom.merge(other.geoms[geomId])
+        if rebuild: self.rebuild_trees()
+
+    def change_version(self, version):
+        '''
+        Sets version and fills lods data which exists only in new version layout
+        '''
+        if version not in VERSIONS:
+            raise AttributeError('unsupported version %d, expected one of %s' % (version, VERSIONS))
+        for geom in self.geoms:
+            for subgeom in geom.subgeoms:
+                for lodId, lod in enumerate(subgeom.lods):
+                    # version 8 lods have no coltype, ordered same as coltypes
+                    if self.version < 9 <= version: lod.coltype = COLTYPE(min(lodId, COLTYPE.UNKNOWN))
+                    if self.version < 10 <= version:
+                        lod.adata = build_adjacency(lod.faces)
+                        lod.anum = len(lod.adata)
+        logging.debug('changing version %d to %d' % (self.version, version))
+        self.version = version
+
+    def translate(self, offset):
+        logging.debug('translating with offset of %s' % str(offset))
+        for geom in self.geoms:
+            for subgeom in geom.subgeoms:
+                for lod in subgeom.lods:
+                    lod.translate(offset)
+
+    def rotate(self, rotation):
+        '''
+        Rotates by (yaw, pitch, roll) degrees, same order as VisibleMesh.rotate
+        '''
+        logging.debug('rotating by %s' % str(rotation))
+        matrix = rotation_matrix(rotation)
+        for geom in self.geoms:
+            for subgeom in geom.subgeoms:
+                for lod in subgeom.lods:
+                    lod.rotate(matrix)
+
+    def simplify_lods(self, budgets=None, small_part=SMALL_PART, strict=False):
+        '''
+        Replaces coarser coltype lods of every subgeom by ones derived from projectile lod,
+        budgets are max faces per coltype, defaults to COLLISION_BUDGETS for vehicle and soldier.
+        Lods over budget are logged, or raise OverflowError with strict
+        '''
+        if budgets is None:
+            budgets = {coltype: budget for coltype, budget in COLLISION_BUDGETS.items() if coltype != COLTYPE.PROJECTILE}
+        for geom in self.geoms:
+            for subgeom in geom.subgeoms:
+                source = [lod for lod in subgeom.lods if lod.coltype == COLTYPE.PROJECTILE]
+                if not source: continue
+                lods = {lod.coltype: lod for lod in subgeom.lods}
+                for coltype, budget in budgets.items():
+                    if coltype == COLTYPE.PROJECTILE: continue
+                    lods[coltype] = source[0].simplified(coltype, budget, small_part, strict)
+                subgeom.lods = [lods[coltype] for coltype in sorted(lods)]
+                subgeom.lodnum = len(subgeom.lods)
+
+    def remap_materials(self, mapping):
+        '''
+        Replaces faces materials of every lod by mapping table {old: new}, unmapped materials stay
+        '''
+        logging.debug('remapping materials %s' % str(mapping))
+        for geom in self.geoms:
+            for subgeom in geom.subgeoms:
+                for lod in subgeom.lods:
+                    lod.remap_materials(mapping)
+
+    def get_material_stats(self, coltype=None):
+        '''
+        Faces count and surface area per material, summed over lods of coltype or all lods
+        '''
+        stats = {}
+        for geom in self.geoms:
+            for subgeom in geom.subgeoms:
+                for lod in subgeom.lods:
+                    if coltype is not None and lod.coltype != coltype: continue
+                    for material, count, area in zip(*lod.get_material_stats()):
+                        facenum, total = stats.get(material, (0, 0.0))
+                        stats[material] = (facenum + count, total + area)
+        return stats
+
+    def get_materials(self):
+        materials = [np.unique(lod.faces[:, 3]) for geom in self.geoms for subgeom in geom.subgeoms for lod in subgeom.lods]
+        return np.unique(np.concatenate(materials or [np.zeros(0, dtype=np.uint16)])).astype(np.int64)
+
+    def get_lods(self, coltype, geom=0):
+        return [lod for subgeom in self.geoms[geom].subgeoms for lod in subgeom.lods if lod.coltype == coltype]
+
+    def raycast(self, origins, directions, coltype=COLTYPE.PROJECTILE, geom=0, max_distance=np.inf):
+        '''
+        Nearest hits of rays against all subgeoms lods of coltype, returns (distances, materials), inf and -1 for misses
+        '''
+        origins = np.atleast_2d(origins)
+        distances = np.full(len(origins), np.inf)
+        materials = np.full(len(origins), -1, dtype=np.int64)
+        for lod in self.get_lods(coltype, geom):
+            lod_distances, faceIds = lod.raycast(origins, directions, max_distance)
+            closer = lod_distances < distances
+            distances[closer] = lod_distances[closer]
+            materials[closer] = lod.faces[faceIds[closer], 3]
+        return distances, materials
+
+    def closest_point(self, points, coltype=COLTYPE.PROJECTILE, geom=0):
+        '''
+        Closest collision surface points for all subgeoms lods of coltype, returns (positions, distances, materials)
+        '''
+        points = np.atleast_2d(points)
+        positions = np.full((len(points), 3), np.nan)
+        distances = np.full(len(points), np.inf)
+        materials = np.full(len(points), -1, dtype=np.int64)
+        for lod in self.get_lods(coltype, geom):
+            lod_positions, lod_distances, faceIds = lod.closest_point(points)
+            closer = lod_distances < distances
+            positions[closer] = lod_positions[closer]
+            distances[closer] = lod_distances[closer]
+            materials[closer] = lod.faces[faceIds[closer], 3]
+        return positions, distances, materials
+
+    def rebuild_trees(self):
+        '''
+        Regenerates bounds and collision trees of every lod, call after editing faces or vertices
+        '''
+        for geom in self.geoms:
+            for subgeom in geom.subgeoms:
+                for lod in subgeom.lods:
+                    lod.rebuild_tree()
+
+
+class _bf2colgeom:
+
+    def __init__(self):
+        self.subgeomnum = 0
+        self.subgeoms = [_bf2colsubgeom() for i in range(self.subgeomnum)]
+
+    def __eq__(self, other):
+        if self.subgeomnum != other.subgeomnum:
+            logging.debug('\ngeom.subgeomnum = %d\nother.subgeomnum = %d' % (self.subgeomnum, other.subgeomnum))
+            return False
+        for subgeomId, subgeom in enumerate(self.subgeoms):
+            if subgeom != other.subgeoms[subgeomId]: return False
+        return True
+
+    def merge(self, other):
+        for subgeomId, subgeom in enumerate(self.subgeoms):
+            subgeom.merge(other.subgeoms[subgeomId])
+
+    def load(self, fo, version):
+        self.subgeomnum = read_long(fo)
+        logging.debug('geom.subgeomnum = %d' % self.subgeomnum)
+        self.subgeoms = [_bf2colsubgeom() for i in range(self.subgeomnum)]
+        for subgeom in self.subgeoms:
+            subgeom.load(fo, version)
+
+    def export(self, fo, version):
+        write_long(fo, self.subgeomnum)
+        for subgeom in self.subgeoms:
+            subgeom.export(fo, version)
+
+
+class _bf2colsubgeom:
+
+    def __init__(self):
+        self.lodnum = 0
+        self.lods = [_bf2collod() for i in range(self.lodnum)]
+
+    def __eq__(self, other):
+        if self.lodnum != other.lodnum:
+            logging.debug('\nsubgeom.lodnum = %d\nother.lodnum = %d' % (self.lodnum, other.lodnum))
+            return False
+        for lodId, lod in enumerate(self.lods):
+            if lod != other.lods[lodId]: return False
+        return True
+
+    def merge(self, other):
+        for lodId, lod in enumerate(self.lods):
+            lod.merge(other.lods[lodId])
+
+    def load(self, fo, version):
+        self.lodnum = read_long(fo)
+        logging.debug('subgeom.lodnum = %d' % self.lodnum)
+        self.lods = [_bf2collod() for i in range(self.lodnum)]
+        for lod in self.lods:
+            lod.load(fo, version)
+
+    def export(self, fo, version):
+        write_long(fo, self.lodnum)
+        for lod in self.lods:
+            lod.export(fo, version)
+
+
+class _bf2collod:
+
+    def __init__(self):
+        self.coltype = COLTYPE.PROJECTILE  # version >= 9
+
+        # v1, v2, v3, material
+        self.facenum = 0
+        self.faces = np.zeros((self.facenum, 4), dtype=np.uint16)
+
+        self.vertnum = 0
+        self.vertices = np.zeros((self.vertnum, 3), dtype=np.float32)
+        self.vertids = np.zeros(self.vertnum, dtype=np.uint16)  # seems to be always zeroes
+
+        # boundaries
+        self.min = (0.0, 0.0, 0.0)
+        self.max = (0.0, 0.0, 0.0)
+        self.u7 = 0
+        self.bmin = (0.0, 0.0, 0.0)
+        self.bmax = (0.0, 0.0, 0.0)
+
+        # collision tree nodes
+        self.ynum = 0
+        self.ydata = np.zeros(self.ynum, dtype=YSTRUCT)
+
+        # faces ids referenced by tree leafs
+        self.znum = 0
+        self.zdata = np.zeros(self.znum, dtype=np.uint16)
+
+        # neighbour face for every face edge, -1 for open edge, version >= 10
+        self.anum = 0
+        self.adata = np.zeros(self.anum, dtype=np.int32)
+
+        # own tree with children bounds for queries, dropped when geometry changes
+        self._query_tree = None
+
+    def __eq__(self, other):
+        for attr in ['coltype', 'facenum', 'vertnum', 'min', 'max', 'u7', 'bmin', 'bmax', 'ynum', 'znum', 'anum']:
+            if getattr(self, attr) != getattr(other, attr):
+                logging.debug('\nlod.%s = %s\nother.%s = %s' % (attr, getattr(self, attr), attr, getattr(other, attr)))
+                return False
+        for attr in ['faces', 'vertices', 'vertids', 'ydata', 'zdata', 'adata']:
+            if not np.array_equal(getattr(self, attr), getattr(other, attr)):
+                logging.debug('\nlod.%s != other.%s' % (attr, attr))
+                return False
+        return True
+
+    def merge(self, other):
+        if self.vertnum + other.vertnum > 0xffff + 1:
+            raise OverflowError('%d vertices can not be indexed by faces' % (self.vertnum + other.vertnum))
+        faces = other.faces.astype(np.uint32)
+        faces[:, :3] += self.vertnum
+        self.faces = np.concatenate([self.faces, faces.astype(np.uint16)])
+        self.vertices = np.concatenate([self.vertices, other.vertices])
+        self.vertids = np.concatenate([self.vertids, other.vertids])
+        self.facenum = len(self.faces)
+        self.vertnum = len(self.vertices)
+        self._query_tree = None
+        logging.debug('merged lod to %d faces, %d vertices' % (self.facenum, self.vertnum))
+
+    def translate(self, offset):
+        offset = np.asarray(offset, dtype=np.float32)
+        self.vertices += offset
+        for attr in ['min', 'max', 'bmin', 'bmax']:
+            setattr(self, attr, tuple((np.asarray(getattr(self, attr), dtype=np.float32) + offset).tolist()))
+        self.ydata = translate_tree(self.ydata, offset)
+        self._query_tree = None
+
+    def rotate(self, matrix):
+        self.vertices[:] = self.vertices @ np.asarray(matrix, dtype=np.float32).T
+        self._query_tree = None
+        ydata = rotate_tree(self.ydata, matrix)
+        if ydata is None:
+            # planes of tree can not follow arbitrary rotation
+            self.rebuild_tree()
+        else:
+            self.ydata = ydata
+            self.update_bounds()
+
+    def simplified(self, coltype, budget, small_part=SMALL_PART, strict=False):
+        '''
+        New lod of coltype with at most ~budget faces enclosing this lod surface,
+        small parts become convex hulls, large parts are decimated and pushed out
+        '''
+        positions = self.vertices.astype(np.float64)
+        faces = self.faces[:, :3].astype(np.int64)
+        materials = self.faces[:, 3].astype(np.int64)
+        parts = simplify.components(faces, self.vertnum) if self.facenum else np.zeros(0, dtype=np.int64)
+        # every part keeps at least tetrahedron, rest of budget shared by faces count
+        partnum = int(parts.max()) + 1 if len(parts) else 0
+        spare = max(budget - 4 * partnum, 0)
+
+        new_vertices, new_faces = [np.zeros((0, 3))], [np.zeros((0, 4), dtype=np.int64)]
+        vertnum = 0
+        for part in range(partnum):
+            part_faces = faces[parts == part]
+            part_materials = materials[parts == part]
+            used, local = np.unique(part_faces, return_inverse=True)
+            local = local.reshape(-1, 3)
+            points = positions[used]
+            allocation = 4 + spare * len(part_faces) // self.facenum
+
+            if len(part_faces) > allocation and np.linalg.norm(points.max(axis=0) - points.min(axis=0)) <= small_part:
+                hull = simplify.convex_hull(points)
+                if hull is not None:
+                    local = hull
+                    part_materials = np.full(len(hull), np.argmax(np.bincount(part_materials)))
+            part_vertices = points
+            if len(local) > allocation:
+                decimated, ids = simplify.decimate(points, local, [allocation], return_ids=True)[0]
+                part_vertices = _pushed_out(points, decimated, points)
+                local, part_materials = decimated, part_materials[ids]
+            part_faces = np.column_stack([local, part_materials])
+
+            new_vertices.append(part_vertices)
+            part_faces[:, :3] += vertnum
+            new_faces.append(part_faces)
+            vertnum += len(part_vertices)
+
+        faces = np.concatenate(new_faces)
+        used, remap = np.unique(faces[:, :3], return_inverse=True)
+        faces[:, :3] = remap.reshape(-1, 3)
+
+        lod = _bf2collod()
+        lod.coltype = COLTYPE(coltype)
+        lod.faces = faces.astype(np.uint16)
+        lod.facenum = len(faces)
+        lod.vertices = np.concatenate(new_vertices)[used].astype(np.float32)
+        lod.vertnum = len(used)
+        lod.vertids = np.zeros(lod.vertnum, dtype=np.uint16)
+        lod.u7 = self.u7
+        lod.rebuild_tree()
+        logging.debug('simplified %d faces to %s lod of %d faces' % (self.facenum, lod.coltype.name, lod.facenum))
+        _check_budget(lod, budget, strict)
+        return lod
+
+    def remap_materials(self, mapping):
+        for material in list(mapping.keys()) + list(mapping.values()):
+            if not 0 <= material <= 0xffff:
+                raise OverflowError('material %d can not be stored in collision face' % material)
+        if not self.facenum or not mapping: return
+        lookup = np.arange(max(int(self.faces[:, 3].max()), *mapping.keys()) + 1)
+        lookup[list(mapping.keys())] = list(mapping.values())
+        self.faces[:, 3] = lookup[self.faces[:, 3]]
+
+    def get_material_stats(self):
+        # (materials, faces counts, surface areas)
+        triangles = self.vertices[self.faces[:, :3]].astype(np.float64)
+        areas = 0.5 * np.linalg.norm(np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1)
+        materials, inverse, counts = np.unique(self.faces[:, 3], return_inverse=True, return_counts=True)
+        return materials.tolist(), counts.tolist(), np.bincount(inverse.ravel(), weights=areas, minlength=len(materials)).tolist()
+
+    def update_bounds(self):
+        if self.vertnum == 0: return
+        self.min = tuple(self.vertices.min(axis=0).tolist())
+        self.max = tuple(self.vertices.max(axis=0).tolist())
+        self.bmin = self.min
+        self.bmax = self.max
+
+    def rebuild_tree(self, leaf_faces=4):
+        '''
+        Regenerates ydata, zdata and adata from faces and vertices arrays
+        '''
+        self.update_bounds()
+        self._query_tree = None
+        self.ydata, self.zdata = build_tree(self.vertices, self.faces, leaf_faces=leaf_faces)
+        self.adata = build_adjacency(self.faces)
+        self.ynum = len(self.ydata)
+        self.znum = len(self.zdata)
+        self.anum = len(self.adata)
+
+    # queries use own tree, trees from files may be made by other tools with unknown faces placement.
+    # tree is built on first query and kept until lod is edited by its methods,
+    # call rebuild_tree after changing vertices or faces arrays directly
+    def get_query_tree(self):
+        if self._query_tree is None:
+            ydata, zdata = build_tree(self.vertices, self.faces)
+            self._query_tree = (ydata, zdata, tree_bounds(self.vertices, self.faces, ydata, zdata))
+        return self._query_tree
+
+    def raycast(self, origins, directions, max_distance=np.inf):
+        ydata, zdata, bounds = self.get_query_tree()
+        return raycast(self.vertices, self.faces, ydata, zdata, origins, directions, max_distance, bounds=bounds)
+
+    def closest_point(self, points):
+        ydata, zdata, bounds = self.get_query_tree()
+        return closest_point(self.vertices, self.faces, ydata, zdata, points, bounds=bounds)
+
+    def load(self, fo, version):
+        if version >= 9:
+            self.coltype = COLTYPE(read_long(fo))
+            logging.debug('lod.coltype = %s' % self.coltype.name)
+
+        self._query_tree = None
+        self.facenum = read_long(fo)
+        self.faces = read_array(fo, '<u2', self.facenum * 4).reshape(-1, 4)
+        logging.debug('lod.facenum = %d' % self.facenum)
+
+        self.vertnum = read_long(fo)
+        self.vertices = read_array(fo, '<f4', self.vertnum * 3).reshape(-1, 3)
+        self.vertids = read_array(fo, '<u2', self.vertnum)
+        logging.debug('lod.vertnum = %d' % self.vertnum)
+
+        self.min = read_float3(fo)
+        self.max = read_float3(fo)
+        self.u7 = read_byte(fo)
+        self.bmin = read_float3(fo)
+        self.bmax = read_float3(fo)
+
+        self.ynum = read_long(fo)
+        self.ydata = read_array(fo, YSTRUCT, self.ynum)
+        self.znum = read_long(fo)
+        self.zdata = read_array(fo, '<u2', self.znum)
+        if version >= 10:
+            self.anum = read_long(fo)
+            self.adata = read_array(fo, '<i4', self.anum)
+        logging.debug('lod.ynum = %d, lod.znum = %d, lod.anum = %d' % (self.ynum, self.znum, self.anum))
+
+    def export(self, fo, version):
+        if version >= 9:
+            write_long(fo, self.coltype)
+
+        write_long(fo, self.facenum)
+        write_array(fo, self.faces, '<u2')
+
+        write_long(fo, self.vertnum)
+        write_array(fo, self.vertices, '<f4')
+        write_array(fo, self.vertids, '<u2')
+
+        write_float3(fo, *self.min)
+        write_float3(fo, *self.max)
+        write_byte(fo, self.u7)
+        write_float3(fo, *self.bmin)
+        write_float3(fo, *self.bmax)
+
+        write_long(fo, self.ynum)
+        write_array(fo, self.ydata, YSTRUCT)
+        write_long(fo, self.znum)
+        write_array(fo, self.zdata, '<u2')
+        if version >= 10:
+            write_long(fo, self.anum)
+            write_array(fo, self.adata, '<i4')
+
+
+def _check_budget(lod, budget, strict=False):
+    # decimation stops early on locked or non manifold vertices, lod may stay over budget
+    if lod.facenum <= budget: return
+    message = '%s lod of %d faces is over budget of %d faces' % (lod.coltype.name, lod.facenum, budget)
+    if strict:
+        raise OverflowError(message)
+    logging.warning(message)
+
+def _pushed_out(vertices, faces, points):
+    # moves faces planes out along normals until every point is behind or on simplified surface
+    vertices = np.asarray(vertices, dtype=np.float64)
+    ydata, zdata = build_tree(vertices, faces)
+    closest, _, faceIds = closest_point(vertices, faces, ydata, zdata, points)
+    triangles = vertices[faces]
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lenghts = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lenghts, out=np.zeros_like(normals), where=lenghts > 0)
+    outside = np.einsum('ij,ij->i', points - closest, normals[faceIds])
+    distance = float(max(outside.max(), 0.0)) if len(outside) else 0.0
+    if distance == 0.0: return vertices
+
+    vertex_normals = np.zeros_like(vertices)
+    for axis in range(3):
+        np.add.at(vertex_normals, faces[:, axis], normals * lenghts)
+    vertex_normals /= np.maximum(np.linalg.norm(vertex_normals, axis=1, keepdims=True), 1e-12)
+    # vertex moved by distance / cos reaches distance along every adjacent face normal
+    cosines = np.ones(len(vertices))
+    for axis in range(3):
+        np.minimum.at(cosines, faces[:, axis], np.einsum('ij,ij->i', vertex_normals[faces[:, axis]], normals))
+    logging.debug('pushing simplified surface out by %f' % distance)
+    return vertices + vertex_normals * (distance / np.clip(cosines, 0.2, 1.0))[:, None]
+
+def generate_collisionmesh(vmesh, geomId=0, lodId=0, budgets=COLLISION_BUDGETS, materials=None, version=10, strict=False):
+    '''
+    Creates collision mesh from vmesh.geoms[geomId].lods[lodId], one lod per coltype in budgets.
+    materials maps visible material index to collision material id, unmapped materials get 0.
+    Lods over budget are logged, or raise OverflowError with strict
+    '''
+    logging.debug('generating collision mesh from %s geoms[%d].lods[%d]' % (vmesh.filename, geomId, lodId))
+    if materials is None: materials = {}
+    lod = vmesh.geoms[geomId].lods[lodId]
+    positions = vmesh.get_attribute_array(D3DDECLUSAGE.POSITION).astype(np.float64)
+    index = np.array(vmesh.index, dtype=np.int64)
+
+    # visible vertices are split on uv seams and hard edges, collision needs closed surface
+    welded, inverse = np.unique(np.round(positions / WELD_TOLERANCE), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    welded_positions = np.zeros((len(welded), 3))
+    welded_positions[inverse] = positions
+
+    materials_faces = []
+    for materialId, material in enumerate(lod.materials):
+        faces = inverse[index[material.istart:material.istart + material.inum].reshape(-1, 3) + material.vstart]
+        faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+        materials_faces.append(faces)
+    facenum = sum(len(faces) for faces in materials_faces)
+
+    # vertices shared by materials stay in place so materials regions stay connected
+    used_by = np.zeros(len(welded), dtype=np.int64)
+    for faces in materials_faces:
+        used_by[np.unique(faces)] += 1
+    locked = used_by > 1
+
+    # every coltype lod from same decimation run, one target per coltype
+    coltypes = sorted(budgets, key=lambda coltype: budgets[coltype], reverse=True)
+    ratios = [min(1.0, budgets[coltype] / facenum) if facenum else 1.0 for coltype in coltypes]
+    lods_faces = [[] for coltype in coltypes]
+    for materialId, faces in enumerate(materials_faces):
+        if not len(faces): continue
+        targets = [max(1, int(len(faces) * ratio)) for ratio in ratios]
+        simplified = simplify.decimate(welded_positions, faces, targets, locked=locked)
+        material = materials.get(materialId, 0)
+        for lod_faces, material_faces in zip(lods_faces, simplified):
+            lod_faces.append(np.column_stack([material_faces, np.full(len(material_faces), material)]))
+
+    colmesh = CollisionMesh()
+    colmesh.version = version
+    colmesh.geomnum = 1
+    colmesh.geoms = [_bf2colgeom()]
+    colmesh.geoms[0].subgeomnum = 1
+    colmesh.geoms[0].subgeoms = [_bf2colsubgeom()]
+    subgeom = colmesh.geoms[0].subgeoms[0]
+    for coltype in sorted(coltypes):
+        faces = np.concatenate(lods_faces[coltypes.index(coltype)] or [np.zeros((0, 4), dtype=np.int64)])
+        used, remap = np.unique(faces[:, :3], return_inverse=True)
+        faces[:, :3] = remap.reshape(-1, 3)
+        if len(used) > 0xffff + 1:
+            raise OverflowError('%d vertices can not be indexed by collision faces' % len(used))
+
+        collod = _bf2collod()
+        collod.coltype = COLTYPE(coltype)
+        collod.faces = faces.astype(np.uint16)
+        collod.facenum = len(faces)
+        collod.vertices = welded_positions[used].astype(np.float32)
+        collod.vertnum = len(used)
+        collod.vertids = np.zeros(collod.vertnum, dtype=np.uint16)
+        collod.u7 = U7
+        collod.rebuild_tree()
+        subgeom.lods.append(collod)
+        logging.debug('generated %s lod of %d faces, %d vertices' % (collod.coltype.name, collod.facenum, collod.vertnum))
+        _check_budget(collod, budgets[coltype], strict)
+    subgeom.lodnum = len(subgeom.lods)
+    return colmesh
+
+def generate_collisionmesh_batch(filenames, overwrite=False, **kwargs):
+    '''
+    Generates sibling .collisionmesh for every visible mesh file, returns collision mesh filename by filename
+    '''
+    report = {}
+    for filename in filenames:
+        colfilename = os.path.splitext(filename)[0] + '.collisionmesh'
+        if os.path.exists(colfilename) and not overwrite:
+            logging.info('%s: skipping, %s exists' % (filename, colfilename))
+            continue
+        with VisibleMesh(filename) as vmesh:
+            colmesh = generate_collisionmesh(vmesh, **kwargs)
+        colmesh.export(colfilename)
+        report[filename] = colfilename
+        logging.info('%s: generated %s' % (filename, colfilename))
+    return report
@@ -0,0 +1,317 @@
+import logging
+
+import numpy as np
+
+from .collisiontree import AXIS_MASK
+from .collisiontree import LEFT_LEAF
+from .collisiontree import RIGHT_LEAF
+
+# batched queries against collision lod tree
+# all rays\points are walked through tree together, every step takes whole frontier
+# of (query, node) pairs, so python overhead depends on tree depth, not on queries count
+
+EPSILON = 1e-6
+CHUNK = 1024
+
+def _expand(owners, starts, counts):
+    # flattens variable sized zdata ranges into (owner, zdata index) pairs
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if total == 0: return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    repeated = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners[repeated], starts[repeated] + offsets
+
+def _children(ydata, nodes, side):
+    flags = ydata['flags'][nodes]
+    is_leaf = (flags & (LEFT_LEAF if side == 0 else RIGHT_LEAF)) != 0
+    child = ydata['left' if side == 0 else 'right'][nodes].astype(np.int64)
+    count = (ydata['counts'][nodes].astype(np.int64) >> (8 * side)) & 0xff
+    return is_leaf, child, count
+
+def _children_bounds(ydata, zdata, faces_min, faces_max):
+    # bounds of faces under each child of every node, (ynum, 2, 3), turns kd-tree into bvh for pruning
+    bounds_min = np.full((len(ydata), 2, 3), np.inf)
+    bounds_max = np.full((len(ydata), 2, 3), -np.inf)
+    nodes = np.arange(len(ydata))
+    for side in range(2):
+        is_leaf, child, count = _children(ydata, nodes, side)
+        owners, zids = _expand(nodes[is_leaf], child[is_leaf], count[is_leaf])
+        faceIds = zdata[zids].astype(np.int64)
+        np.minimum.at(bounds_min[:, side], owners, faces_min[faceIds])
+        np.maximum.at(bounds_max[:, side], owners, faces_max[faceIds])
+    # children always follow parent in preorder, so reversed walk sees them first
+    for nodeId in reversed(range(len(ydata))):
+        for side, flag, key in [(0, LEFT_LEAF, 'left'), (1, RIGHT_LEAF, 'right')]:
+            if ydata['flags'][nodeId] & flag: continue
+            child = ydata[key][nodeId]
+            bounds_min[nodeId, side] = bounds_min[child].min(axis=0)
+            bounds_max[nodeId, side] = bounds_max[child].max(axis=0)
+    return bounds_min, bounds_max
+
+def intersect_triangles(origins, directions, a, b, c):
+    '''
+    Moller-Trumbore for paired rays and triangles, double sided, returns ray parameter or inf
+    '''
+    e1 = b - a
+    e2 = c - a
+    p = np.cross(directions, e2)
+    det = np.einsum('ij,ij->i', e1, p)
+    valid = np.abs(det) > EPSILON * EPSILON
+    inv = np.divide(1.0, det, out=np.zeros_like(det), where=valid)
+    s = origins - a
+    u = np.einsum('ij,ij->i', s, p) * inv
+    q = np.cross(s, e1)
+    v = np.einsum('ij,ij->i', directions, q) * inv
+    t = np.einsum('ij,ij->i', e2, q) * inv
+    hit = valid & (u >= -EPSILON) & (v >= -EPSILON) & (u + v <= 1.0 + EPSILON) & (t >= 0.0)
+    return np.where(hit, t, np.inf)
+
+def closest_on_triangles(points, a, b, c):
+    '''
+    Closest points on paired triangles, Ericson's region tests vectorized
+    '''
+    def dot(x, y): return np.einsum('ij,ij->i', x, y)
+
+    ab, ac, ap = b - a, c - a, points - a
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    bp = points - b
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    cp = points - c
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    # interior by default, regions below override it in reverse priority
+    denom = va + vb + vc
+    denom = np.where(np.abs(denom) > 0.0, denom, 1.0)
+    v = vb / denom
+    w = vc / denom
+    result = a + ab * v[:, None] + ac * w[:, None]
+
+    def region(mask, value):
+        result[mask] = value[mask]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # edge bc
+        mask = (va <= 0.0) & ((d4 - d3) >= 0.0) & ((d5 - d6) >= 0.0)
+        w = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        region(mask, b + (c - b) * np.nan_to_num(w)[:, None])
+        # edge ac
+        mask = (vb <= 0.0) & (d2 >= 0.0) & (d6 <= 0.0)
+        w = d2 / (d2 - d6)
+        region(mask, a + ac * np.nan_to_num(w)[:, None])
+        # edge ab
+        mask = (vc <= 0.0) & (d1 >= 0.0) & (d3 <= 0.0)
+        v = d1 / (d1 - d3)
+        region(mask, a + ab * np.nan_to_num(v)[:, None])
+    # vertices
+    region((d6 >= 0.0) & (d5 <= d6), c)
+    region((d3 >= 0.0) & (d4 <= d3), b)
+    region((d1 <= 0.0) & (d2 <= 0.0), a)
+    return result
+
+def tree_bounds(vertices, faces, ydata, zdata):
+    '''
+    (bounds_min, bounds_max) of faces under every node child, can be passed to queries
+    to skip computing them on every call
+    '''
+    triangles = np.asarray(vertices, dtype=np.float64)[np.asarray(faces)[:, :3].astype(np.int64)]
+    return _children_bounds(ydata, zdata, triangles.min(axis=1), triangles.max(axis=1))
+
+def raycast(vertices, faces, ydata, zdata, origins, directions, max_distance=np.inf, bounds=None):
+    '''
+    Nearest hit of every ray, returns (distances, face ids), inf and -1 for misses.
+    Directions are normalized so distances are in mesh units
+    '''
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces)[:, :3].astype(np.int64)
+    origins = np.atleast_2d(np.asarray(origins, dtype=np.float64))
+    directions = np.atleast_2d(np.asarray(directions, dtype=np.float64))
+    directions = np.broadcast_to(directions, origins.shape)
+    lenghts = np.linalg.norm(directions, axis=1)
+    directions = np.divide(directions, lenghts[:, None], out=np.zeros_like(directions), where=lenghts[:, None] > 0)
+
+    raynum = len(origins)
+    best = np.full(raynum, float(max_distance))
+    best_face = np.full(raynum, -1, dtype=np.int64)
+    if len(ydata) == 0 or len(faces) == 0: return np.full(raynum, np.inf), best_face
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = 1.0 / directions
+
+    def clip(rays, box_min, box_max):
+        # ray parameter interval inside boxes, empty if enter > exit
+        with np.errstate(invalid='ignore'):
+            t1 = (box_min - origins[rays]) * inverse[rays]
+            t2 = (box_max - origins[rays]) * inverse[rays]
+        t1 = np.where(np.isnan(t1), -np.inf, t1)
+        t2 = np.where(np.isnan(t2), np.inf, t2)
+        return np.minimum(t1, t2).max(axis=1), np.maximum(t1, t2).min(axis=1)
+
+    # clip rays by root box
+    rays = np.arange(raynum)
+    t_enter, t_exit = clip(rays, vertices[faces].min(axis=(0, 1)) - EPSILON, vertices[faces].max(axis=(0, 1)) + EPSILON)
+    t_enter = np.maximum(t_enter, 0.0)
+    t_exit = np.minimum(t_exit, best)
+
+    # children faces bounds instead of split planes, tighter than half spaces so fewer nodes are visited
+    if bounds is None: bounds = tree_bounds(vertices, faces, ydata, zdata)
+    bounds_min, bounds_max = bounds
+    rays = np.flatnonzero(t_enter <= t_exit)
+    nodes = np.zeros(len(rays), dtype=np.int64)
+    t0, t1 = t_enter[rays], t_exit[rays]
+    steps = 0
+    while len(rays):
+        steps += 1
+        candidate_rays, candidate_starts, candidate_counts = [], [], []
+        next_rays, next_nodes, next_t0, next_t1 = [], [], [], []
+        for side in range(2):
+            lo, hi = clip(rays, bounds_min[nodes, side] - EPSILON, bounds_max[nodes, side] + EPSILON)
+            lo_side = np.maximum(t0, lo)
+            hi_side = np.minimum(np.minimum(t1, hi), best[rays])
+            visit = (lo_side <= hi_side) & np.all(bounds_min[nodes, side] <= bounds_max[nodes, side], axis=1)
+
+            is_leaf, child, count = _children(ydata, nodes, side)
+            leafs = visit & is_leaf
+            candidate_rays.append(rays[leafs])
+            candidate_starts.append(child[leafs])
+            candidate_counts.append(count[leafs])
+            inner = visit & ~is_leaf
+            next_rays.append(rays[inner])
+            next_nodes.append(child[inner])
+            next_t0.append(lo_side[inner])
+            next_t1.append(hi_side[inner])
+
+        owners, zids = _expand(np.concatenate(candidate_rays), np.concatenate(candidate_starts), np.concatenate(candidate_counts))
+        if len(owners):
+            faceIds = zdata[zids].astype(np.int64)
+            triangles = vertices[faces[faceIds]]
+            t = intersect_triangles(origins[owners], directions[owners], triangles[:, 0], triangles[:, 1], triangles[:, 2])
+            closer = t < best[owners]
+            if closer.any():
+                owners, faceIds, t = owners[closer], faceIds[closer], t[closer]
+                # keep nearest per ray
+                order = np.lexsort((t, owners))
+                owners, faceIds, t = owners[order], faceIds[order], t[order]
+                first = np.ones(len(owners), dtype=bool)
+                first[1:] = owners[1:] != owners[:-1]
+                best[owners[first]] = t[first]
+                best_face[owners[first]] = faceIds[first]
+
+        rays = np.concatenate(next_rays)
+        nodes = np.concatenate(next_nodes)
+        t0 = np.concatenate(next_t0)
+        t1 = np.concatenate(next_t1)
+        # drop pairs starting behind already found hit
+        keep = t0 <= best[rays]
+        rays, nodes, t0, t1 = rays[keep], nodes[keep], t0[keep], t1[keep]
+
+    logging.debug('raycasted %d rays in %d steps, %d hits' % (raynum, steps, int((best_face >= 0).sum())))
+    best[best_face < 0] = np.inf
+    return best, best_face
+
+def closest_point(vertices, faces, ydata, zdata, points, chunk=CHUNK, bounds=None):
+    '''
+    Closest surface point for every point, returns (positions, distances, face ids)
+    '''
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces)[:, :3].astype(np.int64)
+    points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+    pointnum = len(points)
+    if len(ydata) == 0 or len(faces) == 0:
+        return np.full((pointnum, 3), np.nan), np.full(pointnum, np.inf), np.full(pointnum, -1, dtype=np.int64)
+
+    triangles = vertices[faces]
+    faces_min, faces_max = triangles.min(axis=1), triangles.max(axis=1)
+    bounds_min, bounds_max = bounds if bounds is not None else _children_bounds(ydata, zdata, faces_min, faces_max)
+
+    # far points visit large part of tree, chunks keep frontier memory bounded
+    results = [_closest_point(triangles, faces_min, faces_max, ydata, zdata, bounds_min, bounds_max, points[start:start + chunk])
+               for start in range(0, pointnum, chunk)]
+    logging.debug('found closest points for %d points' % pointnum)
+    return tuple(np.concatenate(arrays) for arrays in zip(*results))
+
+def _closest_point(triangles, faces_min, faces_max, ydata, zdata, bounds_min, bounds_max, points):
+    pointnum = len(points)
+    best = np.full(pointnum, np.inf)
+    best_face = np.full(pointnum, -1, dtype=np.int64)
+    best_position = np.full((pointnum, 3), np.nan)
+
+    def box_distance(owners, faceIds):
+        gap = np.maximum(np.maximum(faces_min[faceIds] - points[owners], points[owners] - faces_max[faceIds]), 0.0)
+        return np.linalg.norm(gap, axis=1)
+
+    def nearest(owners, values):
+        # mask of smallest value per owner
+        first = np.zeros(len(owners), dtype=bool)
+        if not len(owners): return first
+        order = np.lexsort((values, owners))
+        first[order[np.r_[True, owners[order][1:] != owners[order][:-1]]]] = True
+        return first
+
+    def test_triangles(owners, faceIds):
+        closest = closest_on_triangles(points[owners], triangles[faceIds, 0], triangles[faceIds, 1], triangles[faceIds, 2])
+        distances = np.linalg.norm(closest - points[owners], axis=1)
+        closer = distances < best[owners]
+        owners, faceIds, distances, closest = owners[closer], faceIds[closer], distances[closer], closest[closer]
+        first = nearest(owners, distances)
+        best[owners[first]] = distances[first]
+        best_face[owners[first]] = faceIds[first]
+        best_position[owners[first]] = closest[first]
+
+    def test_faces(owners, faceIds):
+        # cheap faces boxes test first, then triangle with nearest box tightens bound for the rest
+        distances = box_distance(owners, faceIds)
+        keep = distances <= best[owners]
+        owners, faceIds, distances = owners[keep], faceIds[keep], distances[keep]
+        if not len(owners): return
+        first = nearest(owners, distances)
+        test_triangles(owners[first], faceIds[first])
+        rest = ~first & (distances <= best[owners])
+        if rest.any(): test_triangles(owners[rest], faceIds[rest])
+
+    # first descent only to leaf containing point, gives upper bound for pruning
+    queries = np.arange(pointnum)
+    nodes = np.zeros(pointnum, dtype=np.int64)
+    while len(queries):
+        axis = (ydata['flags'][nodes] & AXIS_MASK).astype(np.int64)
+        side = (points[queries, axis] > ydata['split'][nodes]).astype(np.int64)
+        next_queries, next_nodes = [], []
+        for value in range(2):
+            mask = side == value
+            is_leaf, child, count = _children(ydata, nodes[mask], value)
+            owners, zids = _expand(queries[mask][is_leaf], child[is_leaf], count[is_leaf])
+            if len(owners): test_faces(owners, zdata[zids].astype(np.int64))
+            next_queries.append(queries[mask][~is_leaf])
+            next_nodes.append(child[~is_leaf])
+        queries = np.concatenate(next_queries)
+        nodes = np.concatenate(next_nodes)
+
+    # frontier of (point, node), pruned by distance from point to faces bounds under child
+    queries = np.arange(pointnum)
+    nodes = np.zeros(pointnum, dtype=np.int64)
+    while len(queries):
+        candidate_owners, candidate_starts, candidate_counts = [], [], []
+        next_queries, next_nodes = [], []
+        for side in range(2):
+            gap = np.maximum(np.maximum(bounds_min[nodes, side] - points[queries], points[queries] - bounds_max[nodes, side]), 0.0)
+            visit = np.linalg.norm(gap, axis=1) <= best[queries]
+            is_leaf, child, count = _children(ydata, nodes, side)
+            leafs = visit & is_leaf
+            candidate_owners.append(queries[leafs])
+            candidate_starts.append(child[leafs])
+            candidate_counts.append(count[leafs])
+            inner = visit & ~is_leaf
+            next_queries.append(queries[inner])
+            next_nodes.append(child[inner])
+
+        owners, zids = _expand(np.concatenate(candidate_owners), np.concatenate(candidate_starts), np.concatenate(candidate_counts))
+        if len(owners): test_faces(owners, zdata[zids].astype(np.int64))
+
+        queries = np.concatenate(next_queries)
+        nodes = np.concatenate(next_nodes)
+
+    return best_position, best, best_face
@@ -0,0 +1,239 @@
+import logging
+
+import numpy as np
+
+# collision lod acceleration data
+#   ydata - kd-tree nodes, root is ydata[0], see YSTRUCT
+#   zdata - faces ids of leafs, leaf is zdata[start:start + count]
+#   adata - neighbour face for every face edge(v1-v2, v2-v3, v3-v1), -1 if none
+# faces crossing split plane go to both childs, faces lying on plane go to left.
+# leafs over 255 faces are split at centroids median, more faces than that crossing
+# same spot can not be stored at all
+
+# ystruct, collision tree node
+#   split - plane position on axis
+#   flags - bits 0-1 split axis, bit 2 left child is leaf, bit 3 right child is leaf
+#   counts - faces in left leaf(low byte) and right leaf(high byte)
+#   left, right - node index or zdata start of leaf faces
+YSTRUCT = np.dtype([
+    ('split', '<f4'),
+    ('flags', '<u2'),
+    ('counts', '<u2'),
+    ('left', '<i4'),
+    ('right', '<i4'),
+    ])
+
+AXIS_MASK = 0x3
+LEFT_LEAF = 0x4
+RIGHT_LEAF = 0x8
+MAX_LEAF_FACES = 0xff  # leaf size is stored as byte
+
+TRAVERSAL_COST = 1.0
+BINS = 16
+FRACTIONS = np.arange(1, BINS) / BINS
+
+
+def face_bounds(vertices, faces):
+    triangles = np.asarray(vertices, dtype=np.float64)[np.asarray(faces)[:, :3].astype(np.int64)]
+    return triangles.min(axis=1), triangles.max(axis=1)
+
+def _surface_area(extents):
+    dx, dy, dz = np.maximum(np.asarray(extents, dtype=np.float64), 1e-6).T
+    return 2.0 * (dx * dy + dy * dz + dz * dx)
+
+def _sides(fmin, fmax, split):
+    left = (fmin < split) | (fmax <= split)
+    right = fmax > split
+    return left, right
+
+def _best_split(faceIds, fmin, fmax, box_min, box_max):
+    # binned SAH over all axes at once, returns (cost, axis, split) for cheapest plane
+    extents = box_max - box_min
+    scale = np.divide(BINS, extents, out=np.zeros_like(extents), where=extents > 0.0)
+    lo = np.minimum(np.maximum((fmin[faceIds] - box_min) * scale, 0.0), BINS - 1).astype(np.int64)
+    hi = np.minimum(np.maximum((fmax[faceIds] - box_min) * scale, 0.0), BINS - 1).astype(np.int64)
+    shift = np.arange(3) * BINS
+    left_count = np.cumsum(np.bincount((lo + shift).ravel(), minlength=3 * BINS).reshape(3, BINS), axis=1)[:, :-1]
+    right_count = len(faceIds) - np.cumsum(np.bincount((hi + shift).ravel(), minlength=3 * BINS).reshape(3, BINS), axis=1)[:, :-1]
+
+    # candidate planes are inner bins borders, (3, BINS - 1), areas of boxes cut on each axis
+    fractions = FRACTIONS
+    extents = np.maximum(extents, 1e-6)
+    others_sum = extents.sum() - extents
+    others_product = np.array([extents[1] * extents[2], extents[0] * extents[2], extents[0] * extents[1]])
+    left_area = 2.0 * (extents[:, None] * fractions * others_sum[:, None] + others_product[:, None])
+    right_area = 2.0 * (extents[:, None] * (1.0 - fractions) * others_sum[:, None] + others_product[:, None])
+    costs = TRAVERSAL_COST + (left_area * left_count + right_area * right_count) / _surface_area(extents)
+    costs[box_max - box_min <= 0.0] = np.inf
+    axis, candidate = np.unravel_index(int(np.argmin(costs)), costs.shape)
+    return float(costs[axis, candidate]), int(axis), float(box_min[axis] + (box_max[axis] - box_min[axis]) * fractions[candidate])
+
+def build_tree(vertices, faces, leaf_faces=4, max_depth=32):
+    '''
+    Builds ydata and zdata arrays for collision lod with SAH splits
+    '''
+    faces = np.asarray(faces)
+    if len(faces) == 0:
+        return np.zeros(0, dtype=YSTRUCT), np.zeros(0, dtype=np.uint16)
+    if len(faces) > 0xffff + 1:
+        raise OverflowError('%d faces can not be indexed by zdata' % len(faces))
+    fmin, fmax = face_bounds(vertices, faces)
+
+    nodes = []
+    zdata = []
+    zcount = 0
+
+    def should_split(faceIds, box_min, box_max, depth):
+        if len(faceIds) <= leaf_faces or depth >= max_depth: return None
+        # costs are estimated on faces bounds clipped to node, so empty space is not cut off forever
+        box_min = np.maximum(box_min, fmin[faceIds].min(axis=0))
+        box_max = np.minimum(box_max, fmax[faceIds].max(axis=0))
+        cost, axis, split = _best_split(faceIds, fmin, fmax, box_min, box_max)
+        left, right = _sides(fmin[faceIds, axis], fmax[faceIds, axis], split)
+        # child keeping every face would repeat itself down to max_depth around shared vertices
+        if left.all() or right.all(): return None
+        if cost >= len(faceIds) and len(faceIds) <= MAX_LEAF_FACES: return None
+        return axis, split
+
+    def median_split(faceIds):
+        # leaf too big for its byte count, any plane leaving both childs smaller will do
+        centers = (fmin[faceIds] + fmax[faceIds]) / 2
+        best, best_size = None, len(faceIds)
+        for axis in range(3):
+            split = float(np.median(centers[:, axis]))
+            left, right = _sides(fmin[faceIds, axis], fmax[faceIds, axis], split)
+            size = max(left.sum(), right.sum())
+            if size < best_size: best, best_size = (axis, split), size
+        if best is None:
+            raise OverflowError('%d faces cross same spot, can not split them into leafs of %d faces' % (len(faceIds), MAX_LEAF_FACES))
+        logging.debug('splitting %d faces leaf at median' % len(faceIds))
+        return best
+
+    def make_node(faceIds, box_min, box_max, depth, plane):
+        nonlocal zcount
+        if plane is None:
+            # root have to be node, splitting at middle of largest axis
+            axis = int(np.argmax(box_max - box_min))
+            plane = (axis, float((box_min[axis] + box_max[axis]) / 2))
+        axis, split = plane
+        left, right = _sides(fmin[faceIds, axis], fmax[faceIds, axis], split)
+
+        nodeId = len(nodes)
+        node = {'split': split, 'flags': axis, 'counts': 0, 'left': 0, 'right': 0}
+        nodes.append(node)
+
+        childs = []
+        for side, childIds in enumerate([faceIds[left], faceIds[right]]):
+            child_min, child_max = box_min.copy(), box_max.copy()
+            if side == 0: child_max[axis] = split
+            else: child_min[axis] = split
+            child_plane = should_split(childIds, child_min, child_max, depth + 1)
+            if child_plane is None and len(childIds) > MAX_LEAF_FACES:
+                child_plane = median_split(childIds)
+            if child_plane is None:
+                node['flags'] |= LEFT_LEAF if side == 0 else RIGHT_LEAF
+                node['counts'] |= len(childIds) << (8 * side)
+                node['left' if side == 0 else 'right'] = zcount
+                zdata.append(childIds)
+                zcount += len(childIds)
+            else:
+                childs.append((side, childIds, child_min, child_max, child_plane))
+
+        for side, childIds, child_min, child_max, child_plane in childs:
+            node['left' if side == 0 else 'right'] = make_node(childIds, child_min, child_max, depth + 1, child_plane)
+        return nodeId
+
+    faceIds = np.arange(len(faces))
+    root_min, root_max = fmin.min(axis=0), fmax.max(axis=0)
+    make_node(faceIds, root_min, root_max, 0, should_split(faceIds, root_min, root_max, 0))
+
+    ydata = np.zeros(len(nodes), dtype=YSTRUCT)
+    for key in YSTRUCT.names:
+        ydata[key] = [node[key] for node in nodes]
+    zdata = np.concatenate(zdata).astype(np.uint16)
+    logging.debug('built collision tree of %d nodes, %d leaf faces for %d faces' % (len(ydata), len(zdata), len(faces)))
+    return ydata, zdata
+
+def translate_tree(ydata, offset):
+    '''
+    Moves split planes with vertices, tree stays valid
+    '''
+    ydata = ydata.copy()
+    axis = ydata['flags'] & AXIS_MASK
+    ydata['split'] += np.asarray(offset, dtype=np.float32)[axis]
+    return ydata
+
+def rotate_tree(ydata, matrix, epsilon=1e-6):
+    '''
+    Remaps split planes for rotations by multiples of 90 degrees, None for any other rotation
+    '''
+    matrix = np.asarray(matrix, dtype=np.float64)
+    signs = np.round(matrix)
+    if np.abs(matrix - signs).max() > epsilon or np.any(np.abs(signs).sum(axis=0) != 1): return None
+
+    ydata = ydata.copy()
+    axis = (ydata['flags'] & AXIS_MASK).astype(np.int64)
+    new_axis = np.argmax(np.abs(signs), axis=0)[axis]
+    sign = signs[new_axis, axis]
+    ydata['split'] = ydata['split'] * sign
+    ydata['flags'] = (ydata['flags'] & ~np.uint16(AXIS_MASK)) | new_axis
+
+    # mirrored axis swaps sides of node
+    mirrored = sign < 0
+    flags = ydata['flags'][mirrored]
+    counts = ydata['counts'][mirrored]
+    left = ydata['left'][mirrored]
+    ydata['left'][mirrored] = ydata['right'][mirrored]
+    ydata['right'][mirrored] = left
+    ydata['flags'][mirrored] = (flags & ~np.uint16(LEFT_LEAF | RIGHT_LEAF)) | ((flags & LEFT_LEAF) << 1) | ((flags & RIGHT_LEAF) >> 1)
+    ydata['counts'][mirrored] = ((counts & 0xff) << 8) | (counts >> 8)
+    return ydata
+
+def build_adjacency(faces):
+    '''
+    adata array, neighbour face for each edge of every face
+    '''
+    faces = np.asarray(faces)[:, :3].astype(np.int64)
+    facenum = len(faces)
+    edges = np.stack([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]], axis=1).reshape(-1, 2)
+    edges.sort(axis=1)
+
+    # group same edges, each edge points to next face in its group
+    order = np.lexsort((edges[:, 1], edges[:, 0]))
+    sorted_edges = edges[order]
+    group_start = np.ones(len(order), dtype=bool)
+    group_start[1:] = np.any(sorted_edges[1:] != sorted_edges[:-1], axis=1)
+    groups = np.cumsum(group_start) - 1
+    starts = np.flatnonzero(group_start)
+    sizes = np.diff(np.append(starts, len(order)))
+
+    position = np.arange(len(order))
+    following = position + 1
+    last = following == np.append(starts[1:], len(order))[groups]
+    following[last] = starts[groups[last]]
+
+    adata = np.full(facenum * 3, -1, dtype=np.int32)
+    shared = sizes[groups] > 1
+    adata[order[shared]] = order[following[shared]] // 3
+    return adata
+
+def traverse(ydata, zdata, box_min, box_max):
+    '''
+    Faces ids from all leafs overlapping given box
+    '''
+    found = []
+    if len(ydata) == 0: return np.zeros(0, dtype=np.int64)
+    stack = [0]
+    while stack:
+        node = ydata[stack.pop()]
+        axis = node['flags'] & AXIS_MASK
+        for side, leaf_flag, key in [(0, LEFT_LEAF, 'left'), (1, RIGHT_LEAF, 'right')]:
+            if side == 0 and box_min[axis] > node['split']: continue
+            if side == 1 and box_max[axis] < node['split']: continue
+            if node['flags'] & leaf_flag:
+                count = (int(node['counts']) >> (8 * side)) & 0xff
+                found.append(zdata[node[key]:node[key] + count])
+            else:
+                stack.append(int(node[key]))
+    if not found: return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(found).astype(np.int64))
@@ -0,0 +1,123 @@
+import os
+import logging
+from functools import partial
+
+import numpy as np
+
+from . import batch
+from .bf2types import D3DDECLUSAGE
+from .index import find_meshes
+from .visiblemesh import VisibleMesh
+
+# full difference of two visible meshes, unlike __eq__ methods does not stop at first mismatch
+#   report = diff('a/evil_box.staticmesh', 'b/evil_box.staticmesh', tolerance=1e-5)
+#   report['fields'] - [(path, a value, b value)] for every differing table field
+#   report['vertices'] - {material path: {'max', 'mean', 'changed', 'attributes'}} of materials with same vnum
+
+TOLERANCE = 1e-6
+
+HEAD_FIELDS = ['u1', 'version', 'u3', 'u4', 'u5']
+MESH_FIELDS = ['u1', 'geomnum', 'vertattribnum', 'vertformat', 'vertstride', 'vertnum', 'indexnum', 'u2']
+ATTRIB_FIELDS = ['flag', 'offset', 'vartype', 'usage']
+LOD_FIELDS = ['min', 'max', 'pivot', 'rignum', 'nodenum', 'nodes', 'matnum']
+MATERIAL_FIELDS = ['alphamode', 'fxfile', 'technique', 'mapnum', 'maps', 'vstart', 'istart', 'inum', 'vnum', 'u4', 'u5', 'mmin', 'mmax']
+
+def _same(a, b, tolerance):
+    # floats and nested float sequences compared with tolerance, rest exactly
+    if isinstance(a, float) or isinstance(b, float) or (isinstance(a, (tuple, list)) and a and not isinstance(a[0], bytes)):
+        try:
+            a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+        except (TypeError, ValueError):
+            return a == b
+        return a.shape == b.shape and bool(np.all(np.abs(a - b) <= tolerance))
+    return a == b
+
+def _compare(fields, path, a, b, names, tolerance):
+    for name in names:
+        value_a, value_b = getattr(a, name, None), getattr(b, name, None)
+        if not _same(value_a, value_b, tolerance):
+            fields.append(('%s%s' % (path, name), value_a, value_b))
+
+def _vertices_delta(vmesh_a, vmesh_b, material_a, material_b, vertices_a, vertices_b, tolerance):
+    rows_a = vertices_a[material_a.vstart:material_a.vstart + material_a.vnum]
+    rows_b = vertices_b[material_b.vstart:material_b.vstart + material_b.vnum]
+    positions = (vmesh_a.get_attribute_array(D3DDECLUSAGE.POSITION, rows_a).astype(np.float64)
+                 - vmesh_b.get_attribute_array(D3DDECLUSAGE.POSITION, rows_b))
+    errors = np.linalg.norm(positions, axis=1)
+    changed = errors > tolerance
+
+    attributes = {}
+    for attrib in vmesh_a.vertex_attributes:
+        usage = attrib.usage
+        if usage == D3DDECLUSAGE.POSITION or vmesh_a.get_attribute(usage) is None or vmesh_b.get_attribute(usage) is None: continue
+        columns_a = vmesh_a.get_attribute_array(usage, rows_a)
+        columns_b = vmesh_b.get_attribute_array(usage, rows_b)
+        if columns_a.shape != columns_b.shape: continue
+        deltas = np.abs(columns_a.astype(np.float64) - columns_b).max(axis=1) if len(rows_a) else np.zeros(0)
+        changed |= deltas > tolerance
+        attributes[D3DDECLUSAGE(usage).name] = float(deltas.max()) if len(deltas) else 0.0
+    return {
+        'max': float(errors.max()) if len(errors) else 0.0,
+        'mean': float(errors.mean()) if len(errors) else 0.0,
+        'changed': int(changed.sum()),
+        'attributes': attributes,
+        }
+
+def diff(a, b, tolerance=TOLERANCE):
+    '''
+    Every differing header, geom, lod, material and vertex attribute field of two meshes,
+    plus per material vertex deltas. Meshes or filenames accepted
+    '''
+    vmesh_a = VisibleMesh(a) if isinstance(a, str) else a
+    vmesh_b = VisibleMesh(b) if isinstance(b, str) else b
+    fields = []
+    vertices = {}
+
+    _compare(fields, 'head.', vmesh_a.head, vmesh_b.head, HEAD_FIELDS, tolerance)
+    _compare(fields, '', vmesh_a, vmesh_b, MESH_FIELDS, tolerance)
+    for attribId, (attrib_a, attrib_b) in enumerate(zip(vmesh_a.vertex_attributes, vmesh_b.vertex_attributes)):
+        _compare(fields, 'vertex_attributes[%d].' % attribId, attrib_a, attrib_b, ATTRIB_FIELDS, tolerance)
+
+    sameLayout = [(attrib.flag, attrib.offset, attrib.vartype, attrib.usage) for attrib in vmesh_a.vertex_attributes] == \
+                 [(attrib.flag, attrib.offset, attrib.vartype, attrib.usage) for attrib in vmesh_b.vertex_attributes]
+    vertices_a = vmesh_a.get_vertices_array()
+    vertices_b = vmesh_b.get_vertices_array() if sameLayout else None
+    index_a = np.array(vmesh_a.index, dtype=np.int64)
+    index_b = np.array(vmesh_b.index, dtype=np.int64)
+
+    for geomId, (geom_a, geom_b) in enumerate(zip(vmesh_a.geoms, vmesh_b.geoms)):
+        _compare(fields, 'geoms[%d].' % geomId, geom_a, geom_b, ['lodnum'], tolerance)
+        for lodId, (lod_a, lod_b) in enumerate(zip(geom_a.lods, geom_b.lods)):
+            path = 'geoms[%d].lods[%d].' % (geomId, lodId)
+            _compare(fields, path, lod_a, lod_b, LOD_FIELDS, tolerance)
+            for rigId, (rig_a, rig_b) in enumerate(zip(lod_a.rigs, lod_b.rigs)):
+                _compare(fields, '%srigs[%d].' % (path, rigId), rig_a, rig_b, ['bonenum'], tolerance)
+                for boneId, (bone_a, bone_b) in enumerate(zip(rig_a.bones, rig_b.bones)):
+                    _compare(fields, '%srigs[%d].bones[%d].' % (path, rigId, boneId), bone_a, bone_b, ['id', 'matrix'], tolerance)
+            for materialId, (material_a, material_b) in enumerate(zip(lod_a.materials, lod_b.materials)):
+                material_path = '%smaterials[%d]' % (path, materialId)
+                _compare(fields, material_path + '.', material_a, material_b, MATERIAL_FIELDS, tolerance)
+                if material_a.inum == material_b.inum:
+                    faces_a = index_a[material_a.istart:material_a.istart + material_a.inum]
+                    faces_b = index_b[material_b.istart:material_b.istart + material_b.inum]
+                    if not np.array_equal(faces_a, faces_b):
+                        fields.append((material_path + '.index', int((faces_a != faces_b).sum()), material_a.inum))
+                if sameLayout and material_a.vnum == material_b.vnum:
+                    delta = _vertices_delta(vmesh_a, vmesh_b, material_a, material_b, vertices_a, vertices_b, tolerance)
+                    if delta['changed']: vertices[material_path] = delta
+
+    logging.debug('%s vs %s: %d fields and %d materials vertices differ' % (vmesh_a.filename, vmesh_b.filename, len(fields), len(vertices)))
+    return {'fields': fields, 'vertices': vertices}
+
+def _diff_counterpart(filename, root_a, root_b, tolerance):
+    report = diff(filename, os.path.join(root_b, os.path.relpath(filename, root_a)), tolerance)
+    return report if report['fields'] or report['vertices'] else None
+
+def diff_trees(root_a, root_b, tolerance=TOLERANCE, workers=None):
+    '''
+    Diffs every mesh under root_a against same relative path under root_b on process pool,
+    returns (reports of differing meshes, errors) by filename
+    '''
+    operation = partial(_diff_counterpart, root_a=root_a, root_b=root_b, tolerance=tolerance)
+    results, errors = batch.run(operation, find_meshes(root_a), workers=workers, progress=None)
+    return {filename: report for filename, report in results.items() if report}, errors
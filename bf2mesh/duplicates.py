@@ -0,0 +1,152 @@
+import os
+import mmap
+import logging
+import hashlib
+
+import numpy as np
+
+from . import batch
+from .bf2types import D3DDECLUSAGE, USED
+from .index import read_tables, find_meshes
+
+# content hashes of visible meshes and duplicates search over mod
+# material hash covers its vertices and indices slices with vertex layout and material strings,
+# geom hash covers its lods materials hashes, both do not depend on where data lays in file.
+# near duplicates candidates share topology hash of geoms\lods\materials layout and indices,
+# candidates are confirmed by max distance between their positions
+
+TOLERANCE = 1e-3  # meters
+DIGEST_SIZE = 16
+
+ATTRIBUTE = np.dtype([
+    ('flag', '<u2'),
+    ('offset', '<u2'),
+    ('vartype', '<u2'),
+    ('usage', '<u2'),
+    ])
+
+def _digest(*chunks):
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _strings(material):
+    # length prefixed so ('ab', 'c') and ('a', 'bc') differ
+    values = [str(material.alphamode).encode(), material.fxfile, material.technique] + list(material.maps)
+    return b''.join(len(value).to_bytes(4, 'little') + value for value in values)
+
+def _hash_data(data, geoms, vertstride, vertnum, indexnum, offsets):
+    # arrays and views into mapped file live only here, mapping can be closed after return
+    view = memoryview(data)
+    attribnum = (offsets['vertices'] - 12 - offsets['attributes']) // ATTRIBUTE.itemsize
+    attributes = np.frombuffer(data, dtype=ATTRIBUTE, count=attribnum, offset=offsets['attributes'])
+    layout = attributes.tobytes()
+
+    materials, geoms_hashes = [], []
+    topology = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    for geom in geoms:
+        geom_materials = []
+        for lod in geom.lods:
+            lod_materials = []
+            # lods layout is part of geometry, same boxes in two geoms or two lods differ
+            topology.update(np.array([len(geoms), len(geom.lods), len(lod.materials)], dtype='<u4').tobytes())
+            for material in lod.materials:
+                vstart = offsets['vertices'] + material.vstart * vertstride
+                istart = offsets['index'] + material.istart * 2
+                lod_materials.append(_digest(layout, view[vstart:vstart + material.vnum * vertstride],
+                                             view[istart:istart + material.inum * 2], _strings(material)))
+                topology.update(np.array([material.vnum, material.inum], dtype='<u4').tobytes())
+                topology.update(view[istart:istart + material.inum * 2])
+            geom_materials.append(lod_materials)
+        materials.append(geom_materials)
+        geoms_hashes.append(_digest(repr(geom_materials).encode()))
+    return {
+        'file': _digest(view),
+        'geoms': geoms_hashes,
+        'materials': materials,
+        'topology': topology.hexdigest(),
+        }
+
+def _positions_data(data, geoms, vertstride, vertnum, indexnum, offsets):
+    attribnum = (offsets['vertices'] - 12 - offsets['attributes']) // ATTRIBUTE.itemsize
+    attributes = np.frombuffer(data, dtype=ATTRIBUTE, count=attribnum, offset=offsets['attributes'])
+    position = attributes[(attributes['flag'] == USED) & (attributes['usage'] == D3DDECLUSAGE.POSITION)]['offset'][0] // 4
+    vertices = np.frombuffer(data, dtype='<f4', count=vertnum * vertstride // 4, offset=offsets['vertices']).reshape(vertnum, -1)
+    return vertices[:, position:position + 3].astype(np.float64)
+
+def _read(filename, function):
+    # mapped file tables parsed and passed to function, arrays have to be copied out of it
+    extension = os.path.splitext(filename)[1].lower()
+    with open(filename, 'rb') as fo, mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        offsets = {}
+        head, geoms, vertstride, vertnum, indexnum, _ = read_tables(fo, extension == '.skinnedmesh', extension == '.bundledmesh', offsets)
+        return function(data, geoms, vertstride, vertnum, indexnum, offsets)
+
+def hash_mesh(filename):
+    '''
+    Dict of file, geoms and materials hashes plus topology hash of near duplicates candidates.
+    File is mapped to memory, slices are fed to hasher without copying
+    '''
+    return _read(filename, _hash_data)
+
+def read_positions(filename):
+    # (vertnum, 3) positions copy
+    return _read(filename, _positions_data)
+
+def _near(filenames, tolerance):
+    # candidates with same topology clustered by max vertex distance to cluster first member
+    clusters = []
+    for filename in filenames:
+        positions = read_positions(filename)
+        for cluster, reference in clusters:
+            if positions.shape == reference.shape and np.linalg.norm(positions - reference, axis=1).max(initial=0.0) <= tolerance:
+                cluster.append(filename)
+                break
+        else:
+            clusters.append(([filename], positions))
+    return [sorted(cluster) for cluster, _ in clusters if len(cluster) > 1]
+
+def _groups(keys):
+    # items sharing any key joined into groups, only groups of several items returned
+    parent = {}
+
+    def find(item):
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    owners = {}
+    for item, item_keys in keys:
+        parent.setdefault(item, item)
+        for key in item_keys:
+            if key in owners:
+                parent[find(item)] = find(owners[key])
+            else:
+                owners[key] = item
+    groups = {}
+    for item in parent:
+        groups.setdefault(find(item), []).append(item)
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+def find_duplicates(filenames, tolerance=TOLERANCE, workers=None):
+    '''
+    Groups of duplicated meshes among files or directories:
+        exact - byte identical files
+        near - files with same geometry within tolerance, not all byte identical
+        geoms - (filename, geomId) of same geoms found in different files
+    '''
+    if isinstance(filenames, str) and os.path.isdir(filenames): filenames = find_meshes(filenames)
+    results, errors = batch.run(hash_mesh, filenames, workers=workers, progress=None)
+
+    exact = _groups((filename, [result['file']]) for filename, result in results.items())
+    candidates = _groups((filename, [result['topology']]) for filename, result in results.items())
+    near = [group for candidate in candidates for group in _near(candidate, tolerance)
+            if len({results[filename]['file'] for filename in group}) > 1]
+    geoms = [group for group in _groups(((filename, geomId), [geom]) for filename, result in results.items()
+                                                                       for geomId, geom in enumerate(result['geoms']))
+             if len({filename for filename, geomId in group}) > 1]
+    logging.info('%d meshes hashed, %d exact, %d near duplicates groups, %d shared geoms groups' % (
+                                                                    len(results), len(exact), len(near), len(geoms)))
+    return {'exact': exact, 'near': near, 'geoms': geoms, 'errors': errors}
@@ -0,0 +1,233 @@
+import io
+import os
+import logging
+import sqlite3
+import hashlib
+
+from . import batch
+from .io import read_byte
+from .io import read_long
+from .visiblemesh import _bf2head, _bf2geom
+
+# SQLite index of visible meshes metadata in mod objects tree
+#   connection = index.update_index('mods/pr/objects', 'pr_objects.db')
+#   index.find_by_shader(connection, 'StaticMesh.fx')
+# files are reparsed only when their size or mtime changed and content hash differs,
+# vertices and indices blocks are skipped, only tables and materials are read
+
+MESH_EXTENSIONS = ('.staticmesh', '.bundledmesh', '.skinnedmesh')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    version INTEGER,
+    vertnum INTEGER,
+    vertstride INTEGER,
+    indexnum INTEGER,
+    geomnum INTEGER
+);
+CREATE TABLE IF NOT EXISTS lods (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    geom INTEGER NOT NULL,
+    lod INTEGER NOT NULL,
+    min_x REAL, min_y REAL, min_z REAL,
+    max_x REAL, max_y REAL, max_z REAL,
+    matnum INTEGER,
+    triangles INTEGER
+);
+CREATE TABLE IF NOT EXISTS materials (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    geom INTEGER NOT NULL,
+    lod INTEGER NOT NULL,
+    material INTEGER NOT NULL,
+    alphamode INTEGER,
+    fxfile TEXT,
+    technique TEXT,
+    vnum INTEGER,
+    inum INTEGER
+);
+CREATE TABLE IF NOT EXISTS maps (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    geom INTEGER NOT NULL,
+    lod INTEGER NOT NULL,
+    material INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    texture TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lods_file ON lods(file_id);
+CREATE INDEX IF NOT EXISTS lods_triangles ON lods(triangles);
+CREATE INDEX IF NOT EXISTS materials_file ON materials(file_id);
+CREATE INDEX IF NOT EXISTS materials_fxfile ON materials(fxfile COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS maps_file ON maps(file_id);
+CREATE INDEX IF NOT EXISTS maps_texture ON maps(texture COLLATE NOCASE);
+'''
+
+def _decode(value):
+    return value.decode('latin-1') if isinstance(value, bytes) else value
+
+def read_tables(fo, isSkinnedMesh=False, isBundledMesh=False, offsets=None):
+    '''
+    Visible mesh header, geoms with lods and materials, seeking over vertices and indices.
+    Returns (head, geoms, vertstride, vertnum, indexnum, offset of materials section),
+    offsets dict if given gets vertex attributes table, vertices and indices blocks offsets
+    '''
+    if offsets is None: offsets = {}
+    head = _bf2head()
+    head.load(fo)
+    read_byte(fo)  # u1
+    geoms = [_bf2geom() for i in range(read_long(fo))]
+    for geom in geoms:
+        geom.load(fo)
+    offsets['attributes'] = fo.tell() + 4
+    fo.seek(read_long(fo) * 8, io.SEEK_CUR)  # vertex attributes table
+    read_long(fo)  # vertformat
+    vertstride = read_long(fo)
+    vertnum = read_long(fo)
+    offsets['vertices'] = fo.tell()
+    fo.seek(vertstride * vertnum, io.SEEK_CUR)
+    indexnum = read_long(fo)
+    offsets['index'] = fo.tell()
+    fo.seek(indexnum * 2, io.SEEK_CUR)
+    if not isSkinnedMesh: read_long(fo)  # u2
+    for geom in geoms:
+        for lod in geom.lods:
+            lod.load_nodes_rigs(fo, head.version, isBundledMesh, isSkinnedMesh)
+    offset = fo.tell()
+    for geom in geoms:
+        for lod in geom.lods:
+            lod.load_materials(fo, head.version, isSkinnedMesh)
+    return head, geoms, vertstride, vertnum, indexnum, offset
+
+def read_metadata(fo, isSkinnedMesh=False, isBundledMesh=False):
+    '''
+    Visible mesh tables without vertices and indices, as plain dict
+    '''
+    head, geoms, vertstride, vertnum, indexnum, _ = read_tables(fo, isSkinnedMesh, isBundledMesh)
+    return {
+        'version': head.version,
+        'vertnum': vertnum,
+        'vertstride': vertstride,
+        'indexnum': indexnum,
+        'geoms': [[{
+            'min': lod.min,
+            'max': lod.max,
+            'materials': [{
+                'alphamode': material.alphamode,
+                'fxfile': _decode(material.fxfile),
+                'technique': _decode(material.technique),
+                'vnum': material.vnum,
+                'inum': material.inum,
+                'maps': [_decode(texture) for texture in material.maps],
+                } for material in lod.materials],
+            } for lod in geom.lods] for geom in geoms],
+        }
+
+def scan_file(filename):
+    '''
+    (content hash, metadata) of mesh file, single read for both
+    '''
+    with open(filename, 'rb') as fo:
+        data = fo.read()
+    extension = os.path.splitext(filename)[1].lower()
+    metadata = read_metadata(io.BytesIO(data),
+                             isSkinnedMesh=(extension == '.skinnedmesh'),
+                             isBundledMesh=(extension == '.bundledmesh'))
+    return hashlib.blake2b(data, digest_size=16).hexdigest(), metadata
+
+def find_meshes(root, extensions=MESH_EXTENSIONS):
+    # bf2 files extensions come in any case, .staticMesh etc
+    filenames = []
+    for dirpath, dirnames, files in os.walk(root):
+        filenames.extend(os.path.join(dirpath, name) for name in files if os.path.splitext(name)[1].lower() in extensions)
+    return sorted(filenames)
+
+def connect(database):
+    connection = sqlite3.connect(database)
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.executescript(SCHEMA)
+    return connection
+
+def _insert(connection, path, stat, digest, metadata):
+    connection.execute('DELETE FROM files WHERE path = ?', (path,))
+    file_id = connection.execute(
+        'INSERT INTO files (path, mtime, size, hash, version, vertnum, vertstride, indexnum, geomnum) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (path, stat[0], stat[1], digest, metadata['version'], metadata['vertnum'], metadata['vertstride'],
+         metadata['indexnum'], len(metadata['geoms']))).lastrowid
+    lods, materials, maps = [], [], []
+    for geomId, geom in enumerate(metadata['geoms']):
+        for lodId, lod in enumerate(geom):
+            triangles = sum(material['inum'] for material in lod['materials']) // 3
+            lods.append((file_id, geomId, lodId, *lod['min'], *lod['max'], len(lod['materials']), triangles))
+            for materialId, material in enumerate(lod['materials']):
+                materials.append((file_id, geomId, lodId, materialId, material['alphamode'], material['fxfile'],
+                                  material['technique'], material['vnum'], material['inum']))
+                maps.extend((file_id, geomId, lodId, materialId, slot, texture) for slot, texture in enumerate(material['maps']))
+    connection.executemany('INSERT INTO lods VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', lods)
+    connection.executemany('INSERT INTO materials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', materials)
+    connection.executemany('INSERT INTO maps VALUES (?, ?, ?, ?, ?, ?)', maps)
+
+def update_index(root, database, workers=None):
+    '''
+    Brings index of meshes under root up to date, returns (connection, stats),
+    paths are stored relative to root with forward slashes
+    '''
+    connection = connect(database)
+    stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+
+    known = {path: (mtime, size, digest) for path, mtime, size, digest in connection.execute('SELECT path, mtime, size, hash FROM files')}
+    current = {}
+    for filename in find_meshes(root):
+        stat = os.stat(filename)
+        current[os.path.relpath(filename, root).replace(os.sep, '/')] = (filename, (stat.st_mtime, stat.st_size))
+
+    changed = {}
+    for path, (filename, stat) in current.items():
+        if path in known and known[path][:2] == stat:
+            stats['unchanged'] += 1
+        else:
+            changed[filename] = path
+
+    results, errors = batch.run(scan_file, list(changed), workers=workers, progress=None)
+    with connection:
+        for path in set(known) - set(current):
+            connection.execute('DELETE FROM files WHERE path = ?', (path,))
+            stats['removed'] += 1
+        for filename, (digest, metadata) in results.items():
+            path = changed[filename]
+            stat = current[path][1]
+            if path in known and known[path][2] == digest:
+                # touched but same content
+                connection.execute('UPDATE files SET mtime = ?, size = ? WHERE path = ?', (*stat, path))
+                stats['unchanged'] += 1
+                continue
+            stats['updated' if path in known else 'added'] += 1
+            _insert(connection, path, stat, digest, metadata)
+        for filename, error in errors.items():
+            # stale rows of file which can not be read anymore would keep answering queries
+            connection.execute('DELETE FROM files WHERE path = ?', (changed[filename],))
+            logging.warning('%s: dropped from index, failed to parse\n%s' % (filename, error))
+        stats['failed'] = len(errors)
+    logging.info('%s: %d added, %d updated, %d unchanged, %d removed, %d failed' % (
+                                                                    root, stats['added'], stats['updated'], stats['unchanged'],
+                                                                    stats['removed'], stats['failed']))
+    return connection, stats
+
+def find_by_shader(connection, fxfile):
+    return [path for path, in connection.execute(
+        'SELECT DISTINCT path FROM files JOIN materials ON materials.file_id = files.id '
+        'WHERE materials.fxfile = ? COLLATE NOCASE ORDER BY path', (fxfile,))]
+
+def find_by_texture(connection, texture):
+    return [path for path, in connection.execute(
+        'SELECT DISTINCT path FROM files JOIN maps ON maps.file_id = files.id '
+        'WHERE maps.texture = ? COLLATE NOCASE ORDER BY path', (texture,))]
+
+def find_lods_over(connection, triangles):
+    # (path, geom, lod, triangles) of lods with more triangles than given
+    return connection.execute(
+        'SELECT path, geom, lod, triangles FROM files JOIN lods ON lods.file_id = files.id '
+        'WHERE lods.triangles > ? ORDER BY path, geom, lod', (triangles,)).fetchall()
@@ -1,8 +1,13 @@
 import struct 
 import logging
 
+import numpy as np
+
+# NOTE: bf2 files are little-endian with 4 bytes longs, using standard sizes
+# as native 'l' is 8 bytes on LP64 platforms
+
 def read_int(fo, lenght=1):
-    fmt = '{}i'.format(lenght)
+    fmt = '<{}i'.format(lenght)
     size = struct.calcsize(fmt)
 
     unpacked = struct.Struct(fmt).unpack(fo.read(size))
@@ -10,7 +15,7 @@ def read_int(fo, lenght=1):
     return unpacked
 
 def read_float(fo, lenght=1):
-    fmt = '{}f'.format(lenght)
+    fmt = '<{}f'.format(lenght)
     size = struct.calcsize(fmt)
 
     unpacked = struct.Struct(fmt).unpack(fo.read(size))
@@ -18,13 +23,13 @@ def read_float(fo, lenght=1):
     return unpacked
 
 def read_float3(fo):
-    fmt = '3f'
+    fmt = '<3f'
     size = struct.calcsize(fmt)
 
     return tuple(struct.Struct(fmt).unpack(fo.read(size)))
 
 def read_long(fo, lenght=1):
-    fmt = '{}l'.format(lenght)
+    fmt = '<{}l'.format(lenght)
     size = struct.calcsize(fmt)
 
     unpacked = struct.Struct(fmt).unpack(fo.read(size))
@@ -32,7 +37,7 @@ def read_long(fo, lenght=1):
     return unpacked
 
 def read_short(fo, lenght=1):
-    fmt = '{}H'.format(lenght)
+    fmt = '<{}H'.format(lenght)
     size = struct.calcsize(fmt)
 
     unpacked = struct.Struct(fmt).unpack(fo.read(size))
@@ -41,14 +46,14 @@ def read_short(fo, lenght=1):
 
 def read_string(fo):
     lenght = read_long(fo)
-    fmt = '{}s'.format(lenght)
+    fmt = '<{}s'.format(lenght)
     size = struct.calcsize(fmt)
 
     unpacked = struct.Struct(fmt).unpack(fo.read(size))
     return unpacked[0]
 
 def read_byte(fo, lenght=1):
-    fmt = '{}b'.format(lenght)
+    fmt = '<{}b'.format(lenght)
     size = struct.calcsize(fmt)
 
     unpacked = struct.Struct(fmt).unpack(fo.read(size))
@@ -56,7 +61,7 @@ def read_byte(fo, lenght=1):
     return unpacked
     
 def read_matrix4(fo):
-    fmt = '4f'
+    fmt = '<4f'
     size = struct.calcsize(fmt)
 
     unpacked = [
@@ -69,23 +74,23 @@ def read_matrix4(fo):
     
 
 def write_long(fo, value):
-    fmt = 'l'
+    fmt = '<l'
     fo.write(struct.Struct(fmt).pack(value))
 
 def write_short(fo, value):
-    fmt = 'H'
+    fmt = '<H'
     fo.write(struct.Struct(fmt).pack(value))
 
 def write_float3(fo, v1, v2, v3):
-    fmt = '3f'
+    fmt = '<3f'
     fo.write(struct.Struct(fmt).pack(v1, v2, v3))
 
 def write_byte(fo, value):
-    fmt = 'b'
+    fmt = '<b'
     fo.write(struct.Struct(fmt).pack(value))
 
 def write_float(fo, value):
-    fmt = 'f'
+    fmt = '<f'
     try:
         fo.write(struct.Struct(fmt).pack(value))
     except struct.error as e:
@@ -93,13 +98,20 @@ def write_float(fo, value):
         raise e
 
 def write_matrix4(fo, value):
-    fmt = '4f'
+    fmt = '<4f'
 
     for row in range(4):
         fo.write(struct.Struct(fmt).pack(*value[row]))
 
 def write_string(fo, value):
     lenght = len(value)
-    fmt = '{}s'.format(lenght)
-    fo.write(struct.Struct('l').pack(lenght))
-    fo.write(struct.Struct(fmt).pack(value))
\ No newline at end of file
+    fmt = '<{}s'.format(lenght)
+    fo.write(struct.Struct('<l').pack(lenght))
+    fo.write(struct.Struct(fmt).pack(value))
+
+def read_array(fo, dtype, count):
+    dtype = np.dtype(dtype)
+    return np.frombuffer(fo.read(dtype.itemsize * count), dtype=dtype, count=count).copy()
+
+def write_array(fo, value, dtype):
+    fo.write(np.ascontiguousarray(value, dtype=dtype).tobytes())
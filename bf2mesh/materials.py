@@ -0,0 +1,74 @@
+import os
+import re
+import logging
+
+import numpy as np
+
+from .collisionmesh import CollisionMesh
+
+# MaterialManager cells from materialmanagersettings, damage of attacker material to target material
+#   MaterialManager.createCell 1 18
+#   MaterialManager.damageMod 1
+# collision faces keep object local material index, tweak files map it to global material
+#   ObjectTemplate.mapMaterial 0 Metal_Solid 18
+
+CELL = np.dtype([
+    ('attacker', '<i4'),
+    ('target', '<i4'),
+    ('damage', '<f4'),
+    ])
+
+PATTERN_CELL = re.compile(r'MaterialManager\.createCell\s+(\d+)\s+(\d+)\s*\n\s*MaterialManager\.damageMod\s+(\d+(?:\.\d+)?)', re.IGNORECASE)
+PATTERN_MAP = re.compile(r'ObjectTemplate\.mapMaterial\s+(\d+)\s+(\S+)\s+(\d+)', re.IGNORECASE)
+
+def read_cells(filepath):
+    '''
+    MaterialManager cells as structured array of (attacker, target, damage)
+    '''
+    with open(filepath) as fo:
+        matches = PATTERN_CELL.findall(fo.read())
+    cells = np.array([(int(attacker), int(target), float(damage)) for attacker, target, damage in matches], dtype=CELL)
+    logging.debug('read %d material cells from %s' % (len(cells), filepath))
+    return cells
+
+def read_material_map(filepath):
+    '''
+    {local index: (name, global material id)} from ObjectTemplate.mapMaterial lines
+    '''
+    with open(filepath) as fo:
+        return {int(index): (name, int(material)) for index, name, material in PATTERN_MAP.findall(fo.read())}
+
+def get_tweak_filename(filename):
+    # objects/name/meshes/name.collisionmesh -> objects/name/name.tweak
+    dirname, basename = os.path.split(filename)
+    return os.path.join(os.path.dirname(dirname), os.path.splitext(basename)[0] + '.tweak')
+
+def check_materials(colmesh, cells, material_map=None):
+    '''
+    Global materials used by collision mesh without any damage cell targeting them,
+    local indices missing in material_map are returned as is
+    '''
+    materials = colmesh.get_materials()
+    if material_map is not None:
+        unmapped = np.array([material not in material_map for material in materials.tolist()], dtype=bool)
+        if unmapped.any():
+            logging.debug('%s: materials %s are not mapped' % (colmesh.filename, materials[unmapped].tolist()))
+        materials = np.array([material_map[material][1] if material in material_map else material for material in materials.tolist()], dtype=np.int64)
+    return np.unique(materials[~np.isin(materials, cells['target'])])
+
+def audit_materials(filenames, cells):
+    '''
+    Checks collision meshes against parsed cells, using sibling .tweak material maps when present.
+    Returns missing materials by filename, only for meshes having any
+    '''
+    if not isinstance(cells, np.ndarray): cells = read_cells(cells)
+    report = {}
+    for filename in filenames:
+        tweak = get_tweak_filename(filename)
+        material_map = read_material_map(tweak) if os.path.exists(tweak) else None
+        with CollisionMesh(filename) as colmesh:
+            missing = check_materials(colmesh, cells, material_map)
+        if len(missing):
+            report[filename] = missing.tolist()
+            logging.info('%s: materials %s have no damage cells' % (filename, report[filename]))
+    return report
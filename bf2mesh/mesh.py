@@ -4,8 +4,8 @@ import logging
 class BF2Mesh(object):
     def __init__(self, filename=None,
             isSkinnedMesh=False, isBundledMesh=False, isStaticMesh=False, isCollisionMesh=False):
+        self.filename = filename
         if filename:
-            self.filename = filename
             logging.debug('BF2Mesh::filename %s', filename)
             file_extension = os.path.splitext(filename)[1].lower()
 
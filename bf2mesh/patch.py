@@ -0,0 +1,107 @@
+import io
+import os
+import logging
+
+from .index import read_tables
+from .textures import normalize_path
+
+# patching visible mesh materials section in place
+# materials are last section of file, everything before it is copied byte to byte
+# by kernel without passing through python, only materials are serialized again
+#   batch.run(partial(patch.rename_textures, mapping={'old/tex_c.dds': 'new/tex_c.dds'}), 'objects/**/*.staticmesh')
+
+def copy_range(src, dst, count, offset=0):
+    '''
+    Copies count bytes from offset of src file to same offset of dst file,
+    copy_file_range or sendfile when available, plain read and write otherwise
+    '''
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    copied = 0
+    try:
+        while copied < count:
+            if hasattr(os, 'copy_file_range'):
+                size = os.copy_file_range(src_fd, dst_fd, count - copied, offset + copied, offset + copied)
+            else:
+                os.lseek(dst_fd, offset + copied, os.SEEK_SET)
+                size = os.sendfile(dst_fd, src_fd, offset + copied, count - copied)
+            if size == 0: break
+            copied += size
+    except OSError as e:
+        # cross filesystem or unsupported file types on older kernels
+        logging.debug('falling back to buffered copy after %d bytes: %s' % (copied, e))
+    if copied < count:
+        src.seek(offset + copied)
+        dst.seek(offset + copied)
+        remaining = count - copied
+        while remaining:
+            chunk = src.read(min(remaining, 1 << 20))
+            if not chunk: raise AttributeError('%s is shorter than %d bytes' % (src.name, offset + count))
+            dst.write(chunk)
+            remaining -= len(chunk)
+        dst.flush()
+
+def patch_materials(filename, edit, output=None):
+    '''
+    Calls edit(material, geomId, lodId, materialId) for every material and rewrites
+    materials section into output, filename by default.
+    Returns True if materials changed, unchanged file is not rewritten in place
+    '''
+    extension = os.path.splitext(filename)[1].lower()
+    isSkinnedMesh = (extension == '.skinnedmesh')
+    with open(filename, 'rb') as src:
+        head, geoms, _, _, _, offset = read_tables(src, isSkinnedMesh, extension == '.bundledmesh')
+        end = src.tell()
+        if end != os.fstat(src.fileno()).st_size:
+            raise AttributeError('did not parsed all bytes from %s' % filename)
+        src.seek(offset)
+        original = src.read(end - offset)
+
+        for geomId, geom in enumerate(geoms):
+            for lodId, lod in enumerate(geom.lods):
+                for materialId, material in enumerate(lod.materials):
+                    edit(material, geomId, lodId, materialId)
+        tail = io.BytesIO()
+        for geom in geoms:
+            for lod in geom.lods:
+                lod.export_materials(tail, head.version, isSkinnedMesh)
+        tail = tail.getvalue()
+
+        changed = tail != original
+        if not changed and output is None: return False
+        target = output or filename
+        dirname = os.path.dirname(target)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        # writing next to target and replacing, readers never see half written file
+        temporary = target + '.patch'
+        try:
+            with open(temporary, 'wb') as dst:
+                copy_range(src, dst, offset)
+                dst.seek(offset)
+                dst.write(tail)
+        except BaseException:
+            if os.path.exists(temporary): os.remove(temporary)
+            raise
+    os.replace(temporary, target)
+    logging.debug('patched %d bytes of materials in %s' % (len(tail), target))
+    return changed
+
+def rename_textures(filename, mapping, output=None):
+    '''
+    Replaces material maps found in mapping, keys are matched by normalized path.
+    Returns number of renamed maps
+    '''
+    mapping = {normalize_path(old): new.encode('latin-1') if isinstance(new, str) else new for old, new in mapping.items()}
+    renamed = []
+
+    def edit(material, geomId, lodId, materialId):
+        for mapId, texture in enumerate(material.maps):
+            new = mapping.get(normalize_path(texture))
+            if new is not None and new != texture:
+                material.maps[mapId] = new
+                renamed.append((geomId, lodId, materialId, mapId))
+
+    patch_materials(filename, edit, output)
+    logging.debug('%s: renamed %d maps' % (filename, len(renamed)))
+    return len(renamed)
@@ -0,0 +1,213 @@
+import os
+import logging
+
+import numpy as np
+
+from .bf2types import D3DDECLUSAGE
+from .io import read_long
+from .io import write_long
+from .io import read_array
+from .io import write_array
+
+# lightmap samples, generated per staticmesh lod
+#   meshes/name.samples - geom0 lod0
+#   meshes/name.samp_XY - geom X lod Y
+# header fourcc + width, height, then width * height samples
+# and faces table with vertices positions and normals
+
+FOURCC = b'SMP2'
+SIZE = 256  # default samples map width and height
+LIGHTMAP_UVS = [D3DDECLUSAGE.UV5, D3DDECLUSAGE.UV4, D3DDECLUSAGE.UV3, D3DDECLUSAGE.UV2, D3DDECLUSAGE.UV1]
+
+SAMPLE = np.dtype([
+    ('position', '<f4', (3,)),
+    ('rotation', '<f4', (3,)),
+    ('face', '<i4'),
+    ])
+
+FACE = np.dtype([
+    ('v1', '<f4', (3,)),
+    ('n1', '<f4', (3,)),
+    ('v2', '<f4', (3,)),
+    ('n2', '<f4', (3,)),
+    ('v3', '<f4', (3,)),
+    ('n3', '<f4', (3,)),
+    ])
+
+class StdSample:
+
+    def __init__(self, filename=None):
+        self.filename = filename
+
+        self.fourcc = FOURCC
+        self.width = 0
+        self.height = 0
+
+        self.datanum = 0
+        self.data = np.zeros(0, dtype=SAMPLE)
+
+        self.facenum = 0
+        self.faces = np.zeros(0, dtype=FACE)
+
+        if filename:
+            with open(filename, 'rb') as fo:
+                self.load(fo)
+
+    def __eq__(self, other):
+        if (self.fourcc, self.width, self.height) != (other.fourcc, other.width, other.height):
+            logging.debug('\nsample = %s %dx%d\nother = %s %dx%d' % (self.fourcc, self.width, self.height,
+                                                                      other.fourcc, other.width, other.height))
+            return False
+        if self.facenum != other.facenum:
+            logging.debug('\nsample.facenum = %d\nother.facenum = %d' % (self.facenum, other.facenum))
+            return False
+        return self.data.tobytes() == other.data.tobytes() and self.faces.tobytes() == other.faces.tobytes()
+
+    def load(self, fo):
+        self.fourcc = fo.read(4)
+        if self.fourcc != FOURCC:
+            raise AttributeError('%s is not samples file, fourcc %s' % (self.filename, self.fourcc))
+        self.width = read_long(fo)
+        self.height = read_long(fo)
+        logging.debug('sample %dx%d' % (self.width, self.height))
+
+        self.datanum = self.width * self.height
+        self.data = read_array(fo, SAMPLE, self.datanum)
+
+        self.facenum = read_long(fo)
+        self.faces = read_array(fo, FACE, self.facenum)
+        logging.debug('sample.facenum = %d' % self.facenum)
+
+    def export(self, filename=None):
+        if filename: self.filename = filename
+        logging.debug('saving samples as %s' % self.filename)
+        if self.datanum != self.width * self.height:
+            raise AttributeError('%d samples do not fill %dx%d map' % (self.datanum, self.width, self.height))
+
+        dirname = os.path.dirname(self.filename)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        with open(self.filename, 'wb') as fo:
+            fo.write(self.fourcc)
+            write_long(fo, self.width)
+            write_long(fo, self.height)
+            write_array(fo, self.data, SAMPLE)
+            write_long(fo, self.facenum)
+            write_array(fo, self.faces, FACE)
+
+def get_samples_filename(filename, geomId=0, lodId=0):
+    # samples file of mesh lod, geom0 lod0 has no suffix
+    name = os.path.splitext(filename)[0]
+    if geomId == 0 and lodId == 0:
+        return name + '.samples'
+    return name + '.samp_%d%d' % (geomId, lodId)
+
+def load_samples(vmesh):
+    '''
+    Attaches samples files next to mesh file to its lods, returns number of loaded files
+    '''
+    loaded = 0
+    for geomId, geom in enumerate(vmesh.geoms):
+        for lodId, lod in enumerate(geom.lods):
+            filename = get_samples_filename(vmesh.filename, geomId, lodId)
+            if not os.path.exists(filename): continue
+            lod.sample = StdSample(filename)
+            loaded += 1
+    logging.debug('%s: loaded %d samples files' % (vmesh.filename, loaded))
+    return loaded
+
+def export_samples(vmesh, filename=None):
+    '''
+    Writes attached lods samples next to mesh file
+    '''
+    if filename is None: filename = vmesh.filename
+    for geomId, geom in enumerate(vmesh.geoms):
+        for lodId, lod in enumerate(geom.lods):
+            if lod.sample is None: continue
+            lod.sample.export(get_samples_filename(filename, geomId, lodId))
+
+def get_lod_faces(vmesh, geomId, lodId):
+    # (N, 3) vertices ids of lod faces, in materials order
+    index = np.array(vmesh.index, dtype=np.int64)
+    faces = [index[material.istart:material.istart + material.inum].reshape(-1, 3) + material.vstart
+             for material in vmesh.geoms[geomId].lods[lodId].materials]
+    return np.concatenate(faces or [np.zeros((0, 3), dtype=np.int64)])
+
+def regenerate_samples(vmesh, geomId=0, lodId=0, uv=None, size=None):
+    '''
+    Rebuilds lod samples from mesh geometry, every texel touched by face in lightmap uv
+    gets sample with position and normal interpolated at texel center clamped to face.
+    Lightmap uv defaults to last uv set of mesh, size to current samples size or SIZE.
+    Attaches samples to lod and returns them, use export_samples to write files
+    '''
+    lod = vmesh.geoms[geomId].lods[lodId]
+    if uv is None:
+        usages = [attrib.usage for attrib in vmesh.vertex_attributes]
+        uv = next(usage for usage in LIGHTMAP_UVS if usage in usages)
+    if size is None:
+        size = (lod.sample.width, lod.sample.height) if lod.sample is not None else (SIZE, SIZE)
+    width, height = size
+
+    faces = get_lod_faces(vmesh, geomId, lodId)
+    positions = vmesh.get_attribute_array(D3DDECLUSAGE.POSITION).astype(np.float64)[faces]
+    normals = vmesh.get_attribute_array(D3DDECLUSAGE.NORMAL).astype(np.float64)[faces]
+    uvs = vmesh.get_attribute_array(uv).astype(np.float64)[faces] * (width, height)
+
+    # candidate texels from every face uv bounds
+    lower = np.clip(np.floor(uvs.min(axis=1)).astype(np.int64), 0, None)
+    upper = np.minimum(np.floor(uvs.max(axis=1)).astype(np.int64) + 1, (width, height))
+    spans = np.maximum(upper - lower, 0)
+    counts = spans[:, 0] * spans[:, 1]
+    faceIds = np.repeat(np.arange(len(faces)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    x = lower[faceIds, 0] + local % np.maximum(spans[faceIds, 0], 1)
+    y = lower[faceIds, 1] + local // np.maximum(spans[faceIds, 0], 1)
+    centers = np.column_stack([x, y]) + 0.5
+
+    # signed distances from texel center to face edges in texels, texel overlaps face when
+    # center is less than half texel diagonal outside of every edge
+    corners = uvs[faceIds]
+    edges = np.roll(corners, -1, axis=1) - corners
+    lenghts = np.maximum(np.linalg.norm(edges, axis=2), 1e-12)
+    offsets = centers[:, None, :] - corners
+    distances = (edges[:, :, 0] * offsets[:, :, 1] - edges[:, :, 1] * offsets[:, :, 0]) / lenghts
+    area = edges[:, 0, 0] * edges[:, 1, 1] - edges[:, 0, 1] * edges[:, 1, 0]
+    distances *= np.where(area < 0, -1.0, 1.0)[:, None]
+    score = distances.min(axis=1)
+    touched = (score > -np.sqrt(0.5)) & (area != 0)
+
+    # texel shared by several faces goes to face covering its center best
+    faceIds, x, y, score = faceIds[touched], x[touched], y[touched], score[touched]
+    texels = y * width + x
+    order = np.lexsort([-score, texels])
+    texels, first = np.unique(texels[order], return_index=True)
+    picked = order[first]
+
+    # barycentric weights of texel centers, clamped to face
+    corners = uvs[faceIds[picked]]
+    # corner weight is distance to opposite edge
+    weights = np.roll(distances[touched][picked] * lenghts[touched][picked], -1, axis=1)
+    weights = np.clip(weights, 0.0, None)
+    weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-12)
+
+    sample = StdSample()
+    sample.width, sample.height = width, height
+    sample.datanum = width * height
+    sample.data = np.zeros(sample.datanum, dtype=SAMPLE)
+    sample.data['face'] = -1
+    sample.data['face'][texels] = faceIds[picked]
+    sample.data['position'][texels] = np.einsum('ij,ijk->ik', weights, positions[faceIds[picked]])
+    rotations = np.einsum('ij,ijk->ik', weights, normals[faceIds[picked]])
+    sample.data['rotation'][texels] = rotations / np.maximum(np.linalg.norm(rotations, axis=1, keepdims=True), 1e-12)
+
+    sample.facenum = len(faces)
+    sample.faces = np.zeros(sample.facenum, dtype=FACE)
+    for corner in range(3):
+        sample.faces['v%d' % (corner + 1)] = positions[:, corner]
+        sample.faces['n%d' % (corner + 1)] = normals[:, corner]
+
+    lod.sample = sample
+    logging.debug('regenerated %dx%d samples of geom%d lod%d, %d texels covered by %d faces' % (
+                                                                width, height, geomId, lodId, len(texels), len(faces)))
+    return sample
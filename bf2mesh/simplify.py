@@ -0,0 +1,252 @@
+import heapq
+import logging
+
+import numpy as np
+
+# quadric error metric decimation, Garland & Heckbert 1997
+# using half-edge collapses so simplified mesh is always subset of original vertices,
+# no need to interpolate UVs, normals or any other vertex attribute
+
+def face_planes(positions, faces):
+    # plane equations (a, b, c, d) and areas for every triangle
+    v0, v1, v2 = (positions[faces[:, axis]] for axis in range(3))
+    normals = np.cross(v1 - v0, v2 - v0)
+    lenghts = np.linalg.norm(normals, axis=1)
+    normals = np.divide(normals, lenghts[:, None], out=np.zeros_like(normals), where=lenghts[:, None] > 0)
+    d = -np.einsum('ij,ij->i', normals, v0)
+    return np.column_stack([normals, d]), 0.5 * lenghts
+
+def vertex_quadrics(positions, faces):
+    # area-weighted sum of fundamental error quadrics of adjacent faces
+    planes, areas = face_planes(positions, faces)
+    face_quadrics = planes[:, :, None] * planes[:, None, :] * areas[:, None, None]
+    quadrics = np.zeros((len(positions), 4, 4))
+    for axis in range(3):
+        np.add.at(quadrics, faces[:, axis], face_quadrics)
+    return quadrics
+
+def edges(faces):
+    # unique undirected edges + number of faces using them
+    directed = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    return np.unique(np.sort(directed, axis=1), axis=0, return_counts=True)
+
+def boundary_vertices(faces, vertnum):
+    locked = np.zeros(vertnum, dtype=bool)
+    if len(faces) == 0: return locked
+    edge_list, counts = edges(faces)
+    locked[edge_list[counts != 2].ravel()] = True
+    return locked
+
+def _quadric_error(q, x, y, z):
+    # q is upper triangle of symmetric 4x4 quadric matrix
+    return (q[0] * x * x + 2 * q[1] * x * y + 2 * q[2] * x * z + 2 * q[3] * x
+            + q[4] * y * y + 2 * q[5] * y * z + 2 * q[6] * y
+            + q[7] * z * z + 2 * q[8] * z
+            + q[9])
+
+def _normal(a, b, c):
+    e1 = (b[0] - a[0], b[1] - a[1], b[2] - a[2])
+    e2 = (c[0] - a[0], c[1] - a[1], c[2] - a[2])
+    return (e1[1] * e2[2] - e1[2] * e2[1],
+            e1[2] * e2[0] - e1[0] * e2[2],
+            e1[0] * e2[1] - e1[1] * e2[0])
+
+def decimate(positions, faces, targets, locked=None, return_ids=False, corners=None):
+    '''
+    Collapses edges of (N, 3) faces array until number of faces drops to each
+    of descending targets, returns list of faces arrays, one per target.
+    Boundary vertices and vertices flagged in locked never move.
+    With return_ids list items are (faces, ids of source faces) tuples.
+    corners are (N, 3) split vertices ids of welded faces, when given edge collapses
+    have to move every split copy of vertex same way and returned faces use split ids
+    '''
+    positions = np.asarray(positions, dtype=np.float64)
+    faces = np.array(faces, dtype=np.int64).reshape(-1, 3)
+    vertnum = len(positions)
+
+    if locked is None: locked = np.zeros(vertnum, dtype=bool)
+    locked = np.asarray(locked, dtype=bool) | boundary_vertices(faces, vertnum)
+    triu = np.triu_indices(4)
+    quadrics = vertex_quadrics(positions, faces)[:, triu[0], triu[1]]
+
+    # collapse loop is sequential by nature, plain python containers are much faster here
+    points = positions.tolist()
+    quadric_list = quadrics.tolist()
+    face_list = faces.tolist()
+    corner_list = np.array(corners, dtype=np.int64).reshape(-1, 3).tolist() if corners is not None else None
+    locked_list = locked.tolist()
+    alive = [True] * len(face_list)
+    facenum = len(face_list)
+    vert_faces = [set() for _ in range(vertnum)]
+    for faceId, face in enumerate(face_list):
+        for vertId in face:
+            vert_faces[vertId].add(faceId)
+    version = [0] * vertnum
+
+    def collapse_cost(u, v):
+        qu, qv = quadric_list[u], quadric_list[v]
+        return _quadric_error([a + b for a, b in zip(qu, qv)], *points[v])
+
+    def neighbours(u):
+        verts = set()
+        for faceId in vert_faces[u]:
+            verts.update(face_list[faceId])
+        return verts
+
+    def push_edges(u):
+        for v in neighbours(u):
+            if v == u: continue
+            if not locked_list[u]:
+                heapq.heappush(heap, (collapse_cost(u, v), u, v, version[u], version[v]))
+            if not locked_list[v]:
+                heapq.heappush(heap, (collapse_cost(v, u), v, u, version[v], version[u]))
+
+    def flips(u, v):
+        # moving u onto v should not turn over any of remaining u faces
+        for faceId in vert_faces[u]:
+            face = face_list[faceId]
+            if v in face: continue
+            normal_old = _normal(*(points[vertId] for vertId in face))
+            normal_new = _normal(*(points[v] if vertId == u else points[vertId] for vertId in face))
+            if sum(a * b for a, b in zip(normal_old, normal_new)) <= 0.0: return True
+        return False
+
+    def split_moves(u, v):
+        # copy of u -> copy of v sharing collapsed face, None if some copy has no such face
+        # or two of them, split vertices would tear apart on seam
+        moves = {}
+        for faceId in vert_faces[u] & vert_faces[v]:
+            face, corner = face_list[faceId], corner_list[faceId]
+            cu, cv = corner[face.index(u)], corner[face.index(v)]
+            if moves.setdefault(cu, cv) != cv: return None
+        for faceId in vert_faces[u]:
+            if corner_list[faceId][face_list[faceId].index(u)] not in moves: return None
+        return moves
+
+    def snapshot():
+        mask = np.array(alive, dtype=bool)
+        faces_alive = np.array(face_list if corner_list is None else corner_list, dtype=np.int64).reshape(-1, 3)[mask]
+        if return_ids: return faces_alive, np.flatnonzero(mask)
+        return faces_alive
+
+    def manifold(u, v):
+        # link condition, only faces shared by edge may collapse
+        shared = vert_faces[u] & vert_faces[v]
+        return len(neighbours(u) & neighbours(v)) - 2 == len(shared)
+
+    # initial costs vectorized, both directions of every edge
+    heap = []
+    if facenum:
+        edge_list = edges(faces)[0]
+        full = np.zeros((vertnum, 4, 4))
+        full[:, triu[0], triu[1]] = quadrics
+        full[:, triu[1], triu[0]] = quadrics
+        homogeneous = np.column_stack([positions, np.ones(vertnum)])
+        for u, v in (edge_list.T, edge_list[:, ::-1].T):
+            p = homogeneous[v]
+            costs = np.einsum('ni,nij,nj->n', p, full[u] + full[v], p)
+            movable = ~locked[u]
+            heap.extend(zip(costs[movable].tolist(), u[movable].tolist(), v[movable].tolist(),
+                            [0] * int(movable.sum()), [0] * int(movable.sum())))
+        heapq.heapify(heap)
+
+    results = []
+    targets = sorted(targets, reverse=True)
+    while targets and heap:
+        while targets and facenum <= targets[0]:
+            results.append(snapshot())
+            targets.pop(0)
+        if not targets: break
+
+        cost, u, v, version_u, version_v = heapq.heappop(heap)
+        if version[u] != version_u or version[v] != version_v: continue
+        if not vert_faces[u] or not vert_faces[v]: continue
+        if not manifold(u, v) or flips(u, v): continue
+        if corner_list is not None:
+            moves = split_moves(u, v)
+            if moves is None: continue
+
+        for faceId in list(vert_faces[u]):
+            face = face_list[faceId]
+            if v in face:
+                alive[faceId] = False
+                facenum -= 1
+                for vertId in face:
+                    vert_faces[vertId].discard(faceId)
+            else:
+                if corner_list is not None:
+                    corner = corner_list[faceId]
+                    corner[face.index(u)] = moves[corner[face.index(u)]]
+                face[face.index(u)] = v
+                vert_faces[v].add(faceId)
+        vert_faces[u].clear()
+        quadric_list[v] = [a + b for a, b in zip(quadric_list[u], quadric_list[v])]
+        version[u] += 1
+        version[v] += 1
+        push_edges(v)
+
+    logging.debug('decimated %d faces to %d' % (len(face_list), facenum))
+    for _ in targets:
+        results.append(snapshot())
+    return results
+
+def components(faces, vertnum):
+    '''
+    Connected parts label for every face, faces sharing vertex are connected
+    '''
+    parent = list(range(vertnum))
+
+    def find(vertId):
+        while parent[vertId] != vertId:
+            parent[vertId] = parent[parent[vertId]]
+            vertId = parent[vertId]
+        return vertId
+
+    for v1, v2, v3 in np.asarray(faces)[:, :3].tolist():
+        root = find(v1)
+        for other in (v2, v3):
+            other = find(other)
+            if other != root: parent[other] = root
+    roots = np.array([find(vertId) for vertId in range(vertnum)], dtype=np.int64)
+    return np.unique(roots[np.asarray(faces)[:, 0]], return_inverse=True)[1].ravel()
+
+def convex_hull(points, epsilon=1e-9):
+    '''
+    Incremental 3d convex hull, returns outward oriented (N, 3) faces into points
+    or None when points are flat
+    '''
+    points = np.asarray(points, dtype=np.float64)
+    scale = max(float(np.abs(points).max()), 1.0) if len(points) else 1.0
+    tolerance = epsilon * scale
+    if len(points) < 4: return None
+
+    # initial tetrahedron from extreme points
+    i0 = int(np.argmin(points[:, 0]))
+    i1 = int(np.argmax(np.linalg.norm(points - points[i0], axis=1)))
+    line = points[i1] - points[i0]
+    i2 = int(np.argmax(np.linalg.norm(np.cross(points - points[i0], line), axis=1)))
+    normal = np.cross(line, points[i2] - points[i0])
+    if np.linalg.norm(normal) <= tolerance: return None
+    distances = (points - points[i0]) @ normal
+    i3 = int(np.argmax(np.abs(distances)))
+    if abs(distances[i3]) <= tolerance * np.linalg.norm(normal): return None
+
+    faces = [[i0, i1, i2], [i0, i2, i3], [i0, i3, i1], [i1, i3, i2]]
+    if distances[i3] > 0:
+        faces = [[a, c, b] for a, b, c in faces]
+
+    for pointId in np.argsort(-np.linalg.norm(points - points.mean(axis=0), axis=1)).tolist():
+        if pointId in (i0, i1, i2, i3): continue
+        hull = np.array(faces, dtype=np.int64)
+        a, b, c = points[hull[:, 0]], points[hull[:, 1]], points[hull[:, 2]]
+        normals = np.cross(b - a, c - a)
+        visible = np.einsum('ij,ij->i', normals, points[pointId] - a) > tolerance * np.linalg.norm(normals, axis=1)
+        if not visible.any(): continue
+
+        # horizon edges keep orientation of visible faces they come from
+        visible_edges = set()
+        for face in hull[visible].tolist():
+            visible_edges.update([(face[0], face[1]), (face[1], face[2]), (face[2], face[0])])
+        horizon = [(u, v) for u, v in visible_edges if (v, u) not in visible_edges]
+        faces = hull[~visible].tolist() + [[u, v, pointId] for u, v in horizon]
+    return np.array(faces, dtype=np.int64)
@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import logging
+
+# index of object templates defined in mod .con and .tweak files
+#   templates = TemplateIndex('mods/pr/objects', 'pr_templates.json')
+#   templates.get_object_path('evil_box') -> 'mods/pr/objects/.../evil_box.con'
+#   templates.get_mesh_path('evil_box') -> 'mods/pr/objects/.../meshes/evil_box.staticmesh'
+# files are tokenized once, cache keeps parsed files and is updated only for files
+# with changed size or mtime, lookups are plain dict access afterwards.
+# bf2 names are case insensitive, keys are lowercased and original names kept in records
+
+CACHE_VERSION = 1
+TEMPLATE_EXTENSIONS = ('.con', '.tweak')
+
+# every line as (command, arguments), whole file in one pass
+TOKEN = re.compile(r'^[ \t]*([\w.]+)[ \t]*([^\r\n]*)', re.MULTILINE)
+
+def tokenize(text):
+    '''
+    (lowercased command, arguments list) of every line, rem lines and beginRem\\endRem blocks skipped
+    '''
+    commented = False
+    for match in TOKEN.finditer(text):
+        command = match.group(1).lower()
+        if command == 'beginrem':
+            commented = True
+        elif command == 'endrem':
+            commented = False
+        elif not commented and command != 'rem':
+            yield command, match.group(2).split()
+
+def parse_template_file(filename):
+    '''
+    Dict of templates created or activated in file with their geometry and children,
+    geometry templates created and included files
+    '''
+    with open(filename, 'rb') as fo:
+        text = fo.read().decode('latin-1')
+    templates, geometries, includes = {}, {}, []
+    active = None
+    for command, args in tokenize(text):
+        if command in ('objecttemplate.create', 'objecttemplate.activesafe') and len(args) > 1:
+            active = templates.setdefault(args[1].lower(), {'name': args[1], 'type': None, 'geometry': None, 'children': []})
+            if command == 'objecttemplate.create': active['type'] = args[0]
+        elif command == 'objecttemplate.active' and args:
+            active = templates.setdefault(args[0].lower(), {'name': args[0], 'type': None, 'geometry': None, 'children': []})
+        elif command == 'objecttemplate.geometry' and args and active is not None:
+            active['geometry'] = args[0]
+        elif command == 'objecttemplate.addtemplate' and args and active is not None:
+            active['children'].append(args[0])
+        elif command == 'geometrytemplate.create' and len(args) > 1:
+            geometries[args[1].lower()] = {'name': args[1], 'type': args[0]}
+        elif command == 'include' and args:
+            includes.append(args[0])
+    return {'templates': templates, 'geometries': geometries, 'includes': includes}
+
+def _find_file(dirname, *parts):
+    # case insensitive path lookup, bf2 files written on windows come in any case
+    for part in parts:
+        if not os.path.isdir(dirname): return None
+        names = {name.lower(): name for name in os.listdir(dirname)}
+        if part.lower() not in names: return None
+        dirname = os.path.join(dirname, names[part.lower()])
+    return dirname
+
+class TemplateIndex:
+
+    def __init__(self, root, cache=None):
+        self.root = root
+        self.cache = cache
+        self.files = {}
+        self.templates = {}
+        self.geometries = {}
+        if cache and os.path.isfile(cache):
+            self.load()
+        self.update()
+
+    def load(self):
+        try:
+            with open(self.cache) as fo:
+                data = json.load(fo)
+            if data.get('version') != CACHE_VERSION: return
+            files = data['files']
+        except (ValueError, KeyError, AttributeError) as e:
+            logging.warning('ignoring broken templates cache %s: %r' % (self.cache, e))
+            return
+        self.files = files
+
+    def save(self):
+        dirname = os.path.dirname(self.cache)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(self.cache + '.tmp', 'w') as fo:
+            json.dump({'version': CACHE_VERSION, 'files': self.files}, fo)
+        os.replace(self.cache + '.tmp', self.cache)
+
+    def update(self):
+        '''
+        Reparses template files changed since last update, returns stats dict
+        '''
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+        current = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for name in filenames:
+                if os.path.splitext(name)[1].lower() not in TEMPLATE_EXTENSIONS: continue
+                filename = os.path.join(dirpath, name)
+                stat = os.stat(filename)
+                current[os.path.relpath(filename, self.root).replace(os.sep, '/')] = (filename, [stat.st_mtime, stat.st_size])
+
+        for path in set(self.files) - set(current):
+            del self.files[path]
+            stats['removed'] += 1
+        for path, (filename, stat) in current.items():
+            record = self.files.get(path)
+            if record is not None and record['stat'] == stat:
+                stats['unchanged'] += 1
+                continue
+            stats['updated' if record is not None else 'added'] += 1
+            self.files[path] = dict(parse_template_file(filename), stat=stat)
+
+        self.__build()
+        if self.cache and (stats['added'] or stats['updated'] or stats['removed'] or not os.path.isfile(self.cache)):
+            self.save()
+        logging.debug('%s: %d added, %d updated, %d unchanged, %d removed template files' % (
+                                                self.root, stats['added'], stats['updated'], stats['unchanged'], stats['removed']))
+        return stats
+
+    def __build(self):
+        # created templates first, then activations from tweaks add to them
+        self.templates, self.geometries = {}, {}
+        paths = sorted(self.files, key=lambda path: (not path.lower().endswith('.con'), path))
+        for path in paths:
+            for key, template in self.files[path]['templates'].items():
+                if template['type'] is not None and key not in self.templates:
+                    self.templates[key] = dict(template, file=path, children=list(template['children']))
+            for key, geometry in self.files[path]['geometries'].items():
+                self.geometries.setdefault(key, dict(geometry, file=path))
+        for path in paths:
+            for key, template in self.files[path]['templates'].items():
+                if key not in self.templates or self.templates[key]['file'] == path: continue
+                if template['geometry'] is not None: self.templates[key]['geometry'] = template['geometry']
+                self.templates[key]['children'].extend(template['children'])
+
+    def get_template(self, name):
+        # {'name', 'type', 'file', 'geometry', 'children'} or None
+        return self.templates.get(name.lower())
+
+    def get_object_path(self, name):
+        template = self.templates.get(name.lower())
+        return os.path.join(self.root, template['file']) if template else None
+
+    def get_children(self, name, recursive=False):
+        template = self.templates.get(name.lower())
+        if template is None: return []
+        if not recursive: return list(template['children'])
+        children, seen, pending = [], set(), list(template['children'])
+        while pending:
+            child = pending.pop(0)
+            if child.lower() in seen: continue
+            seen.add(child.lower())
+            children.append(child)
+            if child.lower() in self.templates:
+                pending.extend(self.templates[child.lower()]['children'])
+        return children
+
+    def get_mesh_path(self, name):
+        '''
+        Mesh file of object template geometry, meshes folder next to geometry template file
+        '''
+        template = self.templates.get(name.lower())
+        if template is None or template['geometry'] is None: return None
+        geometry = self.geometries.get(template['geometry'].lower())
+        if geometry is None: return None
+        dirname = os.path.dirname(os.path.join(self.root, geometry['file']))
+        filename = '%s.%s' % (geometry['name'], geometry['type'].lower())
+        return _find_file(dirname, 'meshes', filename) or os.path.join(dirname, 'meshes', filename)
@@ -0,0 +1,70 @@
+import os
+import logging
+import zipfile
+from functools import lru_cache
+
+from . import batch
+from .index import read_metadata
+
+# texture references of visible meshes against mod files
+# engine paths are case insensitive and use both slashes, all of them normalized
+# to lowercase relative paths with forward slashes before lookup
+#   missing, references, errors = textures.scan_textures(meshes, ['mods/pr'], archives=[('mods/pr/common_client.zip', 'common')])
+
+def normalize_path(path):
+    if isinstance(path, bytes): path = path.decode('latin-1')
+    parts = [part for part in path.replace('\\', '/').lower().split('/') if part not in ('', '.')]
+    return '/'.join(parts)
+
+@lru_cache(maxsize=None)
+def list_directory(root):
+    # one walk over mod directory, cached for process lifetime
+    files = set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        relpath = os.path.relpath(dirpath, root)
+        files.update(normalize_path(os.path.join(relpath, filename)) for filename in filenames)
+    logging.debug('listed %d files in %s' % (len(files), root))
+    return frozenset(files)
+
+@lru_cache(maxsize=None)
+def list_archive(filename, mount=''):
+    # zip members as seen by engine when archive is mounted at mount path
+    with zipfile.ZipFile(filename) as archive:
+        files = frozenset(normalize_path(mount + '/' + name) for name in archive.namelist() if not name.endswith('/'))
+    logging.debug('listed %d files in %s mounted at %s' % (len(files), filename, mount))
+    return files
+
+def read_maps(filename):
+    '''
+    Normalized unique textures referenced by visible mesh materials, vertices are not read
+    '''
+    extension = os.path.splitext(filename)[1].lower()
+    with open(filename, 'rb') as fo:
+        metadata = read_metadata(fo, isSkinnedMesh=(extension == '.skinnedmesh'), isBundledMesh=(extension == '.bundledmesh'))
+    return sorted({normalize_path(texture) for geom in metadata['geoms'] for lod in geom
+                                           for material in lod['materials'] for texture in material['maps']})
+
+def scan_textures(filenames, roots, archives=(), workers=None):
+    '''
+    Collects textures of all meshes, returns (missing, references, errors), missing and references
+    are dicts of texture -> meshes, missing holds textures not found in any of roots directories
+    or (zipfile, mount) archives, errors are exceptions of meshes failed to read by filename
+    '''
+    results, errors = batch.run(read_maps, filenames, workers=workers, progress=None)
+    for filename, error in sorted(errors.items()):
+        logging.warning('%s: failed to read textures: %r' % (filename, error))
+
+    references = {}
+    for filename in sorted(results):
+        for texture in results[filename]:
+            references.setdefault(texture, []).append(filename)
+
+    available = set()
+    for root in roots:
+        available |= list_directory(root)
+    for archive, mount in archives:
+        available |= list_archive(archive, mount)
+
+    missing = {texture: meshes for texture, meshes in references.items() if texture not in available}
+    logging.info('%d textures referenced by %d meshes, %d missing, %d meshes failed' % (len(references), len(results), len(missing), len(errors)))
+    return missing, references, errors
@@ -1,10 +1,13 @@
 import os
+import copy
 import logging
 from math import sin, cos, radians
 
+import numpy as np
+
+from . import simplify
 from .mesh import BF2Mesh
 from .bf2types import D3DDECLTYPE, D3DDECLUSAGE, USED, UNUSED
-from .io import read_float
 from .io import read_float3
 from .io import read_long
 from .io import read_short
@@ -15,9 +18,12 @@ from .io import write_long
 from .io import write_short
 from .io import write_float3
 from .io import write_byte
-from .io import write_float
 from .io import write_matrix4
 from .io import write_string
+from .io import read_array
+from .io import write_array
+
+VERSIONS = (4, 6, 10, 11)  # lods have pivot in <= 6, materials have bounds in 11
 
 class VisibleMesh(BF2Mesh):
     
@@ -72,6 +78,7 @@ class VisibleMesh(BF2Mesh):
             self.__meshfile = open(file=self.filename, mode='rb')
             self.__load()
             self.__meshfile.close()
+            self.__meshfile = None  # loaded mesh can be deep copied
         return self
     
     def __exit__(self, type, value, tracebacks):
@@ -88,10 +95,213 @@ class VisibleMesh(BF2Mesh):
         raise NotImplementedError
         #return '\n'.join(retstr)
     
+    @property
+    def vertices(self):
+        # flat tuple of vertices buffer, converted from array only when asked for
+        if self.__vertices is None:
+            self.__vertices = tuple(self.__vertices_array.tolist())
+        return self.__vertices
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self.__vertices = vertices
+        self.__vertices_array = None
+
+    def __get_vertices_buffer(self):
+        # flat float32 array of vertices buffer, cached until vertices replaced
+        if self.__vertices_array is None:
+            self.__vertices_array = np.array(self.__vertices, dtype=np.float32).ravel()
+        return self.__vertices_array
+
     @property
     def vertex_size(self):
         return sum([len(D3DDECLTYPE(v_attrib.vartype)) for v_attrib in self.vertex_attributes if v_attrib.flag is USED])
+
+    def get_attribute(self, usage):
+        for attrib in self.vertex_attributes:
+            if attrib.flag != UNUSED and attrib.usage == usage:
+                return attrib
+        return None
+
+    def get_vertices_array(self):
+        # vertices buffer as (vertnum, vertex_size) float32 array, copy
+        return self.__get_vertices_buffer().reshape(-1, self.vertex_size).copy()
+
+    def get_attribute_array(self, usage, vertices=None):
+        # view into vertices array columns of given attribute
+        if vertices is None: vertices = self.get_vertices_array()
+        attrib = self.get_attribute(usage)
+        if attrib is None:
+            raise AttributeError('mesh have no %s vertex attribute' % D3DDECLUSAGE(usage).name)
+        _start = int(attrib.offset / self.vertformat)
+        _end = _start + len(D3DDECLTYPE(attrib.vartype))
+        return vertices[:, _start:_end]
+
+    def set_vertices_array(self, vertices):
+        self.__vertices = None
+        self.__vertices_array = np.array(vertices, dtype=np.float32).ravel()
+        self.vertnum = int(len(self.__vertices_array) / self.vertex_size)
         
+    def get_faces_array(self):
+        # (facenum, 3) vertices ids for whole vertex buffer + lod number of every face
+        index = np.array(self.index, dtype=np.int64)
+        faces = [np.zeros((0, 3), dtype=np.int64)]
+        face_lods = [np.zeros(0, dtype=np.int64)]
+        lodnum = 0
+        for geom in self.geoms:
+            for lod in geom.lods:
+                for material in lod.materials:
+                    faces.append(index[material.istart:material.istart + material.inum].reshape(-1, 3) + material.vstart)
+                    face_lods.append(np.full(int(material.inum / 3), lodnum, dtype=np.int64))
+                lodnum += 1
+        return np.concatenate(faces), np.concatenate(face_lods)
+
+    def recompute_normals(self, smoothing_angle=None):
+        '''
+        Area-weighted vertex normals from faces referencing vertex.
+        With smoothing_angle faces of all vertices sharing same position in lod are
+        averaged too, as long as they are within angle(degrees) from vertex own faces.
+        '''
+        logging.debug('recomputing normals, smoothing angle %s' % smoothing_angle)
+        vertices = self.get_vertices_array()
+        positions = self.get_attribute_array(D3DDECLUSAGE.POSITION, vertices).astype(np.float64)
+        faces, face_lods = self.get_faces_array()
+        corners = faces.ravel()
+        referenced = np.unique(corners)
+
+        # cross product lenght is doubled face area, so sum is area-weighted
+        v0, v1, v2 = (positions[faces[:, axis]] for axis in range(3))
+        face_normals = np.cross(v1 - v0, v2 - v0)
+        vertex_normals = _scatter_add(corners, np.repeat(face_normals, 3, axis=0), len(vertices))
+
+        if smoothing_angle is not None and len(referenced):
+            own_normals = _normalized(vertex_normals)
+
+            # group vertices by lod and position
+            vertex_lods = np.zeros(len(vertices), dtype=np.int64)
+            vertex_lods[corners] = np.repeat(face_lods, 3)
+            keys = np.column_stack([vertex_lods[referenced], positions[referenced]])
+            _, inverse = np.unique(keys, axis=0, return_inverse=True)
+            groups = np.full(len(vertices), -1, dtype=np.int64)
+            groups[referenced] = inverse.ravel()
+
+            # pair every vertex with every face corner of its group
+            corners_order = np.argsort(groups[corners], kind='stable')
+            corners_count = np.bincount(groups[corners], minlength=groups.max() + 1)
+            corners_start = np.cumsum(corners_count) - corners_count
+            pairs_count = corners_count[groups[referenced]]
+            pair_vertices = np.repeat(referenced, pairs_count)
+            pair_offsets = np.arange(pairs_count.sum()) - np.repeat(np.cumsum(pairs_count) - pairs_count, pairs_count)
+            pair_corners = corners_order[np.repeat(corners_start[groups[referenced]], pairs_count) + pair_offsets]
+            pair_faces = pair_corners // 3
+
+            cos_limit = cos(radians(smoothing_angle)) - 1e-6
+            within = np.einsum('ij,ij->i', _normalized(face_normals)[pair_faces], own_normals[pair_vertices]) >= cos_limit
+            vertex_normals = _scatter_add(pair_vertices[within], face_normals[pair_faces[within]], len(vertices))
+
+        normals = self.get_attribute_array(D3DDECLUSAGE.NORMAL, vertices)
+        normals[referenced, :3] = _normalized(vertex_normals)[referenced]
+        self.set_vertices_array(vertices)
+
+    def recompute_tangents(self, uv='UV1'):
+        '''
+        Per-vertex tangent frames from given UV set, orthogonalized to NORMAL.
+        Updates TANGENT and BINORMAL if mesh have it.
+        '''
+        uv = D3DDECLUSAGE[uv] if isinstance(uv, str) else D3DDECLUSAGE(uv)
+        logging.debug('recomputing tangents from %s' % uv.name)
+        vertices = self.get_vertices_array()
+        positions = self.get_attribute_array(D3DDECLUSAGE.POSITION, vertices).astype(np.float64)
+        normals = _normalized(self.get_attribute_array(D3DDECLUSAGE.NORMAL, vertices)[:, :3].astype(np.float64))
+        uvs = self.get_attribute_array(uv, vertices)[:, :2].astype(np.float64)
+        faces, _ = self.get_faces_array()
+        corners = faces.ravel()
+        referenced = np.unique(corners)
+
+        p0, p1, p2 = (positions[faces[:, axis]] for axis in range(3))
+        t0, t1, t2 = (uvs[faces[:, axis]] for axis in range(3))
+        e1, e2 = p1 - p0, p2 - p0
+        d1, d2 = t1 - t0, t2 - t0
+        r = d1[:, 0] * d2[:, 1] - d2[:, 0] * d1[:, 1]
+        r = np.divide(1.0, r, out=np.zeros_like(r), where=np.abs(r) > 1e-12)
+        face_tangents = (e1 * d2[:, 1:2] - e2 * d1[:, 1:2]) * r[:, None]
+        face_binormals = (e2 * d1[:, 0:1] - e1 * d2[:, 0:1]) * r[:, None]
+        tangents = _scatter_add(corners, np.repeat(face_tangents, 3, axis=0), len(vertices))
+        binormals = _scatter_add(corners, np.repeat(face_binormals, 3, axis=0), len(vertices))
+
+        # Gram-Schmidt, any perpendicular to normal when UVs are degenerate
+        tangents -= normals * np.einsum('ij,ij->i', normals, tangents)[:, None]
+        degenerate = np.linalg.norm(tangents, axis=1) < 1e-12
+        fallback = np.where(np.abs(normals[:, 0:1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]])
+        tangents[degenerate] = np.cross(normals, fallback)[degenerate]
+        tangents = _normalized(tangents)
+        handedness = np.where(np.einsum('ij,ij->i', np.cross(normals, tangents), binormals) < 0.0, -1.0, 1.0)
+
+        attrib_tangents = self.get_attribute_array(D3DDECLUSAGE.TANGENT, vertices)
+        attrib_tangents[referenced, :3] = tangents[referenced]
+        if attrib_tangents.shape[1] == 4:
+            attrib_tangents[referenced, 3] = handedness[referenced]
+        if self.get_attribute(D3DDECLUSAGE.BINORMAL) is not None:
+            attrib_binormals = self.get_attribute_array(D3DDECLUSAGE.BINORMAL, vertices)
+            attrib_binormals[referenced, :3] = (np.cross(normals, tangents) * handedness[:, None])[referenced]
+        self.set_vertices_array(vertices)
+
+    def remove_attributes(self, usages):
+        '''
+        Strips vertex attributes by D3DDECLUSAGE or its name, e.g. ['UV3', 'UV4']
+        '''
+        usages = [D3DDECLUSAGE[usage] if isinstance(usage, str) else D3DDECLUSAGE(usage) for usage in usages]
+        for usage in usages:
+            if self.get_attribute(usage) is None:
+                raise AttributeError('mesh have no %s vertex attribute' % usage.name)
+        logging.debug('removing %s vertex attributes' % str([usage.name for usage in usages]))
+
+        vertices = self.get_vertices_array()
+        columns = []
+        new_attributes = []
+        offset = 0
+        for attrib in self.vertex_attributes:
+            if attrib.flag == UNUSED:
+                new_attributes.append(attrib)
+                continue
+            if attrib.usage in usages: continue
+            _start = int(attrib.offset / self.vertformat)
+            columns.extend(range(_start, _start + len(D3DDECLTYPE(attrib.vartype))))
+            attrib.offset = offset
+            offset += len(D3DDECLTYPE(attrib.vartype)) * self.vertformat
+            new_attributes.append(attrib)
+
+        logging.debug('vertstride: %d -> %d' % (self.vertstride, offset))
+        self.vertex_attributes = new_attributes
+        self.vertattribnum = len(new_attributes)
+        self.vertstride = offset
+        self.set_vertices_array(vertices[:, columns])
+
+    def add_attribute(self, usage, vartype, fill=0.0):
+        '''
+        Appends vertex attribute to every vertex, fill is scalar, tuple of vartype size
+        or (vertnum, vartype size) array
+        '''
+        usage = D3DDECLUSAGE[usage] if isinstance(usage, str) else D3DDECLUSAGE(usage)
+        vartype = D3DDECLTYPE[vartype] if isinstance(vartype, str) else D3DDECLTYPE(vartype)
+        if self.get_attribute(usage) is not None:
+            raise AttributeError('mesh already have %s vertex attribute' % usage.name)
+        logging.debug('adding %s vertex attribute of %s' % (usage.name, vartype.name))
+
+        vertices = self.get_vertices_array()
+        data = np.empty((len(vertices), len(vartype)), dtype=np.float32)
+        data[:] = fill
+
+        attrib = _bf2vertattrib(USED, self.vertstride, vartype, usage)
+        # keep UNUSED attribute as table terminator
+        position = len(self.vertex_attributes)
+        if self.vertex_attributes and self.vertex_attributes[-1].flag == UNUSED:
+            position -= 1
+        self.vertex_attributes.insert(position, attrib)
+        self.vertattribnum = len(self.vertex_attributes)
+        self.vertstride += len(vartype) * self.vertformat
+        self.set_vertices_array(np.hstack([vertices, data]))
+
     def __load(self):
         self.__read_header()
         self.__read_u1()
@@ -163,8 +373,9 @@ class VisibleMesh(BF2Mesh):
     def __read_vertices(self):
         logging.debug('starting reading vertex block at %d' % self.__meshfile.tell())
         data_num = int(self.vertstride / self.vertformat * self.vertnum)
-        self.vertices = read_float(self.__meshfile, data_num)
-        logging.debug('array size = %d' % len(self.vertices))
+        self.__vertices = None
+        self.__vertices_array = read_array(self.__meshfile, '<f4', data_num)
+        logging.debug('array size = %d' % len(self.__vertices_array))
         logging.debug('finished reading vertex block at %d' % self.__meshfile.tell())
     
     def __read_indexnum(self):
@@ -231,8 +442,7 @@ class VisibleMesh(BF2Mesh):
         write_long(fo, self.vertstride)
         write_long(fo, self.vertnum)
         logging.debug('writing vertices array at %d' % fo.tell())
-        for value in self.vertices:
-            write_float(fo, value)
+        write_array(fo, self.__get_vertices_buffer(), '<f4')
         logging.debug('writing %d indices at %d' % (self.indexnum, fo.tell()))
         write_long(fo, self.indexnum)
         for value in self.index:
@@ -248,6 +458,27 @@ class VisibleMesh(BF2Mesh):
                 lod.export_materials(fo, self.head.version, self.isSkinnedMesh)
         logging.debug('exported %d bytes' % fo.tell())
     
+    def change_version(self, version):
+        '''
+        Sets header version and fills tables which exists only in new version layout
+        '''
+        if version not in VERSIONS:
+            raise AttributeError('unsupported version %d, expected one of %s' % (version, VERSIONS))
+        if version <= 6:
+            for geom in self.geoms:
+                for lod in geom.lods:
+                    if lod.pivot is None: lod.pivot = (0.0, 0.0, 0.0)
+        if version == 11 and self.head.version != 11 and not self.isSkinnedMesh:
+            positions = self.get_attribute_array(D3DDECLUSAGE.POSITION)
+            for geom in self.geoms:
+                for lod in geom.lods:
+                    for material in lod.materials:
+                        material_positions = positions[material.vstart:material.vstart + material.vnum]
+                        material.mmin = tuple(material_positions.min(axis=0, initial=np.inf).tolist()) if material.vnum else (0.0, 0.0, 0.0)
+                        material.mmax = tuple(material_positions.max(axis=0, initial=-np.inf).tolist()) if material.vnum else (0.0, 0.0, 0.0)
+        logging.debug('changing version %s to %d' % (self.head.version, version))
+        self.head.version = version
+
     def change_geoms_order(self, order):
         if len(order) != len(self.geoms):
             raise AttributeError('new order geoms number not equal, got %d, expected %d' % (len(order), len(self.geoms)))
@@ -530,7 +761,208 @@ class VisibleMesh(BF2Mesh):
         self.vertnum = vertnum
         logging.debug('self.indexnum: %d -> %d' % (self.indexnum, indexnum))
         self.indexnum = indexnum
-    
+
+    def remove_degenerate_triangles(self, epsilon=0.0):
+        '''
+        Drops zero-area triangles, triangles with repeated indices and duplicate
+        triangles(any winding) from every material, rebuilds index buffer.
+        Returns number of removed triangles.
+        '''
+        logging.debug('removing degenerate triangles from %s' % self.filename)
+        positions = self.get_attribute_array(D3DDECLUSAGE.POSITION).astype(np.float64)
+        index = np.array(self.index, dtype=np.int64)
+
+        new_index = []
+        istart = 0
+        removed = 0
+        for geomId, geom in enumerate(self.geoms):
+            for lodId, lod in enumerate(geom.lods):
+                for materialId, material in enumerate(lod.materials):
+                    faces = index[material.istart:material.istart + material.inum].reshape(-1, 3)
+
+                    # repeated indices
+                    keep = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])
+
+                    # zero area, doubled area is length of edges cross product
+                    v0, v1, v2 = (positions[material.vstart + faces[:, axis]] for axis in range(3))
+                    area = 0.5 * np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1)
+                    keep &= area > epsilon
+
+                    # duplicates, sorting indices so permuted winding matches too
+                    faces_sorted = np.sort(faces, axis=1)
+                    _, first = np.unique(faces_sorted[keep], axis=0, return_index=True)
+                    unique = np.zeros(len(faces), dtype=bool)
+                    unique[np.flatnonzero(keep)[first]] = True
+
+                    material_faces = faces[unique]
+                    logging.debug('geoms[%d].lods[%d].materials[%d] removed %d of %d triangles' % (geomId, lodId, materialId,
+                                                                                                len(faces) - len(material_faces), len(faces)))
+                    removed += len(faces) - len(material_faces)
+
+                    new_index.append(material_faces.ravel())
+                    material.istart = istart
+                    material.inum = material_faces.size
+                    istart += material.inum
+
+        self.index = tuple(np.concatenate(new_index).tolist()) if new_index else ()
+        logging.debug('self.indexnum: %d -> %d' % (self.indexnum, len(self.index)))
+        self.indexnum = len(self.index)
+        return removed
+
+    def generate_lods(self, geomId, ratios=(0.5, 0.25)):
+        '''
+        Simplifies geoms[geomId].lods[0] per material down to given faces ratios,
+        appending new lod for every ratio after existing ones.
+        Vertices on material boundaries are kept in place, vertices split on UV seams
+        and hard edges collapse only when every copy of them moves same way.
+        '''
+        logging.debug('generating geoms[%d] lods with ratios %s' % (geomId, str(ratios)))
+        geom = self.geoms[geomId]
+        lod0 = geom.lods[0]
+        ratios = sorted(ratios, reverse=True)
+
+        vertices = self.get_vertices_array()
+        positions = self.get_attribute_array(D3DDECLUSAGE.POSITION, vertices).astype(np.float64)
+        index = np.array(self.index, dtype=np.int64)
+
+        # vertices with same position as vertex of other material
+        lod_vertices = np.concatenate([np.arange(material.vstart, material.vstart + material.vnum) for material in lod0.materials])
+        lod_materials = np.concatenate([np.full(material.vnum, materialId) for materialId, material in enumerate(lod0.materials)])
+        _, inverse = np.unique(positions[lod_vertices], axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        groups = np.unique(np.column_stack([inverse, lod_materials]), axis=0)[:, 0]
+        shared = np.zeros(len(vertices), dtype=bool)
+        shared[lod_vertices] = np.bincount(groups, minlength=inverse.max() + 1)[inverse] > 1
+
+        new_lods = []
+        for ratio in ratios:
+            lod = _bf2lod()
+            lod.pivot = lod0.pivot
+            lod.rignum = lod0.rignum
+            lod.rigs = copy.deepcopy(lod0.rigs)
+            lod.nodenum = lod0.nodenum
+            lod.nodes = copy.deepcopy(lod0.nodes)
+            new_lods.append(lod)
+
+        new_vertices = [vertices]
+        new_index = [index]
+        lods_positions = [[] for lod in new_lods]
+        vertnum = len(vertices)
+        indexnum = len(index)
+        for materialId, material in enumerate(lod0.materials):
+            faces = index[material.istart:material.istart + material.inum].reshape(-1, 3)
+            vertex_ids = slice(material.vstart, material.vstart + material.vnum)
+            targets = [max(1, int(len(faces) * ratio)) for ratio in ratios]
+            # decimating welded surface so split vertices do not stop collapses as open borders
+            welded, weld = np.unique(positions[vertex_ids], axis=0, return_inverse=True)
+            weld = weld.ravel()
+            locked = np.zeros(len(welded), dtype=bool)
+            locked[weld[shared[vertex_ids]]] = True
+            simplified = simplify.decimate(welded, weld[faces], targets, locked=locked, corners=faces)
+
+            for lodId, (lod, lod_faces, target) in enumerate(zip(new_lods, simplified, targets)):
+                logging.debug('new lod[%d].materials[%d] %d -> %d faces' % (lodId, materialId, len(faces), len(lod_faces)))
+                if len(lod_faces) > target:
+                    logging.warning('geoms[%d] new lod[%d].materials[%d] kept %d of %d faces, target was %d' % (
+                                                                geomId, lodId, materialId, len(lod_faces), len(faces), target))
+                used = np.unique(lod_faces)
+                remap = np.full(material.vnum, -1, dtype=np.int64)
+                remap[used] = np.arange(len(used))
+
+                new_material = copy.deepcopy(material)
+                new_material.vstart = vertnum
+                new_material.istart = indexnum
+                new_material.vnum = len(used)
+                new_material.inum = lod_faces.size
+                if not self.isSkinnedMesh and self.head.version == 11 and len(used):
+                    new_material.mmin = tuple(positions[material.vstart + used].min(axis=0).tolist())
+                    new_material.mmax = tuple(positions[material.vstart + used].max(axis=0).tolist())
+                lod.materials.append(new_material)
+
+                new_vertices.append(vertices[material.vstart + used])
+                lods_positions[lodId].append(positions[material.vstart + used])
+                new_index.append(remap[lod_faces].ravel())
+                vertnum += new_material.vnum
+                indexnum += new_material.inum
+
+        for lod, lod_positions in zip(new_lods, lods_positions):
+            lod.matnum = len(lod.materials)
+            lod_positions = np.concatenate(lod_positions)
+            lod.min = tuple(lod_positions.min(axis=0).tolist())
+            lod.max = tuple(lod_positions.max(axis=0).tolist())
+
+        self.set_vertices_array(np.concatenate(new_vertices))
+        self.index = tuple(np.concatenate(new_index).tolist())
+        self.indexnum = len(self.index)
+        geom.lods.extend(new_lods)
+        geom.lodnum = len(geom.lods)
+
+        # same order to lay buffers out sequentially by geom and lod again
+        self.change_geoms_order(list(range(len(self.geoms))))
+        return new_lods
+
+    def merge_materials(self):
+        '''
+        Batches materials with same alphamode, fxfile, technique and maps in every lod
+        into single material to save draw calls.
+        Returns list of saved draw calls per lod for every geom.
+        '''
+        logging.debug('merging same materials in %s' % self.filename)
+        saved = [[0 for lod in geom.lods] for geom in self.geoms]
+        # skinnedmesh lods have rig per material, bones indices are per material
+        if self.isSkinnedMesh: return saved
+
+        vertices = self.get_vertices_array()
+        index = np.array(self.index, dtype=np.int64)
+
+        new_vertices = []
+        new_index = []
+        vstart = 0
+        istart = 0
+        for geomId, geom in enumerate(self.geoms):
+            for lodId, lod in enumerate(geom.lods):
+                batches = []
+                for material in lod.materials:
+                    key = (material.alphamode, material.fxfile, material.technique, tuple(material.maps))
+                    for batch_key, batch in batches:
+                        # NOTE: indices are unsigned short, new batch when out of range
+                        if batch_key == key and sum([other.vnum for other in batch]) + material.vnum <= 0xffff + 1:
+                            batch.append(material)
+                            break
+                    else:
+                        batches.append((key, [material]))
+
+                new_materials = []
+                for _, batch in batches:
+                    material = batch[0]
+                    vnum = 0
+                    inum = 0
+                    for other in batch:
+                        new_vertices.append(vertices[other.vstart:other.vstart + other.vnum])
+                        new_index.append(index[other.istart:other.istart + other.inum] + vnum)
+                        vnum += other.vnum
+                        inum += other.inum
+                    if not self.isSkinnedMesh and self.head.version == 11:
+                        material.mmin = tuple(min(axis) for axis in zip(*[other.mmin for other in batch]))
+                        material.mmax = tuple(max(axis) for axis in zip(*[other.mmax for other in batch]))
+                    material.vstart = vstart
+                    material.istart = istart
+                    material.vnum = vnum
+                    material.inum = inum
+                    vstart += vnum
+                    istart += inum
+                    new_materials.append(material)
+
+                saved[geomId][lodId] = len(lod.materials) - len(new_materials)
+                logging.debug('geoms[%d].lods[%d] merged %d materials to %d' % (geomId, lodId, len(lod.materials), len(new_materials)))
+                lod.materials = new_materials
+                lod.matnum = len(new_materials)
+
+        self.set_vertices_array(np.concatenate(new_vertices) if new_vertices else vertices[:0])
+        self.index = tuple(np.concatenate(new_index).tolist()) if new_index else ()
+        self.indexnum = len(self.index)
+        return saved
+
     def get_lod_center_offset(self, geomId, lodId, update_bounds=True):
         logging.debug('computing geoms[%d].lods[%d]' % (geomId, lodId))
         lod = self.geoms[geomId].lods[lodId]
@@ -594,6 +1026,15 @@ class VisibleMesh(BF2Mesh):
                 lod.max = tuple(lod_max)
 
 
+def _scatter_add(ids, values, size):
+    # sums rows of values into size rows by ids, bincount is much faster than np.add.at
+    return np.column_stack([np.bincount(ids, weights=values[:, axis], minlength=size) for axis in range(values.shape[1])])
+
+def _normalized(vectors):
+    lenghts = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, lenghts, out=np.zeros_like(vectors, dtype=np.float64), where=lenghts > 0)
+
+
 class _bf2head:
     """
     Holds version info + some unknown bytes
@@ -982,3 +1423,17 @@ class _bf2vertattrib:
     
     def __str__(self):
         return 'flag: %s, offset: %s, vartype: %s of size %s, usage: %s' % (self.flag, self.offset, D3DDECLTYPE(self.vartype), len(D3DDECLTYPE(self.vartype)), D3DDECLUSAGE(self.usage).name)
+
+
+def merge_materials_batch(filenames, export=True):
+    '''
+    Merges same materials in every mesh file, returns saved draw calls per lod by filename
+    '''
+    report = {}
+    for filename in filenames:
+        with VisibleMesh(filename) as vmesh:
+            report[filename] = vmesh.merge_materials()
+            if export and any(any(lod) for lod in report[filename]):
+                vmesh.export(filename)
+        logging.info('%s: saved %d draw calls' % (filename, sum(map(sum, report[filename]))))
+    return report
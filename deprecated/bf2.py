@@ -7,6 +7,7 @@ class Mod(object):
 
     def __init__(self):
         self.root = self.find_mod_root()
+        self.templates = None
 
     def find_mod_root(self):
         workdir_parts = os.getcwd().split(os.sep)
@@ -14,15 +15,11 @@ class Mod(object):
             workdir_parts[:workdir_parts.index('mods') + 2])
 
     def get_object_path(self, name):
-        for dirname, dirnames, filenames in os.walk(
-                os.path.join(self.root, 'objects')):
-            for filename in filenames:
-                if filename.split('.')[-1] in ['con', 'tweak']:
-                    filepath = os.path.join(
-                        self.root, 'objects', dirname, filename)
-                    root = TemplateParser(filepath).get_root()
-                    if root is not None and root[1] == name:
-                        return filepath
+        # template index built once and cached in mod folder, files reparsed only when changed
+        if self.templates is None:
+            from bf2mesh.templates import TemplateIndex
+            self.templates = TemplateIndex(os.path.join(self.root, 'objects'), os.path.join(self.root, 'cache', 'templates.json'))
+        return self.templates.get_object_path(name)
 
 
 
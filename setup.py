@@ -13,6 +13,14 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/rpoxo/bf2mesh",
     packages=setuptools.find_packages(),
+    install_requires=[
+        'numpy',
+    ],
+    entry_points={
+        'console_scripts': [
+            'bf2mesh=bf2mesh.cli:main',
+        ],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
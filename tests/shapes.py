@@ -0,0 +1,54 @@
+import numpy as np
+
+from bf2mesh.bf2types import D3DDECLUSAGE
+
+# shapes shared by tests, (vertices, faces) arrays and helper to put them into visible mesh
+
+def uv_sphere(radius, center, rings=16, segments=24):
+    theta = np.linspace(0.0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)
+    t, p = np.meshgrid(theta, phi, indexing='ij')
+    vertices = np.column_stack([np.sin(t).ravel() * np.cos(p).ravel(), np.cos(t).ravel(), np.sin(t).ravel() * np.sin(p).ravel()])
+    vertices = np.concatenate([vertices, [(0.0, 1.0, 0.0), (0.0, -1.0, 0.0)]]) * radius + center
+    top, bottom = len(vertices) - 2, len(vertices) - 1
+    ids = np.arange((rings - 1) * segments).reshape(rings - 1, segments)
+    nxt = np.roll(ids, -1, axis=1)
+    a, b, c, d = ids[:-1].ravel(), ids[1:].ravel(), nxt[1:].ravel(), nxt[:-1].ravel()
+    faces = np.concatenate([
+        np.column_stack([a, d, c]), np.column_stack([a, c, b]),
+        np.column_stack([np.full(segments, top), nxt[0], ids[0]]),
+        np.column_stack([np.full(segments, bottom), ids[-1], nxt[-1]]),
+        ])
+    return vertices, faces
+
+def bumped_grid(size, cells):
+    # open heightfield, only border vertices are locked by decimation
+    x, z = np.meshgrid(np.linspace(0.0, size, cells + 1), np.linspace(0.0, size, cells + 1), indexing='ij')
+    y = 0.1 * size * np.sin(x / size * np.pi) * np.sin(z / size * np.pi)
+    vertices = np.column_stack([x.ravel(), y.ravel(), z.ravel()])
+    ids = np.arange((cells + 1) ** 2).reshape(cells + 1, cells + 1)
+    a, b, c, d = ids[:-1, :-1].ravel(), ids[1:, :-1].ravel(), ids[1:, 1:].ravel(), ids[:-1, 1:].ravel()
+    faces = np.concatenate([np.column_stack([a, d, c]), np.column_stack([a, c, b])])
+    return vertices, faces
+
+def seamed_grid(size, cells):
+    # bumped grid cut in half along middle column, right half uses its own copies of seam vertices
+    vertices, faces = bumped_grid(size, cells)
+    seam = np.arange(cells // 2 * (cells + 1), (cells // 2 + 1) * (cells + 1))
+    copies = np.arange(len(vertices))
+    copies[seam] = len(vertices) + np.arange(len(seam))
+    right = np.any(vertices[faces][:, :, 0] > size / 2 + 1e-9, axis=1)
+    faces = faces.copy()
+    faces[right] = copies[faces[right]]
+    return np.concatenate([vertices, vertices[seam]]), faces
+
+def set_surface(vmesh, vertices, faces):
+    # replaces single material of vmesh with given surface, other attributes copied from first vertex
+    rows = np.repeat(vmesh.get_vertices_array()[:1], len(vertices), axis=0)
+    vmesh.get_attribute_array(D3DDECLUSAGE.POSITION, rows)[:] = vertices
+    vmesh.set_vertices_array(rows)
+    vmesh.index = tuple(faces.ravel().tolist())
+    vmesh.indexnum = len(vmesh.index)
+    material = vmesh.geoms[0].lods[0].materials[0]
+    material.vstart, material.istart = 0, 0
+    material.vnum, material.inum = len(vertices), len(vmesh.index)
@@ -0,0 +1,139 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+from bf2mesh import bake
+from bf2mesh.bf2types import D3DDECLUSAGE
+from bf2mesh.visiblemesh import VisibleMesh
+from bf2mesh.collisionmesh import CollisionMesh, rotation_matrix
+
+class test_bake_static_placements(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_dest = 'tests/samples/staticmesh/evil_box_dest/Meshes/evil_box_dest.staticmesh'
+        self.path_root = 'tests/generated/staticmesh/bake'
+        self.placements = [
+            (self.path_mesh, (100.0, 0.0, 20.0), (0.0, 0.0, 0.0)),
+            (self.path_mesh, (110.0, 2.0, 20.0), (90.0, 0.0, 0.0)),
+            (self.path_mesh, (100.0, 0.0, 30.0), (45.0, 10.0, 5.0)),
+            ]
+
+    def tearDown(self):
+        if os.path.isdir(self.path_root):
+            shutil.rmtree(self.path_root)
+
+    def test_can_read_placements(self):
+        os.makedirs(self.path_root)
+        path_con = os.path.join(self.path_root, 'staticobjects.con')
+        with open(path_con, 'w') as fo:
+            fo.write('\n'.join([
+                'rem *** generated by editor ***',
+                'Object.create evil_box',
+                'Object.absolutePosition 491.567/24.653/495.454',
+                'Object.rotation 0.2/0.0/-1.5',
+                'Object.layer 1',
+                '',
+                'Object.create evil_box_dest',
+                'Object.absolutePosition 10.0/0.0/-5.0',
+                ]))
+        self.assertEqual(bake.read_placements(path_con), [
+            ('evil_box', (491.567, 24.653, 495.454), (0.2, 0.0, -1.5)),
+            ('evil_box_dest', (10.0, 0.0, -5.0), (0.0, 0.0, 0.0)),
+            ])
+
+    def test_can_bake_instances(self):
+        vmesh, colmesh, center = bake.bake(self.placements)
+        with VisibleMesh(self.path_mesh) as source:
+            self.assertEqual(vmesh.vertnum, source.vertnum * 3)
+            self.assertEqual(vmesh.indexnum, source.indexnum * 3)
+            self.assertEqual(vmesh.geoms[0].lods[0].matnum, 1)
+
+            positions = source.get_attribute_array(D3DDECLUSAGE.POSITION).astype(np.float64)
+            normals = source.get_attribute_array(D3DDECLUSAGE.NORMAL).astype(np.float64)
+            baked_positions = vmesh.get_attribute_array(D3DDECLUSAGE.POSITION)
+            baked_normals = vmesh.get_attribute_array(D3DDECLUSAGE.NORMAL)
+            for placementId, (_, position, rotation) in enumerate(self.placements):
+                matrix = rotation_matrix(rotation)
+                rows = slice(placementId * source.vertnum, (placementId + 1) * source.vertnum)
+                self.assertTrue(np.allclose(baked_positions[rows] + center, positions @ matrix.T + position, atol=1e-4))
+                self.assertTrue(np.allclose(baked_normals[rows], normals @ matrix.T, atol=1e-5))
+
+        lod = vmesh.geoms[0].lods[0]
+        self.assertTrue(np.allclose((np.array(lod.min) + lod.max) / 2, 0.0, atol=1e-5))
+        self.assertTrue(np.allclose(baked_positions.min(axis=0), lod.min))
+        self.assertTrue(np.allclose(baked_positions.max(axis=0), lod.max))
+
+        with CollisionMesh(os.path.splitext(self.path_mesh)[0] + '.collisionmesh') as source:
+            source_lods = source.geoms[0].subgeoms[0].lods
+            lods = colmesh.geoms[0].subgeoms[0].lods
+            self.assertEqual([lod.coltype for lod in lods], [lod.coltype for lod in source_lods])
+            for lod, source_lod in zip(lods, source_lods):
+                self.assertEqual(lod.facenum, source_lod.facenum * 3)
+                self.assertEqual(lod.znum, lod.facenum)
+                expected = source_lod.vertices.astype(np.float64) @ rotation_matrix(self.placements[1][2]).T + self.placements[1][1]
+                self.assertTrue(np.allclose(lod.vertices[source_lod.vertnum:source_lod.vertnum * 2] + center, expected, atol=1e-4))
+
+    def test_can_split_overflowing_materials(self):
+        vmesh, colmesh, center = bake.bake(self.placements, recenter=False, max_vertices=60)
+        materials = vmesh.geoms[0].lods[0].materials
+        self.assertEqual([material.vnum for material in materials], [50, 25])
+        self.assertEqual(center, (0.0, 0.0, 0.0))
+        index = np.array(vmesh.index)
+        for material in materials:
+            self.assertLess(index[material.istart:material.istart + material.inum].max(), material.vnum)
+        self.assertEqual([[lod.vertnum for lod in subgeom.lods] for subgeom in colmesh.geoms[0].subgeoms], [[24, 24, 24]])
+
+        path_col = os.path.splitext(self.path_mesh)[0] + '.collisionmesh'
+        colmesh = bake.bake_collision([(path_col, position, rotation) for _, position, rotation in self.placements],
+                                      {path_col: CollisionMesh(path_col)}, max_vertices=20)
+        self.assertEqual([[lod.vertnum for lod in subgeom.lods] for subgeom in colmesh.geoms[0].subgeoms], [[16, 16, 16], [8, 8, 8]])
+        with self.assertRaises(OverflowError):
+            bake.bake(self.placements, max_vertices=10)
+
+    def test_can_bake_files_with_destroyed_geoms(self):
+        placements = [(self.path_dest, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0)), (self.path_mesh, (5.0, 0.0, 0.0), (0.0, 0.0, 0.0))]
+        path_baked = os.path.join(self.path_root, 'evil_box_baked', 'meshes', 'evil_box_baked.staticmesh')
+        center = bake.bake_files(placements, path_baked)
+        self.assertFalse(os.path.exists(os.path.splitext(path_baked)[0] + '.collisionmesh'))
+        with VisibleMesh(path_baked) as vmesh, VisibleMesh(self.path_dest) as dest, VisibleMesh(self.path_mesh) as box:
+            self.assertEqual(vmesh.geomnum, 2)
+            for geom, dest_geom in zip(vmesh.geoms, dest.geoms):
+                self.assertEqual(sum(material.vnum for material in geom.lods[0].materials),
+                                 sum(material.vnum for material in dest_geom.lods[0].materials) + box.vertnum)
+            self.assertGreater(center[0], 0.0)
+
+    def test_baked_collision_is_complete(self):
+        path_col = os.path.splitext(self.path_mesh)[0] + '.collisionmesh'
+        colmesh = bake.bake_collision([(path_col, position, rotation) for _, position, rotation in self.placements],
+                                      {path_col: CollisionMesh(path_col)})
+        path_baked = os.path.join(self.path_root, 'evil_box_baked', 'meshes', 'evil_box_baked.collisionmesh')
+        os.makedirs(os.path.dirname(path_baked))
+        colmesh.export(path_baked)
+        with CollisionMesh(path_baked) as baked:
+            for lod in baked.geoms[0].subgeoms[0].lods:
+                self.assertTrue(np.allclose(lod.min, lod.vertices.min(axis=0)))
+                self.assertTrue(np.allclose(lod.max, lod.vertices.max(axis=0)))
+                self.assertGreater(lod.ynum, 0)
+                self.assertEqual(np.unique(lod.zdata).tolist(), list(range(lod.facenum)))
+                self.assertEqual(lod.anum, lod.facenum * 3)
+
+    def test_later_placements_add_geoms_and_lods(self):
+        path_lods = 'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+        for placements in [[(self.path_mesh, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0)), (self.path_dest, (5.0, 0.0, 0.0), (0.0, 0.0, 0.0))],
+                           [(self.path_dest, (5.0, 0.0, 0.0), (0.0, 0.0, 0.0)), (self.path_mesh, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0))]]:
+            vmesh, colmesh, center = bake.bake(placements)
+            self.assertEqual(vmesh.geomnum, 2)
+            for geom in vmesh.geoms:
+                self.assertEqual(sum(material.vnum for material in geom.lods[0].materials), 50)
+
+        vmesh, colmesh, center = bake.bake([(self.path_mesh, (0.0, 0.0, 0.0), (0.0, 0.0, 0.0)), (path_lods, (5.0, 0.0, 0.0), (0.0, 0.0, 0.0))])
+        self.assertEqual([geom.lodnum for geom in vmesh.geoms], [2])
+        with VisibleMesh(path_lods) as lods:
+            self.assertEqual(sum(material.vnum for material in vmesh.geoms[0].lods[1].materials),
+                             25 + sum(material.vnum for material in lods.geoms[0].lods[1].materials))
+
+if __name__ == '__main__':
+    unittest.main()
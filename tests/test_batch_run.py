@@ -0,0 +1,40 @@
+import os
+import unittest
+from functools import partial
+
+from bf2mesh import batch
+
+class test_batch_run_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_root = 'tests/samples/staticmesh'
+        self.pattern = os.path.join(self.path_root, '**', '*.staticmesh')
+        self.path_missing = os.path.join(self.path_root, 'missing.staticmesh')
+
+    def test_can_expand_patterns(self):
+        filenames = batch.expand([self.pattern, self.pattern])
+        self.assertEqual(len(filenames), 3)
+        self.assertEqual(filenames, sorted(filenames))
+        self.assertEqual(batch.expand(self.path_missing), [self.path_missing])
+
+    def test_can_run_on_pool(self):
+        calls = []
+        results, errors = batch.run(os.path.getsize, [self.pattern, self.path_missing], workers=2, pending=1,
+                                    progress=lambda *args: calls.append(args))
+        self.assertEqual(sorted(results), batch.expand(self.pattern))
+        for filename, size in results.items():
+            self.assertEqual(size, os.path.getsize(filename))
+        self.assertEqual(list(errors), [self.path_missing])
+        self.assertIn('FileNotFoundError', errors[self.path_missing])
+        self.assertEqual([call[0] for call in calls], [1, 2, 3, 4])
+        self.assertTrue(all(call[1] == 4 for call in calls))
+
+    def test_can_run_in_process(self):
+        operation = partial(os.path.join, 'prefix')
+        results, errors = batch.run(operation, self.pattern, workers=0, progress=None)
+        self.assertEqual(errors, {})
+        self.assertTrue(all(value == os.path.join('prefix', filename) for filename, value in results.items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import subprocess
+import unittest
+
+from bf2mesh import cli
+from bf2mesh.visiblemesh import VisibleMesh
+from bf2mesh.collisionmesh import CollisionMesh
+
+class test_cli_run_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_colmesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+        self.path_pattern = 'tests/samples/staticmesh/evil_box/Meshes/*mesh'
+        self.path_root = 'tests/generated/staticmesh/cli'
+        os.makedirs(self.path_root, exist_ok=True)
+
+    def test_imports_are_lazy(self):
+        code = 'import sys, bf2mesh.cli; print("numpy" in sys.modules)'
+        self.assertEqual(subprocess.check_output([sys.executable, '-c', code]).strip(), b'False')
+
+    def test_can_print_info(self):
+        self.assertEqual(cli.main(['-j', '1', 'info', self.path_pattern]), 0)
+        lines = cli.info(self.path_colmesh).splitlines()
+        self.assertEqual(lines[1], '  collisionmesh version 10, 1 geoms')
+        self.assertEqual(len(lines), 5)
+
+    def test_can_translate_into_output(self):
+        self.assertEqual(cli.main(['-j', '2', 'translate', '--offset', '0', '1', '0', '-o', self.path_root, self.path_pattern]), 0)
+        with VisibleMesh(os.path.join(self.path_root, 'evil_box.staticmesh')) as vmesh:
+            self.assertEqual(vmesh.geoms[0].lods[0].max[1], 2.0)
+        with CollisionMesh(os.path.join(self.path_root, 'evil_box.collisionmesh')) as colmesh:
+            self.assertEqual(colmesh.geoms[0].subgeoms[0].lods[0].min[1], 1.0)
+
+    def test_can_validate(self):
+        self.assertEqual(cli.validate(self.path_mesh), [])
+        self.assertEqual(cli.validate(self.path_colmesh), [])
+
+        path_broken = os.path.join(self.path_root, 'broken.collisionmesh')
+        with CollisionMesh(self.path_colmesh) as colmesh:
+            colmesh.geoms[0].subgeoms[0].lods[0].faces[0, 0] = 100
+            colmesh.export(path_broken)
+        self.assertEqual(cli.validate(path_broken), ['geom0 subgeom0 PROJECTILE: faces index missing vertices'])
+        self.assertEqual(cli.main(['-j', '1', 'validate', self.path_colmesh, path_broken]), 1)
+
+    def test_can_convert_and_merge(self):
+        path_converted = os.path.join(self.path_root, 'evil_box.collisionmesh')
+        self.assertEqual(cli.main(['-j', '1', 'convert', '--version', '9', '-o', self.path_root, self.path_colmesh]), 0)
+        with CollisionMesh(path_converted) as colmesh:
+            self.assertEqual(colmesh.version, 9)
+
+        path_merged = os.path.join(self.path_root, 'merged.staticmesh')
+        self.assertEqual(cli.main(['merge', self.path_mesh, self.path_mesh, '-o', path_merged]), 0)
+        with VisibleMesh(path_merged) as vmesh:
+            self.assertEqual(vmesh.vertnum, 50)
+
+    def test_can_convert_round_trip(self):
+        for path_source, versions in [(self.path_mesh, [10, 11]), (self.path_mesh, [6, 11]), (self.path_colmesh, [9, 10]), (self.path_colmesh, [8, 10])]:
+            path_converted = os.path.join(self.path_root, os.path.basename(path_source))
+            source = path_source
+            for version in versions:
+                self.assertEqual(cli.main(['-j', '1', 'convert', '--version', str(version), '-o', self.path_root, source]), 0)
+                source = path_converted
+            with open(path_source, 'rb') as original, open(path_converted, 'rb') as converted:
+                self.assertEqual(original.read(), converted.read())
+
+        with VisibleMesh(self.path_mesh) as vmesh:
+            vmesh.change_version(6)
+            path_old = os.path.join(self.path_root, 'evil_box_old.staticmesh')
+            vmesh.export(path_old, update_bounds=False)
+        with VisibleMesh(path_old) as vmesh:
+            self.assertEqual(vmesh.head.version, 6)
+            self.assertEqual(vmesh.geoms[0].lods[0].pivot, (0.0, 0.0, 0.0))
+        self.assertEqual(cli.main(['-j', '1', 'convert', '--version', '9', '-o', self.path_root, self.path_mesh]), 1)
+
+    def test_errors_fail_run(self):
+        self.assertEqual(cli.main(['-j', '1', 'info', os.path.join(self.path_root, 'missing.staticmesh')]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
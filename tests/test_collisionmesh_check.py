@@ -0,0 +1,78 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+from bf2mesh.bf2types import COLTYPE
+from bf2mesh.visiblemesh import VisibleMesh
+from bf2mesh.collisionmesh import CollisionMesh
+from bf2mesh.collisioncheck import find_mismatches
+from bf2mesh.collisioncheck import find_mismatches_batch
+from bf2mesh.collisioncheck import faces_distances
+
+class test_collisionmesh_check_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_colmesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+        self.path_save = 'tests/generated/staticmesh/check/evil_box/meshes/evil_box.staticmesh'
+
+    def test_matching_meshes_have_no_mismatches(self):
+        with VisibleMesh(self.path_mesh) as vmesh, CollisionMesh(self.path_colmesh) as colmesh:
+            for coltype in [COLTYPE.PROJECTILE, COLTYPE.VEHICLE, COLTYPE.SOLDIER]:
+                report = find_mismatches(vmesh, colmesh, coltype=coltype)
+                self.assertAlmostEqual(report['visible_hausdorff'], 0.0)
+                self.assertAlmostEqual(report['collision_hausdorff'], 0.0)
+                self.assertEqual(len(report['visible_faces']), 0)
+                self.assertEqual(len(report['collision_faces']), 0)
+
+    def test_can_find_shifted_collision(self):
+        with VisibleMesh(self.path_mesh) as vmesh, CollisionMesh(self.path_colmesh) as colmesh:
+            lod = colmesh.geoms[0].subgeoms[0].lods[0]
+            # lifting box top, visible top and collision top are 0.5 apart now
+            lod.vertices[lod.vertices[:, 1] > 0.5, 1] += 0.5
+            report = find_mismatches(vmesh, colmesh, coltype=COLTYPE.PROJECTILE)
+            self.assertAlmostEqual(report['visible_hausdorff'], 0.5)
+            self.assertAlmostEqual(report['collision_hausdorff'], 0.5)
+
+            # top faces, sides stay partly covered but their upper corners are off
+            top = np.flatnonzero(np.all(lod.vertices[lod.faces[:, :3], 1] > 1.0, axis=1))
+            self.assertTrue(set(top.tolist()) <= set(report['collision_faces'].tolist()))
+            self.assertGreater(len(report['visible_faces']), 0)
+
+            # other lods still match
+            report = find_mismatches(vmesh, colmesh, coltype=COLTYPE.SOLDIER)
+            self.assertEqual(len(report['visible_faces']), 0)
+
+    def test_can_check_batch(self):
+        os.makedirs(os.path.dirname(self.path_save), exist_ok=True)
+        shutil.copyfile(self.path_mesh, self.path_save)
+        path_colmesh = os.path.splitext(self.path_save)[0] + '.collisionmesh'
+        if os.path.exists(path_colmesh): os.remove(path_colmesh)
+        self.assertEqual(find_mismatches_batch([self.path_save]), {})
+
+        shutil.copyfile(self.path_colmesh, path_colmesh)
+        reports = find_mismatches_batch([self.path_save], coltype=COLTYPE.VEHICLE)
+        self.assertEqual(list(reports), [self.path_save])
+        self.assertEqual(len(reports[self.path_save]['visible_faces']), 0)
+
+    def test_can_find_hole_in_large_face(self):
+        # 20m quad vs same quad with 4m hole away from corners, edges middles and centers
+        outer = np.array([(0.0, 0.0, 0.0), (20.0, 0.0, 0.0), (20.0, 0.0, 20.0), (0.0, 0.0, 20.0)])
+        inner = np.array([(12.0, 0.0, 1.0), (16.0, 0.0, 1.0), (16.0, 0.0, 5.0), (12.0, 0.0, 5.0)])
+        quad = np.array([(0, 1, 2), (0, 2, 3)])
+        ring = np.array([face for i in range(4) for face in [(i, (i + 1) % 4, 4 + (i + 1) % 4), (i, 4 + (i + 1) % 4, 4 + i)]])
+        holed = np.concatenate([outer, inner])
+
+        distances = faces_distances(outer, quad, holed, ring, spacing=100.0)
+        self.assertTrue(np.allclose(distances, 0.0))
+        # hole center is 2m from collision, samples miss it by less than spacing
+        distances = faces_distances(outer, quad, holed, ring, spacing=1.0)
+        self.assertGreater(distances[0], 2.0 - 1.0)
+        self.assertLessEqual(distances[0], 2.0)
+        self.assertAlmostEqual(distances[1], 0.0)
+        self.assertTrue(np.allclose(faces_distances(holed, ring, outer, quad), 0.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import unittest
+
+import numpy as np
+
+from bf2mesh import collisiontree
+from bf2mesh import collisionquery
+from bf2mesh.collisionmesh import CollisionMesh
+
+class test_collisionmesh_edit_tree(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+        self.path_save = 'tests/generated/staticmesh/edit/evil_box/meshes/evil_box.collisionmesh'
+
+    def _grid(self, size):
+        u, w = np.meshgrid(np.linspace(0.0, 10.0, size), np.linspace(0.0, 10.0, size))
+        vertices = np.column_stack([u.ravel(), np.sin(u.ravel()), w.ravel()]).astype(np.float32)
+        ids = np.arange(size * size).reshape(size, size)
+        a, b, c, d = ids[:-1, :-1].ravel(), ids[1:, :-1].ravel(), ids[1:, 1:].ravel(), ids[:-1, 1:].ravel()
+        faces = np.concatenate([np.column_stack([a, b, c]), np.column_stack([a, c, d])])
+        return vertices, np.column_stack([faces, np.zeros(len(faces))]).astype(np.uint16)
+
+    def test_can_build_same_adjacency(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            for lod in colmesh.geoms[0].subgeoms[0].lods:
+                self.assertEqual(collisiontree.build_adjacency(lod.faces).tolist(), lod.adata.tolist())
+
+    def test_can_traverse_original_tree(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            lod = colmesh.geoms[0].subgeoms[0].lods[0]
+            found = collisiontree.traverse(lod.ydata, lod.zdata, lod.min, lod.max)
+            self.assertEqual(found.tolist(), list(range(lod.facenum)))
+
+    def test_can_build_tree_reaching_every_face(self):
+        vertices, faces = self._grid(30)
+        ydata, zdata = collisiontree.build_tree(vertices, faces)
+        self.assertGreater(len(ydata), 1)
+        self.assertEqual(np.unique(zdata).tolist(), list(range(len(faces))))
+
+        # every leaf reference should stay in zdata
+        for side, flag, key in [(0, collisiontree.LEFT_LEAF, 'left'), (1, collisiontree.RIGHT_LEAF, 'right')]:
+            leafs = (ydata['flags'] & flag) != 0
+            counts = (ydata['counts'][leafs].astype(np.int64) >> (8 * side)) & 0xff
+            self.assertTrue(np.all(ydata[key][leafs] + counts <= len(zdata)))
+            self.assertTrue(np.all(ydata[key][~leafs] < len(ydata)))
+
+        # box query returns superset of faces overlapping box
+        fmin, fmax = collisiontree.face_bounds(vertices, faces)
+        box_min, box_max = np.array([2.0, -1.0, 2.0]), np.array([3.0, 1.0, 3.0])
+        overlapping = np.flatnonzero(np.all((fmin <= box_max) & (fmax >= box_min), axis=1))
+        found = collisiontree.traverse(ydata, zdata, box_min, box_max)
+        self.assertTrue(set(overlapping.tolist()) <= set(found.tolist()))
+        self.assertLess(len(found), len(faces) // 4)
+
+    def test_big_leafs_split_for_plane_traversal(self):
+        # long faces overlapping ~100 neighbours each, depth limit leaves leafs over byte count
+        starts = np.arange(600) * 0.02
+        vertices = np.concatenate([np.column_stack([starts, np.zeros(600), np.zeros(600)]),
+                                   np.column_stack([starts + 2.0, np.zeros(600), np.zeros(600)]),
+                                   np.column_stack([starts + 1.0, np.full(600, 0.1), np.full(600, 0.1)])])
+        ids = np.arange(600)
+        faces = np.column_stack([ids, ids + 600, ids + 1200])
+        ydata, zdata = collisiontree.build_tree(vertices, faces, max_depth=1)
+        self.assertGreater(len(zdata), len(faces))
+        counts = np.concatenate([ydata['counts'] & 0xff, ydata['counts'] >> 8])
+        self.assertLessEqual(counts.max(), collisiontree.MAX_LEAF_FACES)
+
+        # engine picks child by split plane, every point on face reaches leaf holding that face
+        random = np.random.default_rng(1)
+        weights = random.dirichlet(np.ones(3), len(faces))
+        points = np.einsum('fk,fkx->fx', weights, vertices[faces])
+        for faceId, point in enumerate(points):
+            self.assertIn(faceId, collisiontree.traverse(ydata, zdata, point, point))
+
+    def test_overlapping_faces_over_leaf_size_raise(self):
+        # thin faces all crossing center, no plane leaves less than 255 faces in child
+        angles = np.linspace(0.0, np.pi, 300, endpoint=False)
+        ends = np.column_stack([np.cos(angles), np.zeros_like(angles), np.sin(angles)]) * 5.0
+        vertices = np.concatenate([ends, -ends, -ends + (0.0, 0.05, 0.0)])
+        ids = np.arange(len(angles))
+        faces = np.column_stack([ids, ids + len(angles), ids + 2 * len(angles)])
+        with self.assertRaises(OverflowError):
+            collisiontree.build_tree(vertices, faces)
+
+    def test_can_rebuild_trees(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            colmesh.rebuild_trees()
+            colmesh.export(self.path_save)
+        with CollisionMesh(self.path_save) as colmesh, CollisionMesh(self.path_mesh) as original:
+            for lod, lod_original in zip(colmesh.geoms[0].subgeoms[0].lods, original.geoms[0].subgeoms[0].lods):
+                self.assertEqual(lod.min, lod_original.min)
+                self.assertEqual(lod.bmax, lod_original.bmax)
+                self.assertEqual(lod.adata.tolist(), lod_original.adata.tolist())
+                self.assertEqual(lod.ynum, len(lod.ydata))
+                self.assertEqual(np.unique(lod.zdata).tolist(), list(range(lod.facenum)))
+
+
+class test_collisionmesh_edit_merge(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+        self.path_save = 'tests/generated/staticmesh/edit/evil_box_merge/meshes/evil_box_merge.collisionmesh'
+
+    def test_can_merge_collisionmesh(self):
+        with CollisionMesh(self.path_mesh) as colmesh, CollisionMesh(self.path_mesh) as colmesh2:
+            for lod in colmesh2.geoms[0].subgeoms[0].lods:
+                lod.vertices += np.array([3.0, 0.0, 0.0], dtype=np.float32)
+            other_faces = colmesh2.geoms[0].subgeoms[0].lods[0].faces.copy()
+
+            colmesh.merge(colmesh2)
+            colmesh.export(self.path_save)
+
+            # other mesh stays untouched
+            self.assertEqual(colmesh2.geoms[0].subgeoms[0].lods[0].faces.tolist(), other_faces.tolist())
+
+        with CollisionMesh(self.path_save) as colmesh:
+            for lod in colmesh.geoms[0].subgeoms[0].lods:
+                self.assertEqual(lod.facenum, 24)
+                self.assertEqual(lod.vertnum, 16)
+                self.assertEqual(lod.vertids.tolist(), [0] * 16)
+                self.assertEqual(lod.faces[12].tolist(), (other_faces[0] + np.array([8, 8, 8, 0])).tolist())
+                self.assertEqual(lod.min, (-0.5, 0.0, -0.5))
+                self.assertEqual(lod.max, (3.5, 1.0, 0.5))
+                self.assertEqual(lod.bmax, (3.5, 1.0, 0.5))
+                self.assertEqual(lod.anum, 72)
+                self.assertEqual(np.unique(lod.zdata).tolist(), list(range(24)))
+
+                # boxes are apart, no shared edges between them
+                self.assertTrue(np.all(lod.adata[:36] < 12))
+                self.assertTrue(np.all(lod.adata[36:] >= 12))
+
+    def test_can_merge_many_collisionmeshes(self):
+        with CollisionMesh(self.path_mesh) as colmesh, CollisionMesh(self.path_mesh) as colmesh2:
+            for offset in range(1, 50):
+                for lod in colmesh2.geoms[0].subgeoms[0].lods:
+                    lod.vertices[:, 0] += 2.0
+                colmesh.merge(colmesh2, rebuild=False)
+            colmesh.rebuild_trees()
+            for lod in colmesh.geoms[0].subgeoms[0].lods:
+                self.assertEqual(lod.facenum, 12 * 50)
+                self.assertEqual(lod.max, (98.5, 1.0, 0.5))
+                self.assertEqual(np.unique(lod.zdata).tolist(), list(range(lod.facenum)))
+
+    def test_merge_raise_exception_if_lods_differ(self):
+        with CollisionMesh(self.path_mesh) as colmesh, CollisionMesh(self.path_mesh) as colmesh2:
+            colmesh2.geoms[0].subgeoms[0].lods.pop()
+            colmesh2.geoms[0].subgeoms[0].lodnum -= 1
+            self.assertFalse(colmesh.canMerge(colmesh2))
+            with self.assertRaises(AttributeError):
+                colmesh.merge(colmesh2)
+
+
+class test_collisionmesh_edit_transform(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+
+    def _check_tree(self, lod):
+        # rays through tree from lod should hit same as brute force
+        random = np.random.default_rng(0)
+        origins = random.uniform(-3.0, 3.0, (300, 3))
+        directions = random.normal(size=(300, 3))
+        distances, _ = collisionquery.raycast(lod.vertices, lod.faces, lod.ydata, lod.zdata, origins, directions)
+        directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+        triangles = lod.vertices[lod.faces[:, :3]].astype(np.float64)
+        for rayId in range(len(origins)):
+            brute = collisionquery.intersect_triangles(
+                np.tile(origins[rayId], (lod.facenum, 1)), np.tile(directions[rayId], (lod.facenum, 1)),
+                triangles[:, 0], triangles[:, 1], triangles[:, 2])
+            self.assertAlmostEqual(distances[rayId], brute.min(), places=5)
+
+    def test_can_translate_collisionmesh(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            colmesh.translate((1.0, 2.0, -0.5))
+            for lod in colmesh.geoms[0].subgeoms[0].lods:
+                self.assertEqual(lod.vertices[0].tolist(), [0.5, 2.0, -1.0])
+                self.assertEqual(lod.min, (0.5, 2.0, -1.0))
+                self.assertEqual(lod.max, (1.5, 3.0, 0.0))
+                self.assertEqual(lod.bmax, (1.5, 3.0, 0.0))
+                self.assertEqual(lod.ydata['split'].tolist(), [0.5, 1.5, 2.0])
+                self._check_tree(lod)
+
+    def test_can_rotate_collisionmesh_by_right_angle(self):
+        with CollisionMesh(self.path_mesh) as colmesh, CollisionMesh(self.path_mesh) as original:
+            colmesh.translate((0.25, 0.0, 0.0))
+            colmesh.rotate((90.0, 0.0, 0.0))
+            for lod, lod_original in zip(colmesh.geoms[0].subgeoms[0].lods, original.geoms[0].subgeoms[0].lods):
+                self.assertTrue(np.allclose(lod.min, (-0.5, 0.0, -0.75)))
+                self.assertTrue(np.allclose(lod.max, (0.5, 1.0, 0.25)))
+                # tree remapped, not rebuilt
+                self.assertEqual(lod.ynum, lod_original.ynum)
+                self.assertEqual(lod.zdata.tolist(), lod_original.zdata.tolist())
+                self._check_tree(lod)
+
+    def test_can_rotate_collisionmesh(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            colmesh.rotate((30.0, 15.0, 0.0))
+            for lod in colmesh.geoms[0].subgeoms[0].lods:
+                self.assertTrue(np.allclose(np.linalg.norm(lod.vertices[6] - lod.vertices[0]), np.sqrt(3.0)))
+                self.assertTrue(np.allclose(lod.min, lod.vertices.min(axis=0)))
+                self._check_tree(lod)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+from bf2mesh.bf2types import COLTYPE
+from bf2mesh.visiblemesh import VisibleMesh
+from bf2mesh.collisionmesh import CollisionMesh
+from bf2mesh.collisionmesh import generate_collisionmesh
+from bf2mesh.collisionmesh import generate_collisionmesh_batch
+from bf2mesh.collisionmesh import COLLISION_BUDGETS
+from tests.shapes import uv_sphere, set_surface
+
+class test_collisionmesh_generate_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_colmesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+        self.path_save = 'tests/generated/staticmesh/generate/evil_box/meshes/evil_box.staticmesh'
+
+    def test_can_generate_collisionmesh(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            colmesh = generate_collisionmesh(vmesh, materials={0: 3})
+        with CollisionMesh(self.path_colmesh) as original:
+            self.assertEqual(colmesh.version, original.version)
+            lods = colmesh.geoms[0].subgeoms[0].lods
+            self.assertEqual([lod.coltype for lod in lods], [COLTYPE.PROJECTILE, COLTYPE.VEHICLE, COLTYPE.SOLDIER])
+            for lod, lod_original in zip(lods, original.geoms[0].subgeoms[0].lods):
+                # welded box is same as hand made one
+                self.assertEqual(lod.facenum, lod_original.facenum)
+                self.assertEqual(lod.vertnum, lod_original.vertnum)
+                self.assertEqual(sorted(map(tuple, lod.vertices.tolist())), sorted(map(tuple, lod_original.vertices.tolist())))
+                self.assertEqual(lod.min, lod_original.min)
+                self.assertEqual(lod.max, lod_original.max)
+                self.assertTrue(np.all(lod.faces[:, 3] == 3))
+                self.assertTrue(np.all(lod.adata >= 0))
+                self.assertEqual(np.unique(lod.zdata).tolist(), list(range(lod.facenum)))
+
+    def test_can_generate_with_budgets(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            colmesh = generate_collisionmesh(vmesh, budgets={COLTYPE.PROJECTILE: 12, COLTYPE.SOLDIER: 4})
+        lods = colmesh.geoms[0].subgeoms[0].lods
+        self.assertEqual([lod.coltype for lod in lods], [COLTYPE.PROJECTILE, COLTYPE.SOLDIER])
+        self.assertEqual(lods[0].facenum, 12)
+        self.assertEqual(lods[1].facenum, 4)
+        self.assertEqual(lods[1].vertnum, 4)
+
+    def test_dense_mesh_within_budgets(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            vertices, faces = uv_sphere(2.0, (0.0, 1.0, 0.0), rings=40, segments=60)
+            set_surface(vmesh, vertices, faces)
+            self.assertGreater(len(faces), max(COLLISION_BUDGETS.values()))
+            colmesh = generate_collisionmesh(vmesh, strict=True)
+        lods = colmesh.geoms[0].subgeoms[0].lods
+        self.assertEqual([lod.coltype for lod in lods], [COLTYPE.PROJECTILE, COLTYPE.VEHICLE, COLTYPE.SOLDIER])
+        for lod in lods:
+            self.assertLessEqual(lod.facenum, COLLISION_BUDGETS[lod.coltype])
+            self.assertGreater(lod.facenum, COLLISION_BUDGETS[lod.coltype] // 2)
+            self.assertTrue(np.all(lod.adata >= 0))
+
+    def test_over_budget_is_reported(self):
+        # closed surface does not collapse below two faces
+        with VisibleMesh(self.path_mesh) as vmesh:
+            with self.assertLogs(level='WARNING'):
+                colmesh = generate_collisionmesh(vmesh, budgets={COLTYPE.SOLDIER: 1})
+            self.assertGreater(colmesh.geoms[0].subgeoms[0].lods[0].facenum, 1)
+            with self.assertRaises(OverflowError):
+                generate_collisionmesh(vmesh, budgets={COLTYPE.SOLDIER: 1}, strict=True)
+
+    def test_can_generate_batch(self):
+        os.makedirs(os.path.dirname(self.path_save), exist_ok=True)
+        shutil.copyfile(self.path_mesh, self.path_save)
+        path_colmesh = os.path.splitext(self.path_save)[0] + '.collisionmesh'
+        if os.path.exists(path_colmesh): os.remove(path_colmesh)
+
+        report = generate_collisionmesh_batch([self.path_save])
+        self.assertEqual(report, {self.path_save: path_colmesh})
+        with CollisionMesh(path_colmesh) as colmesh:
+            self.assertEqual(colmesh.geoms[0].subgeoms[0].lodnum, 3)
+
+        # existing collision meshes are not overwritten by default
+        self.assertEqual(generate_collisionmesh_batch([self.path_save]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
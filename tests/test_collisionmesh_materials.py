@@ -0,0 +1,78 @@
+import os
+import shutil
+import unittest
+
+from bf2mesh import materials
+from bf2mesh.bf2types import COLTYPE
+from bf2mesh.collisionmesh import CollisionMesh
+
+class test_collisionmesh_materials_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+        self.path_root = 'tests/generated/staticmesh/materials'
+        self.path_settings = os.path.join(self.path_root, 'materialmanagersettings.con')
+        self.path_save = os.path.join(self.path_root, 'evil_box/meshes/evil_box.collisionmesh')
+        os.makedirs(os.path.dirname(self.path_save), exist_ok=True)
+        with open(self.path_settings, 'w') as settings:
+            settings.write('MaterialManager.createCell 1 18\n'
+                           'MaterialManager.damageMod 1\n'
+                           'MaterialManager.createCell 1 20\n'
+                           'MaterialManager.damageMod 0.5\n'
+                           'MaterialManager.createCell 2 18\n'
+                           'MaterialManager.damageMod 0.25\n')
+
+    def test_can_read_cells(self):
+        cells = materials.read_cells(self.path_settings)
+        self.assertEqual(cells['attacker'].tolist(), [1, 1, 2])
+        self.assertEqual(cells['target'].tolist(), [18, 20, 18])
+        self.assertEqual(cells['damage'].tolist(), [1.0, 0.5, 0.25])
+
+    def test_can_remap_materials(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            lod = colmesh.geoms[0].subgeoms[0].lods[0]
+            lod.faces[:6, 3] = 1
+            colmesh.remap_materials({0: 5, 1: 7})
+            self.assertEqual(lod.faces[:, 3].tolist(), [7] * 6 + [5] * 6)
+            self.assertEqual(colmesh.get_materials().tolist(), [5, 7])
+            for mapping in [{5: 0x10000}, {5: -1}, {-1: 5}, {0x10000: 5}]:
+                with self.assertRaises(OverflowError):
+                    colmesh.remap_materials(mapping)
+            self.assertEqual(lod.faces[:, 3].tolist(), [7] * 6 + [5] * 6)
+
+    def test_can_get_material_stats(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            lod = colmesh.geoms[0].subgeoms[0].lods[0]
+            lod.faces[:4, 3] = 2
+            stats = colmesh.get_material_stats(COLTYPE.PROJECTILE)
+            self.assertEqual(sorted(stats), [0, 2])
+            self.assertEqual(stats[0][0] + stats[2][0], 12)
+            self.assertAlmostEqual(stats[0][1] + stats[2][1], 6.0)
+            self.assertEqual(stats[2][0], 4)
+
+            stats = colmesh.get_material_stats()
+            self.assertEqual(stats[0][0] + stats[2][0], 36)
+
+    def test_can_check_materials(self):
+        cells = materials.read_cells(self.path_settings)
+        with CollisionMesh(self.path_mesh) as colmesh:
+            self.assertEqual(materials.check_materials(colmesh, cells).tolist(), [0])
+            self.assertEqual(materials.check_materials(colmesh, cells, {0: ('Metal_Solid', 18)}).tolist(), [])
+            self.assertEqual(materials.check_materials(colmesh, cells, {0: ('Wood', 19)}).tolist(), [19])
+
+    def test_can_audit_materials(self):
+        shutil.copyfile(self.path_mesh, self.path_save)
+        path_tweak = materials.get_tweak_filename(self.path_save)
+        self.assertEqual(path_tweak, os.path.join(self.path_root, 'evil_box', 'evil_box.tweak'))
+
+        with open(path_tweak, 'w') as tweak:
+            tweak.write('ObjectTemplate.mapMaterial 0 Metal_Solid 18\n')
+        self.assertEqual(materials.audit_materials([self.path_save], self.path_settings), {})
+
+        with open(path_tweak, 'w') as tweak:
+            tweak.write('ObjectTemplate.mapMaterial 0 Glass 99\n')
+        self.assertEqual(materials.audit_materials([self.path_save], self.path_settings), {self.path_save: [99]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+
+import numpy as np
+
+from bf2mesh import collisiontree
+from bf2mesh import collisionquery
+from bf2mesh.bf2types import COLTYPE
+from bf2mesh.collisionmesh import CollisionMesh
+
+class test_collisionmesh_query_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+
+    def test_can_raycast(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            origins = [(0.0, 5.0, 0.0), (0.0, 0.5, 0.0), (3.0, 5.0, 0.0), (-2.0, 0.5, 0.2)]
+            directions = [(0.0, -1.0, 0.0), (2.0, 0.0, 0.0), (0.0, -1.0, 0.0), (1.0, 0.0, 0.0)]
+            distances, materials = colmesh.raycast(origins, directions, coltype=COLTYPE.SOLDIER)
+            self.assertTrue(np.allclose(distances, [4.0, 0.5, np.inf, 1.5]))
+            self.assertEqual(materials[2], -1)
+            self.assertTrue(np.all(materials[[0, 1, 3]] == 0))
+
+    def test_can_raycast_limited_distance(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            distances, materials = colmesh.raycast([(0.0, 5.0, 0.0)] * 2, (0.0, -1.0, 0.0), max_distance=3.0)
+            self.assertTrue(np.all(np.isinf(distances)))
+
+    def test_can_find_closest_point(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            positions, distances, materials = colmesh.closest_point([(2.0, 0.5, 0.0), (0.0, 3.0, 0.0), (0.1, 0.2, 0.0)])
+            self.assertTrue(np.allclose(positions, [(0.5, 0.5, 0.0), (0.0, 1.0, 0.0), (0.1, 0.0, 0.0)]))
+            self.assertTrue(np.allclose(distances, [1.5, 2.0, 0.2]))
+            self.assertTrue(np.all(materials == 0))
+
+
+class test_collisionmesh_query_grid(unittest.TestCase):
+
+    def setUp(self):
+        size = 40
+        u, w = np.meshgrid(np.linspace(0.0, 10.0, size), np.linspace(0.0, 10.0, size))
+        self.vertices = np.column_stack([u.ravel(), np.sin(u.ravel()) * 0.5, w.ravel()])
+        ids = np.arange(size * size).reshape(size, size)
+        a, b, c, d = ids[:-1, :-1].ravel(), ids[1:, :-1].ravel(), ids[1:, 1:].ravel(), ids[:-1, 1:].ravel()
+        self.faces = np.concatenate([np.column_stack([a, b, c]), np.column_stack([a, c, d])])
+        self.ydata, self.zdata = collisiontree.build_tree(self.vertices, self.faces)
+        self.triangles = self.vertices[self.faces]
+        self.random = np.random.default_rng(0)
+
+    def test_raycast_same_as_brute_force(self):
+        origins = self.random.uniform(-1.0, 11.0, (200, 3))
+        directions = self.random.normal(size=(200, 3))
+        distances, faceIds = collisionquery.raycast(self.vertices, self.faces, self.ydata, self.zdata, origins, directions)
+        directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+        for rayId in range(len(origins)):
+            brute = collisionquery.intersect_triangles(
+                np.tile(origins[rayId], (len(self.faces), 1)), np.tile(directions[rayId], (len(self.faces), 1)),
+                self.triangles[:, 0], self.triangles[:, 1], self.triangles[:, 2])
+            self.assertAlmostEqual(distances[rayId], brute.min())
+        self.assertTrue(np.any(faceIds >= 0))
+
+    def test_closest_point_same_as_brute_force(self):
+        points = self.random.uniform(-1.0, 11.0, (200, 3))
+        positions, distances, faceIds = collisionquery.closest_point(self.vertices, self.faces, self.ydata, self.zdata, points, chunk=64)
+        for pointId, point in enumerate(points):
+            brute = collisionquery.closest_on_triangles(
+                np.tile(point, (len(self.faces), 1)), self.triangles[:, 0], self.triangles[:, 1], self.triangles[:, 2])
+            self.assertAlmostEqual(distances[pointId], np.linalg.norm(brute - point, axis=1).min())
+        self.assertTrue(np.allclose(np.linalg.norm(positions - points, axis=1), distances))
+
+
+class test_collisionmesh_query_slivers(unittest.TestCase):
+
+    def setUp(self):
+        # thin faces all crossing center, no split plane separates them, still fit one leaf
+        angles = np.linspace(0.0, np.pi, 200, endpoint=False)
+        ends = np.column_stack([np.cos(angles), np.zeros_like(angles), np.sin(angles)]) * 5.0
+        self.vertices = np.concatenate([ends, -ends, -ends + (0.0, 0.05, 0.0)])
+        ids = np.arange(len(angles))
+        self.faces = np.column_stack([ids, ids + len(angles), ids + 2 * len(angles)])
+        self.triangles = self.vertices[self.faces]
+        self.random = np.random.default_rng(1)
+
+    def test_queries_same_as_brute_force(self):
+        ydata, zdata = collisiontree.build_tree(self.vertices, self.faces)
+        origins = self.random.uniform(-6.0, 6.0, (100, 3))
+        directions = self.random.normal(size=(100, 3))
+        distances, faceIds = collisionquery.raycast(self.vertices, self.faces, ydata, zdata, origins, directions)
+        positions, point_distances, _ = collisionquery.closest_point(self.vertices, self.faces, ydata, zdata, origins)
+        directions = directions / np.linalg.norm(directions, axis=1)[:, None]
+        for rayId in range(len(origins)):
+            brute = collisionquery.intersect_triangles(
+                np.tile(origins[rayId], (len(self.faces), 1)), np.tile(directions[rayId], (len(self.faces), 1)),
+                self.triangles[:, 0], self.triangles[:, 1], self.triangles[:, 2])
+            self.assertAlmostEqual(distances[rayId], brute.min())
+            brute = collisionquery.closest_on_triangles(
+                np.tile(origins[rayId], (len(self.faces), 1)), self.triangles[:, 0], self.triangles[:, 1], self.triangles[:, 2])
+            self.assertAlmostEqual(point_distances[rayId], np.linalg.norm(brute - origins[rayId], axis=1).min())
+
+    def test_lod_keeps_query_tree(self):
+        colmesh = CollisionMesh('tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh')
+        lod = colmesh.geoms[0].subgeoms[0].lods[0]
+        tree = lod.get_query_tree()
+        lod.raycast([(0.0, 5.0, 0.0)], [(0.0, -1.0, 0.0)])
+        self.assertIs(lod.get_query_tree(), tree)
+        lod.translate((0.0, 1.0, 0.0))
+        self.assertIsNot(lod.get_query_tree(), tree)
+        tree = lod.get_query_tree()
+        lod.rebuild_tree()
+        self.assertIsNot(lod.get_query_tree(), tree)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from bf2mesh.bf2types import COLTYPE
+from bf2mesh.collisionmesh import CollisionMesh
+
+class test_collisionmesh_read_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+
+    def test_can_read_header(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            self.assertEqual(colmesh.u1, 0)
+            self.assertEqual(colmesh.version, 10)
+
+    def test_can_read_geoms(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            self.assertTrue(len(colmesh.geoms) == colmesh.geomnum == 1)
+            self.assertTrue(len(colmesh.geoms[0].subgeoms) == colmesh.geoms[0].subgeomnum == 1)
+            self.assertTrue(len(colmesh.geoms[0].subgeoms[0].lods) == colmesh.geoms[0].subgeoms[0].lodnum == 3)
+
+    def test_can_read_lods(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            for coltype, lod in zip([COLTYPE.PROJECTILE, COLTYPE.VEHICLE, COLTYPE.SOLDIER], colmesh.geoms[0].subgeoms[0].lods):
+                self.assertEqual(lod.coltype, coltype)
+                self.assertEqual(lod.facenum, 12)
+                self.assertEqual(lod.faces.shape, (12, 4))
+                self.assertEqual(lod.faces.dtype, np.uint16)
+                self.assertEqual(lod.faces[0].tolist(), [0, 1, 2, 0])
+                self.assertEqual(lod.vertnum, 8)
+                self.assertEqual(lod.vertices.shape, (8, 3))
+                self.assertEqual(lod.vertices.dtype, np.float32)
+                self.assertEqual(lod.vertices[0].tolist(), [-0.5, 0.0, -0.5])
+                self.assertEqual(lod.vertids.tolist(), [0] * 8)
+                self.assertEqual(lod.min, (-0.5, 0.0, -0.5))
+                self.assertEqual(lod.max, (0.5, 1.0, 0.5))
+                self.assertEqual(lod.u7, 49)
+                self.assertEqual(lod.ynum, 3)
+                self.assertEqual(lod.ydata[0]['split'], -0.5)
+                self.assertEqual(lod.znum, 12)
+                self.assertEqual(lod.anum, 36)
+                self.assertEqual(lod.adata[0:3].tolist(), [10, 8, 1])
+
+    def test_can_load_collisionmesh(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            self.assertTrue(colmesh.isCollisionMesh)
+            self.assertTrue(colmesh.isLoaded)
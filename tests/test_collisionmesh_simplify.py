@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from bf2mesh import collisionquery
+from bf2mesh.bf2types import COLTYPE
+from bf2mesh.collisionmesh import CollisionMesh
+from tests.shapes import uv_sphere
+
+class test_collisionmesh_simplify_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+
+    def test_small_lod_is_copied(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            colmesh.simplify_lods()
+            lods = colmesh.geoms[0].subgeoms[0].lods
+            self.assertEqual([lod.coltype for lod in lods], [COLTYPE.PROJECTILE, COLTYPE.VEHICLE, COLTYPE.SOLDIER])
+            for lod in lods[1:]:
+                self.assertEqual(lod.facenum, 12)
+                self.assertEqual(lod.vertnum, 8)
+                self.assertEqual(np.unique(lod.zdata).tolist(), list(range(lod.facenum)))
+
+    def test_over_budget_is_reported(self):
+        # every part keeps at least tetrahedron
+        with CollisionMesh(self.path_mesh) as colmesh:
+            with self.assertLogs(level='WARNING'):
+                colmesh.simplify_lods({COLTYPE.SOLDIER: 2})
+            self.assertGreater(colmesh.geoms[0].subgeoms[0].lods[-1].facenum, 2)
+            with self.assertRaises(OverflowError):
+                colmesh.simplify_lods({COLTYPE.SOLDIER: 2}, strict=True)
+
+    def test_can_simplify_within_budgets(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            box = colmesh.geoms[0].subgeoms[0].lods[0]
+            sphere_vertices, sphere_faces = uv_sphere(3.0, (5.0, 3.0, 0.0))
+            box.vertices = np.concatenate([box.vertices, sphere_vertices]).astype(np.float32)
+            faces = np.column_stack([sphere_faces + box.vertnum, np.full(len(sphere_faces), 2)])
+            box.faces = np.concatenate([box.faces, faces]).astype(np.uint16)
+            box.vertnum, box.facenum = len(box.vertices), len(box.faces)
+            box.vertids = np.zeros(box.vertnum, dtype=np.uint16)
+            box.rebuild_tree()
+            source = box.vertices.astype(np.float64)
+
+            colmesh.simplify_lods({COLTYPE.VEHICLE: 200, COLTYPE.SOLDIER: 60}, small_part=2.0, strict=True)
+            lods = colmesh.geoms[0].subgeoms[0].lods
+            self.assertEqual([lod.coltype for lod in lods], [COLTYPE.PROJECTILE, COLTYPE.VEHICLE, COLTYPE.SOLDIER])
+            self.assertEqual(lods[0].facenum, 12 + len(sphere_faces))
+            for lod, budget in zip(lods[1:], [200, 60]):
+                self.assertLessEqual(lod.facenum, budget)
+                self.assertEqual(set(lod.faces[:, 3].tolist()), {0, 2})
+                self.assertTrue(np.all(lod.adata >= 0))
+                self.assertEqual(np.unique(lod.zdata).tolist(), list(range(lod.facenum)))
+                self.assertTrue(np.allclose(lod.min, lod.vertices.min(axis=0)))
+
+                # every source vertex on or behind its closest simplified face
+                vertices = lod.vertices.astype(np.float64)
+                faces = lod.faces[:, :3].astype(np.int64)
+                positions, _, faceIds = collisionquery.closest_point(vertices, faces, lod.ydata, lod.zdata, source)
+                triangles = vertices[faces[faceIds]]
+                normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+                normals /= np.linalg.norm(normals, axis=1)[:, None]
+                self.assertTrue(np.all(np.einsum('ij,ij->i', source - positions, normals) < 1e-4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+
+from bf2mesh.collisionmesh import CollisionMesh
+
+class test_collisionmesh_write_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.collisionmesh'
+        self.path_save = 'tests/generated/staticmesh/write/evil_box/meshes/evil_box.collisionmesh'
+
+    def test_can_write_same_bytes(self):
+        with CollisionMesh(self.path_mesh) as colmesh:
+            colmesh.export(self.path_save)
+        with open(self.path_mesh, 'rb') as original, open(self.path_save, 'rb') as saved:
+            self.assertEqual(original.read(), saved.read())
+
+    def test_can_write_old_versions(self):
+        for version in [8, 9, 10]:
+            with CollisionMesh(self.path_mesh) as colmesh:
+                colmesh.version = version
+                colmesh.export(self.path_save)
+            with CollisionMesh(self.path_save) as colmesh_save:
+                self.assertEqual(colmesh_save.version, version)
+                colmesh_save.export(self.path_save + '.copy')
+            with open(self.path_save, 'rb') as saved, open(self.path_save + '.copy', 'rb') as copy:
+                self.assertEqual(saved.read(), copy.read())
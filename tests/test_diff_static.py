@@ -0,0 +1,67 @@
+import os
+import shutil
+import unittest
+
+from bf2mesh import diff
+from bf2mesh.bf2types import D3DDECLUSAGE
+from bf2mesh.visiblemesh import VisibleMesh
+
+class test_diff_static_meshes(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_lods = 'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+        self.path_root_a = 'tests/generated/staticmesh/diff/a'
+        self.path_root_b = 'tests/generated/staticmesh/diff/b'
+
+    def test_same_meshes_have_no_diff(self):
+        self.assertEqual(diff.diff(self.path_mesh, self.path_mesh), {'fields': [], 'vertices': {}})
+
+    def test_can_diff_every_field(self):
+        with VisibleMesh(self.path_mesh) as vmesh_a, VisibleMesh(self.path_mesh) as vmesh_b:
+            material = vmesh_b.geoms[0].lods[0].materials[0]
+            material.technique = b'BaseDetail'
+            material.maps[1] = b'common/textures/other.dds'
+            vmesh_b.geoms[0].lods[0].max = (0.5, 1.0, 0.6)
+            vertices = vmesh_b.get_vertices_array()
+            vmesh_b.get_attribute_array(D3DDECLUSAGE.POSITION, vertices)[:4] += (0.0, 0.3, 0.4)
+            vmesh_b.get_attribute_array(D3DDECLUSAGE.UV1, vertices)[4] += 0.25
+            vmesh_b.set_vertices_array(vertices)
+
+            report = diff.diff(vmesh_a, vmesh_b)
+            paths = [path for path, a, b in report['fields']]
+            self.assertEqual(paths, ['geoms[0].lods[0].max', 'geoms[0].lods[0].materials[0].technique', 'geoms[0].lods[0].materials[0].maps'])
+            self.assertEqual(report['fields'][1][1:], (b'Base', b'BaseDetail'))
+
+            delta = report['vertices']['geoms[0].lods[0].materials[0]']
+            self.assertAlmostEqual(delta['max'], 0.5)
+            self.assertAlmostEqual(delta['mean'], 0.5 * 4 / 25)
+            self.assertEqual(delta['changed'], 5)
+            self.assertAlmostEqual(delta['attributes']['UV1'], 0.25)
+            self.assertEqual(delta['attributes']['NORMAL'], 0.0)
+
+            # small changes within tolerance
+            self.assertEqual(len(diff.diff(vmesh_a, vmesh_b, tolerance=1.0)['fields']), 2)
+
+    def test_can_diff_structure(self):
+        report = diff.diff(self.path_mesh, self.path_lods)
+        fields = dict((path, (a, b)) for path, a, b in report['fields'])
+        self.assertEqual(fields['geoms[0].lodnum'], (1, 2))
+        self.assertEqual(fields['vertnum'], (25, 50))
+
+    def test_can_diff_trees(self):
+        for root in [self.path_root_a, self.path_root_b]:
+            if os.path.exists(root): shutil.rmtree(root)
+            shutil.copytree(os.path.dirname(self.path_mesh), root)
+        path_b = os.path.join(self.path_root_b, 'evil_box.staticmesh')
+        with VisibleMesh(path_b) as vmesh:
+            vmesh.translate((0.0, 0.0, 1.0))
+            vmesh.export(path_b, update_bounds=False)
+        reports, errors = diff.diff_trees(self.path_root_a, self.path_root_b, workers=0)
+        self.assertEqual(errors, {})
+        self.assertEqual(list(reports), [os.path.join(self.path_root_a, 'evil_box.staticmesh')])
+        self.assertEqual(reports[os.path.join(self.path_root_a, 'evil_box.staticmesh')]['fields'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
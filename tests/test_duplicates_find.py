@@ -0,0 +1,74 @@
+import os
+import shutil
+import unittest
+
+from bf2mesh import duplicates
+from bf2mesh.visiblemesh import VisibleMesh
+
+class test_duplicates_find_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_root = 'tests/generated/staticmesh/duplicates'
+        if os.path.exists(self.path_root): shutil.rmtree(self.path_root)
+        shutil.copytree('tests/samples/staticmesh', self.path_root)
+        self.path_copy = os.path.join(self.path_root, 'evil_box_copy/meshes/evil_box_copy.staticmesh')
+        self.path_moved = os.path.join(self.path_root, 'evil_box_moved/meshes/evil_box_moved.staticmesh')
+        self.path_textured = os.path.join(self.path_root, 'evil_box_textured/meshes/evil_box_textured.staticmesh')
+        os.makedirs(os.path.dirname(self.path_copy))
+        shutil.copyfile(self.path_mesh, self.path_copy)
+        with VisibleMesh(self.path_mesh) as vmesh:
+            vmesh.translate((0.00001, 0.0, 0.0))
+            vmesh.export(self.path_moved, update_bounds=False)
+        with VisibleMesh(self.path_mesh) as vmesh:
+            vmesh.geoms[0].lods[0].materials[0].maps[0] = b'objects/other_c.dds'
+            vmesh.export(self.path_textured, update_bounds=False)
+
+    def test_can_hash_mesh(self):
+        hashes = duplicates.hash_mesh(self.path_mesh)
+        self.assertEqual(hashes, duplicates.hash_mesh(self.path_copy))
+        moved = duplicates.hash_mesh(self.path_moved)
+        self.assertNotEqual(hashes['file'], moved['file'])
+        self.assertNotEqual(hashes['materials'], moved['materials'])
+        self.assertEqual(hashes['topology'], moved['topology'])
+
+        textured = duplicates.hash_mesh(self.path_textured)
+        self.assertNotEqual(hashes['geoms'], textured['geoms'])
+        self.assertEqual(hashes['topology'], textured['topology'])
+
+    def test_can_find_duplicates(self):
+        path_original = os.path.join(self.path_root, 'evil_box/Meshes/evil_box.staticmesh')
+        path_dest = os.path.join(self.path_root, 'evil_box_dest/Meshes/evil_box_dest.staticmesh')
+        report = duplicates.find_duplicates(self.path_root, workers=0)
+        self.assertEqual(report['errors'], {})
+        self.assertEqual(report['exact'], [[path_original, self.path_copy]])
+        self.assertEqual(report['near'], [sorted([path_original, self.path_copy, self.path_moved, self.path_textured])])
+        # evil_box_dest geoms are copies of evil_box geom
+        shared = report['geoms'][0]
+        self.assertIn((path_dest, 0), shared)
+        self.assertIn((path_dest, 1), shared)
+        self.assertIn((self.path_copy, 0), shared)
+        self.assertNotIn((self.path_textured, 0), shared)
+
+    def test_can_find_off_grid_near_duplicates(self):
+        # rotated positions are far from grid values, shifts close to tolerance
+        tolerance = duplicates.TOLERANCE
+        path_rotated = os.path.join(self.path_root, 'rotated')
+        expected = []
+        for angle in range(12):
+            with VisibleMesh(self.path_mesh) as vmesh:
+                vmesh.rotate((angle * 30.0 + 7.3, 3.1, 0.0))
+                path = os.path.join(path_rotated, 'evil_box_%d.staticmesh' % angle)
+                vmesh.export(path, update_bounds=False)
+                vmesh.translate((0.6 * tolerance, 0.6 * tolerance, 0.0))
+                path_near = os.path.join(path_rotated, 'evil_box_%d_near.staticmesh' % angle)
+                vmesh.export(path_near, update_bounds=False)
+                vmesh.translate((0.0, 0.0, 2.0 * tolerance))
+                vmesh.export(os.path.join(path_rotated, 'evil_box_%d_far.staticmesh' % angle), update_bounds=False)
+            expected.append([path, path_near])
+        report = duplicates.find_duplicates(path_rotated, workers=0)
+        self.assertEqual(sorted(report['near']), sorted(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
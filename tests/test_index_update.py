@@ -0,0 +1,76 @@
+import os
+import shutil
+import unittest
+
+from bf2mesh import index
+from bf2mesh.visiblemesh import VisibleMesh
+
+class test_index_update_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_samples = 'tests/samples/staticmesh'
+        self.path_root = 'tests/generated/staticmesh/index/objects'
+        self.path_database = 'tests/generated/staticmesh/index/objects.db'
+        if os.path.exists(self.path_root): shutil.rmtree(self.path_root)
+        if os.path.exists(self.path_database): os.remove(self.path_database)
+        shutil.copytree(self.path_samples, self.path_root)
+
+    def test_can_read_metadata(self):
+        digest, metadata = index.scan_file(os.path.join(self.path_root, 'evil_box/Meshes/evil_box.staticmesh'))
+        with VisibleMesh(os.path.join(self.path_samples, 'evil_box/Meshes/evil_box.staticmesh')) as vmesh:
+            self.assertEqual(metadata['version'], vmesh.head.version)
+            self.assertEqual(metadata['vertnum'], vmesh.vertnum)
+            self.assertEqual(metadata['indexnum'], vmesh.indexnum)
+            lod = metadata['geoms'][0][0]
+            self.assertEqual(lod['min'], vmesh.geoms[0].lods[0].min)
+            self.assertEqual(lod['materials'][0]['maps'], [texture.decode() for texture in vmesh.geoms[0].lods[0].materials[0].maps])
+
+    def test_can_update_incrementally(self):
+        connection, stats = index.update_index(self.path_root, self.path_database, workers=0)
+        self.assertEqual(stats, {'added': 3, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0})
+        self.assertEqual(index.find_by_texture(connection, 'OBJECTS/staticobjects/test/evil_box/textures/evil_box_c.dds'),
+                         ['evil_box/Meshes/evil_box.staticmesh', 'evil_box_dest/Meshes/evil_box_dest.staticmesh'])
+        self.assertEqual(len(index.find_by_shader(connection, 'staticmesh.fx')), 3)
+        self.assertEqual(index.find_lods_over(connection, 12), [])
+        self.assertEqual(len(index.find_lods_over(connection, 11)), 5)
+        connection.close()
+
+        # touched file is rehashed only, changed file reparsed, missing file dropped
+        path_touched = os.path.join(self.path_root, 'evil_box/Meshes/evil_box.staticmesh')
+        os.utime(path_touched, (0, 0))
+        path_changed = os.path.join(self.path_root, 'evil_box_lods/Meshes/evil_box_lods.staticmesh')
+        with VisibleMesh(path_changed) as vmesh:
+            vmesh.translate((0.0, 5.0, 0.0))
+            vmesh.export(path_changed)
+        os.remove(os.path.join(self.path_root, 'evil_box_dest/Meshes/evil_box_dest.staticmesh'))
+
+        connection, stats = index.update_index(self.path_root, self.path_database, workers=0)
+        self.assertEqual(stats, {'added': 0, 'updated': 1, 'unchanged': 1, 'removed': 1, 'failed': 0})
+        max_y, = connection.execute('SELECT max_y FROM lods JOIN files ON files.id = lods.file_id '
+                                    'WHERE path = ? AND lod = 0', ('evil_box_lods/Meshes/evil_box_lods.staticmesh',)).fetchone()
+        self.assertEqual(max_y, 6.0)
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM lods').fetchone()[0], 3)
+        connection.close()
+
+        connection, stats = index.update_index(self.path_root, self.path_database, workers=0)
+        self.assertEqual(stats['unchanged'], 2)
+        connection.close()
+
+    def test_broken_file_dropped(self):
+        connection, stats = index.update_index(self.path_root, self.path_database, workers=0)
+        connection.close()
+        path_broken = os.path.join(self.path_root, 'evil_box_lods/Meshes/evil_box_lods.staticmesh')
+        with open(path_broken, 'r+b') as fo:
+            fo.truncate(100)
+
+        connection, stats = index.update_index(self.path_root, self.path_database, workers=0)
+        self.assertEqual(stats, {'added': 0, 'updated': 0, 'unchanged': 2, 'removed': 0, 'failed': 1})
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM files WHERE path = ?',
+                                            ('evil_box_lods/Meshes/evil_box_lods.staticmesh',)).fetchone()[0], 0)
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM lods').fetchone()[0], 3)
+        self.assertEqual(len(index.find_by_shader(connection, 'staticmesh.fx')), 2)
+        connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
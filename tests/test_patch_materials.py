@@ -0,0 +1,64 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+from bf2mesh import patch
+from bf2mesh.visiblemesh import VisibleMesh
+
+class test_patch_materials_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+        self.path_root = 'tests/generated/staticmesh/patch'
+        self.path_save = os.path.join(self.path_root, 'evil_box_lods.staticmesh')
+        self.path_export = os.path.join(self.path_root, 'evil_box_lods_export.staticmesh')
+        os.makedirs(self.path_root, exist_ok=True)
+        shutil.copyfile(self.path_mesh, self.path_save)
+
+    def test_can_rename_textures(self):
+        renamed = patch.rename_textures(self.path_save, {'Objects\\StaticObjects\\test\\evil_box\\textures\\evil_box_c.dds':
+                                                         'objects/staticobjects/test/evil_box/textures/evil_box_new_c.dds'})
+        self.assertEqual(renamed, 2)
+
+        # same bytes as full load and export
+        with VisibleMesh(self.path_mesh) as vmesh:
+            for lod in vmesh.geoms[0].lods:
+                lod.materials[0].maps[0] = b'objects/staticobjects/test/evil_box/textures/evil_box_new_c.dds'
+            vmesh.export(self.path_export, update_bounds=False)
+        with open(self.path_save, 'rb') as patched, open(self.path_export, 'rb') as exported:
+            self.assertEqual(patched.read(), exported.read())
+
+    def test_unchanged_file_is_not_rewritten(self):
+        os.utime(self.path_save, (0, 0))
+        self.assertEqual(patch.rename_textures(self.path_save, {'missing.dds': 'other.dds'}), 0)
+        self.assertEqual(os.stat(self.path_save).st_mtime, 0)
+
+    def test_can_patch_into_output(self):
+        def edit(material, geomId, lodId, materialId):
+            material.technique = b'BaseDetailCrack'
+        self.assertTrue(patch.patch_materials(self.path_mesh, edit, self.path_export))
+        with VisibleMesh(self.path_export) as vmesh, VisibleMesh(self.path_mesh) as original:
+            self.assertEqual(vmesh.vertices, original.vertices)
+            self.assertEqual(vmesh.index, original.index)
+            self.assertEqual([lod.materials[0].technique for lod in vmesh.geoms[0].lods], [b'BaseDetailCrack'] * 2)
+
+    def test_failed_write_leaves_no_temporary(self):
+        def edit(material, geomId, lodId, materialId):
+            material.technique = b'BaseDetailCrack'
+        with mock.patch.object(patch, 'copy_range', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                patch.patch_materials(self.path_save, edit)
+        self.assertFalse(os.path.exists(self.path_save + '.patch'))
+        with open(self.path_save, 'rb') as patched, open(self.path_mesh, 'rb') as original:
+            self.assertEqual(patched.read(), original.read())
+
+    def test_can_copy_range(self):
+        with open(self.path_mesh, 'rb') as src, open(self.path_export, 'wb') as dst:
+            patch.copy_range(src, dst, 100, offset=10)
+        with open(self.path_mesh, 'rb') as src, open(self.path_export, 'rb') as dst:
+            self.assertEqual(dst.read()[10:], src.read()[10:110])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from bf2mesh import samples
+from bf2mesh.visiblemesh import VisibleMesh
+
+class test_samples_generate_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_samples = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.samples'
+        self.path_save = 'tests/generated/staticmesh/samples/evil_box/meshes/evil_box.staticmesh'
+
+    def test_regenerated_samples_match_original(self):
+        original = samples.StdSample(self.path_samples)
+        with VisibleMesh(self.path_mesh) as vmesh:
+            sample = samples.regenerate_samples(vmesh)
+            self.assertIs(vmesh.geoms[0].lods[0].sample, sample)
+        self.assertEqual((sample.width, sample.height), (original.width, original.height))
+        self.assertEqual(sample.facenum, original.facenum)
+
+        # same texels covered, positions within texel
+        covered = original.data['face'] >= 0
+        self.assertTrue(np.array_equal(sample.data['face'] >= 0, covered))
+        self.assertTrue(np.allclose(sample.data['position'][covered], original.data['position'][covered], atol=1.0 / 64))
+        self.assertTrue(np.allclose(sample.data['rotation'][covered], original.data['rotation'][covered]))
+
+        # samples lay on faces they point to
+        faces = sample.faces[sample.data['face'][covered]]
+        normals = np.cross(faces['v2'] - faces['v1'], faces['v3'] - faces['v1'])
+        offsets = np.einsum('ij,ij->i', sample.data['position'][covered] - faces['v1'], normals)
+        self.assertTrue(np.allclose(offsets, 0.0, atol=1e-5))
+
+    def test_can_regenerate_translated_samples(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            before = samples.regenerate_samples(vmesh, size=(64, 64))
+            vmesh.translate((1.0, 2.0, 3.0))
+            samples.regenerate_samples(vmesh)
+            samples.export_samples(vmesh, self.path_save)
+        after = samples.StdSample(samples.get_samples_filename(self.path_save))
+        self.assertEqual((after.width, after.height), (64, 64))
+        covered = before.data['face'] >= 0
+        self.assertTrue(np.array_equal(after.data['face'], before.data['face']))
+        self.assertTrue(np.allclose(after.data['position'][covered] - before.data['position'][covered], (1.0, 2.0, 3.0), atol=1e-5))
+        self.assertTrue(np.allclose(after.faces['v1'] - before.faces['v1'], (1.0, 2.0, 3.0), atol=1e-5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+from bf2mesh import samples
+from bf2mesh.visiblemesh import VisibleMesh
+
+class test_samples_read_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_samples = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.samples'
+        self.path_mesh_lods = 'tests/samples/staticmesh/evil_box_lods/Meshes/evil_box_lods.staticmesh'
+
+    def test_can_read_header(self):
+        sample = samples.StdSample(self.path_samples)
+        self.assertEqual(sample.fourcc, b'SMP2')
+        self.assertEqual(sample.width, 256)
+        self.assertEqual(sample.height, 256)
+
+    def test_can_read_samples_and_faces(self):
+        sample = samples.StdSample(self.path_samples)
+        self.assertEqual(sample.datanum, 256 * 256)
+        self.assertEqual(sample.data.dtype, samples.SAMPLE)
+        self.assertEqual(len(sample.data), sample.datanum)
+        self.assertEqual(sample.facenum, 12)
+        self.assertEqual(sample.faces.dtype, samples.FACE)
+
+        # samples point to existing faces or none
+        self.assertTrue(np.all(sample.data['face'] < sample.facenum))
+        self.assertTrue(np.all(sample.data['face'] >= -1))
+        self.assertTrue(np.allclose(np.abs(sample.faces['n1']).sum(axis=1), 1.0))
+
+    def test_can_get_samples_filename(self):
+        self.assertEqual(samples.get_samples_filename('meshes/box.staticmesh'), 'meshes/box.samples')
+        self.assertEqual(samples.get_samples_filename('meshes/box.staticmesh', 1, 0), 'meshes/box.samp_10')
+        self.assertEqual(samples.get_samples_filename('meshes/box.staticmesh', 0, 1), 'meshes/box.samp_01')
+
+    def test_can_load_mesh_samples(self):
+        with VisibleMesh(self.path_mesh_lods) as vmesh:
+            self.assertEqual(samples.load_samples(vmesh), 2)
+            self.assertEqual(vmesh.geoms[0].lods[0].sample.width, 256)
+            self.assertEqual(vmesh.geoms[0].lods[1].sample.width, 128)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from bf2mesh import samples
+from bf2mesh.visiblemesh import VisibleMesh
+
+class test_samples_write_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_samples = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.samples'
+        self.path_save = 'tests/generated/staticmesh/write/evil_box/meshes/evil_box.samples'
+        self.path_mesh_dest = 'tests/samples/staticmesh/evil_box_dest/Meshes/evil_box_dest.staticmesh'
+        self.path_save_dest = 'tests/generated/staticmesh/write/evil_box_dest/meshes/evil_box_dest.staticmesh'
+
+    def test_can_write_same_bytes(self):
+        sample = samples.StdSample(self.path_samples)
+        sample.export(self.path_save)
+        with open(self.path_samples, 'rb') as original, open(self.path_save, 'rb') as saved:
+            self.assertEqual(original.read(), saved.read())
+        self.assertTrue(sample == samples.StdSample(self.path_save))
+
+    def test_can_export_mesh_samples(self):
+        with VisibleMesh(self.path_mesh_dest) as vmesh:
+            samples.load_samples(vmesh)
+            samples.export_samples(vmesh, self.path_save_dest)
+        for geomId in range(2):
+            original = samples.get_samples_filename(self.path_mesh_dest, geomId, 0)
+            saved = samples.get_samples_filename(self.path_save_dest, geomId, 0)
+            with open(original, 'rb') as fo_original, open(saved, 'rb') as fo_saved:
+                self.assertEqual(fo_original.read(), fo_saved.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
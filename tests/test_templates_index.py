@@ -0,0 +1,81 @@
+import os
+import shutil
+import unittest
+
+from bf2mesh import templates
+from bf2mesh.templates import TemplateIndex
+
+class test_templates_index_lookup(unittest.TestCase):
+
+    def setUp(self):
+        self.path_samples = 'tests/samples/staticmesh'
+        self.path_root = 'tests/generated/templates/objects'
+        self.path_cache = 'tests/generated/templates/cache/templates.json'
+        shutil.copytree(self.path_samples, self.path_root)
+        self.path_tweak = os.path.join(self.path_root, 'evil_box', 'evil_box.tweak')
+        with open(self.path_tweak, 'w') as fo:
+            fo.write('\n'.join([
+                'rem *** tweaks ***',
+                'ObjectTemplate.activeSafe SimpleObject evil_box',
+                'ObjectTemplate.addTemplate evil_box_lid',
+                'beginRem',
+                'ObjectTemplate.addTemplate evil_box_removed',
+                'endRem',
+                '',
+                'ObjectTemplate.create SimpleObject evil_box_lid',
+                'ObjectTemplate.addTemplate evil_box_dest',
+                ]))
+
+    def tearDown(self):
+        shutil.rmtree('tests/generated/templates')
+
+    def test_can_tokenize(self):
+        text = 'rem comment\nObjectTemplate.create SimpleObject evil_box\r\n  include evil_box.tweak\nbeginRem\nrun other\nendRem\n'
+        self.assertEqual(list(templates.tokenize(text)), [
+            ('objecttemplate.create', ['SimpleObject', 'evil_box']),
+            ('include', ['evil_box.tweak']),
+            ])
+
+    def test_can_find_templates(self):
+        index = TemplateIndex(self.path_root, self.path_cache)
+        self.assertEqual(index.get_object_path('Evil_Box'), os.path.join(self.path_root, 'evil_box/evil_box.con'))
+        self.assertEqual(index.get_object_path('evil_box_lid'), os.path.join(self.path_root, 'evil_box/evil_box.tweak'))
+        self.assertIsNone(index.get_object_path('evil_box_missing'))
+        self.assertEqual(index.get_template('evil_box_dest')['type'], 'DestroyableObject')
+        self.assertEqual(index.get_children('evil_box'), ['evil_box_lid'])
+        self.assertEqual(index.get_children('evil_box', recursive=True), ['evil_box_lid', 'evil_box_dest'])
+        self.assertEqual(index.get_mesh_path('evil_box'), os.path.join(self.path_root, 'evil_box', 'Meshes', 'evil_box.staticmesh'))
+        self.assertTrue(os.path.isfile(index.get_mesh_path('evil_box_dest')))
+        self.assertIsNone(index.get_mesh_path('evil_box_lid'))
+
+    def test_cache_updated_on_changes(self):
+        TemplateIndex(self.path_root, self.path_cache)
+        self.assertTrue(os.path.isfile(self.path_cache))
+        index = TemplateIndex(self.path_root, self.path_cache)
+        self.assertEqual(index.update(), {'added': 0, 'updated': 0, 'unchanged': 4, 'removed': 0})
+
+        with open(self.path_tweak, 'a') as fo:
+            fo.write('\nObjectTemplate.create SimpleObject evil_box_handle\n')
+        stat = os.stat(self.path_tweak)
+        os.utime(self.path_tweak, (stat.st_atime, stat.st_mtime + 1))
+        shutil.rmtree(os.path.join(self.path_root, 'evil_box_lods'))
+        index = TemplateIndex(self.path_root, self.path_cache)
+        self.assertEqual(index.update(), {'added': 0, 'updated': 0, 'unchanged': 3, 'removed': 0})
+        self.assertIsNotNone(index.get_object_path('evil_box_handle'))
+        self.assertIsNone(index.get_object_path('evil_box_lods'))
+
+        with open(self.path_cache) as fo:
+            cached = fo.read()
+        self.assertIn('evil_box_handle', cached)
+        self.assertNotIn('evil_box_lods', cached)
+
+    def test_broken_cache_ignored(self):
+        os.makedirs(os.path.dirname(self.path_cache))
+        for broken in ['{"version": 1', '{"version": 1}', '[1]']:
+            with open(self.path_cache, 'w') as fo:
+                fo.write(broken)
+            index = TemplateIndex(self.path_root, self.path_cache)
+            self.assertIsNotNone(index.get_object_path('evil_box'))
+
+if __name__ == '__main__':
+    unittest.main()
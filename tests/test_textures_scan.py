@@ -0,0 +1,62 @@
+import os
+import shutil
+import zipfile
+import unittest
+
+from bf2mesh import textures
+
+class test_textures_scan_static(unittest.TestCase):
+
+    def setUp(self):
+        self.path_samples = 'tests/samples/staticmesh'
+        self.path_mod = 'tests/generated/staticmesh/textures/mod'
+        self.path_objects = os.path.join(self.path_mod, 'objects/staticobjects/test')
+        self.path_archive = os.path.join(self.path_mod, 'common_client.zip')
+        if os.path.exists(self.path_mod): shutil.rmtree(self.path_mod)
+        shutil.copytree(self.path_samples, self.path_objects)
+        textures.list_directory.cache_clear()
+        textures.list_archive.cache_clear()
+
+        self.path_meshes = [
+            os.path.join(self.path_objects, 'evil_box/Meshes/evil_box.staticmesh'),
+            os.path.join(self.path_objects, 'evil_box_lods/Meshes/evil_box_lods.staticmesh'),
+            ]
+        self.texture = 'objects/staticobjects/test/evil_box/textures/evil_box_c.dds'
+        self.specular = 'common/textures/specularlut_pow36.dds'
+
+    def test_can_normalize_path(self):
+        self.assertEqual(textures.normalize_path(b'Common\\Textures\\SpecularLUT_pow36.dds'), self.specular)
+        self.assertEqual(textures.normalize_path('/Objects//./evil_box_c.DDS'), 'objects/evil_box_c.dds')
+
+    def test_can_read_maps(self):
+        self.assertEqual(textures.read_maps(self.path_meshes[1]), [self.specular, self.texture])
+
+    def test_can_scan_textures(self):
+        missing, references, errors = textures.scan_textures(self.path_meshes, [self.path_mod], workers=0)
+        self.assertEqual(references, {self.texture: self.path_meshes, self.specular: self.path_meshes})
+        self.assertEqual(list(missing), [self.specular])
+        self.assertEqual(errors, {})
+
+        # directory listing is cached until cleared
+        os.remove(os.path.join(self.path_objects, 'evil_box/textures/evil_box_c.dds'))
+        missing, references, errors = textures.scan_textures(self.path_meshes, [self.path_mod], workers=0)
+        self.assertEqual(list(missing), [self.specular])
+        textures.list_directory.cache_clear()
+        missing, references, errors = textures.scan_textures(self.path_meshes, [self.path_mod], workers=0)
+        self.assertEqual(sorted(missing), [self.specular, self.texture])
+
+        with zipfile.ZipFile(self.path_archive, 'w') as archive:
+            archive.writestr('Textures/SpecularLUT_pow36.dds', b'')
+        missing, references, errors = textures.scan_textures(self.path_meshes, [self.path_mod], [(self.path_archive, 'Common')], workers=0)
+        self.assertEqual(list(missing), [self.texture])
+
+    def test_broken_meshes_reported(self):
+        with open(self.path_meshes[1], 'r+b') as fo:
+            fo.truncate(100)
+        with self.assertLogs(level='WARNING'):
+            missing, references, errors = textures.scan_textures(self.path_meshes, [self.path_mod], workers=0)
+        self.assertEqual(list(errors), [self.path_meshes[1]])
+        self.assertEqual(references, {self.texture: self.path_meshes[:1], self.specular: self.path_meshes[:1]})
+
+if __name__ == '__main__':
+    unittest.main()
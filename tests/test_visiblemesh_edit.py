@@ -2,10 +2,13 @@ import unittest
 import struct
 import os
 
+import numpy as np
+
 from bf2mesh.bf2types import USED, UNUSED
 from bf2mesh.bf2types import D3DDECLTYPE, D3DDECLUSAGE
 import bf2mesh.visiblemesh
 from bf2mesh.visiblemesh import VisibleMesh
+from tests.shapes import bumped_grid, seamed_grid, set_surface
 
 class test_visiblemesh_edit_skinnedmesh_kits(unittest.TestCase):
 
@@ -163,3 +166,196 @@ class test_visiblemesh_edit_staticmesh(unittest.TestCase):
                 vmesh.export(path_export)
         self.skipTest(f'TODO, eyeball {path_export}')
 
+
+class test_visiblemesh_edit_cleanup(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+
+    def test_can_remove_degenerate_triangles(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            material = vmesh.geoms[0].lods[0].materials[0]
+            index = list(vmesh.index)
+            # repeated index, duplicate with permuted winding, zero area(0 and 13 share position)
+            index.extend([0, 0, 1])
+            index.extend([index[1], index[2], index[0]])
+            index.extend([0, 13, 1])
+            vmesh.index = tuple(index)
+            vmesh.indexnum = len(index)
+            material.inum = len(index)
+
+            removed = vmesh.remove_degenerate_triangles()
+
+            self.assertEqual(removed, 3)
+            self.assertEqual(material.istart, 0)
+            self.assertEqual(material.inum, 36)
+            self.assertEqual(vmesh.indexnum, 36)
+            self.assertEqual(vmesh.index, tuple(index[:36]))
+
+class test_visiblemesh_edit_generate_lods(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_export = 'tests/generated/staticmesh/edit/lods/evil_box/meshes/evil_box.staticmesh'
+
+    def test_can_generate_lods(self):
+        ratios = [0.5, 0.25]
+        with VisibleMesh(self.path_mesh) as vmesh:
+            set_surface(vmesh, *bumped_grid(4.0, 24))
+            vmesh.generate_lods(0, ratios=ratios)
+            vmesh.export(self.path_export)
+
+        with VisibleMesh(self.path_export) as vmesh:
+            geom = vmesh.geoms[0]
+            self.assertEqual(geom.lodnum, 3)
+            material0 = geom.lods[0].materials[0]
+            vstart, istart = 0, 0
+            for lod in geom.lods:
+                self.assertEqual(lod.matnum, 1)
+                material = lod.materials[0]
+                self.assertEqual(material.fxfile, material0.fxfile)
+                self.assertEqual(material.technique, material0.technique)
+                self.assertEqual(material.maps, material0.maps)
+                self.assertEqual(material.vstart, vstart)
+                self.assertEqual(material.istart, istart)
+                self.assertTrue(max(vmesh.index[material.istart:material.istart + material.inum]) < material.vnum)
+                vstart += material.vnum
+                istart += material.inum
+            self.assertEqual(vmesh.vertnum, vstart)
+            self.assertEqual(vmesh.indexnum, istart)
+
+            for lod, ratio in zip(geom.lods[1:], ratios):
+                self.assertLess(lod.materials[0].inum, material0.inum)
+                self.assertAlmostEqual(lod.materials[0].inum / material0.inum, ratio, delta=0.02)
+
+    def test_can_collapse_along_seams(self):
+        size = 4.0
+        with VisibleMesh(self.path_mesh) as vmesh:
+            set_surface(vmesh, *seamed_grid(size, 24))
+            vmesh.generate_lods(0, ratios=[0.25])
+            positions = vmesh.get_attribute_array(D3DDECLUSAGE.POSITION)
+            lod0, lod = vmesh.geoms[0].lods[0].materials[0], vmesh.geoms[0].lods[1].materials[0]
+            self.assertAlmostEqual(lod.inum / lod0.inum, 0.25, delta=0.02)
+            seam = np.abs(positions[lod.vstart:lod.vstart + lod.vnum, 0] - size / 2) < 1e-5
+            self.assertLess(seam.sum(), 2 * 25)
+
+            # seam copies moved together, welded lod has no open edges except grid border
+            faces = np.array(vmesh.index[lod.istart:lod.istart + lod.inum]).reshape(-1, 3) + lod.vstart
+            _, welded = np.unique(positions, axis=0, return_inverse=True)
+            faces = welded.ravel()[faces]
+            edges, counts = np.unique(np.sort(np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]]), axis=1), axis=0, return_counts=True)
+            _, inverse = np.unique(welded.ravel(), return_index=True)
+            border = positions[inverse][edges[counts == 1]]
+            self.assertTrue(np.all(np.any((np.abs(border[:, :, [0, 2]]) < 1e-5) | (np.abs(border[:, :, [0, 2]] - size) < 1e-5), axis=2)))
+            self.assertEqual(counts.max(), 2)
+
+    def test_warns_when_target_not_reached(self):
+        # every box vertex is corner of three uv islands
+        with VisibleMesh(self.path_mesh) as vmesh:
+            with self.assertLogs(level='WARNING'):
+                vmesh.generate_lods(0, ratios=[0.5])
+            self.assertEqual(vmesh.geoms[0].lods[1].materials[0].inum, vmesh.geoms[0].lods[0].materials[0].inum)
+
+class test_visiblemesh_edit_merge_materials(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+
+    def test_can_merge_same_materials(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            index_old = vmesh.index
+            # split box into two materials sharing vertices
+            lod = vmesh.geoms[0].lods[0]
+            material = lod.materials[0]
+            other_material = bf2mesh.visiblemesh._bf2mat()
+            other_material.__dict__.update(material.__dict__)
+            material.inum = other_material.istart = other_material.inum = 18
+            lod.materials.append(other_material)
+            lod.matnum = 2
+
+            self.assertEqual(vmesh.merge_materials(), [[1]])
+            self.assertEqual(lod.matnum, 1)
+            self.assertEqual(lod.materials[0].vnum, 50)
+            self.assertEqual(lod.materials[0].inum, 36)
+            self.assertEqual(vmesh.vertnum, 50)
+            self.assertEqual(vmesh.index, index_old[:18] + tuple(index + 25 for index in index_old[18:]))
+
+class test_visiblemesh_edit_attributes(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+        self.path_export = 'tests/generated/staticmesh/edit/attributes/evil_box/meshes/evil_box.staticmesh'
+
+    def test_can_remove_attributes(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            uv5_old = vmesh.get_attribute_array(D3DDECLUSAGE.UV5).copy()
+            tangent_old = vmesh.get_attribute_array(D3DDECLUSAGE.TANGENT).copy()
+
+            vmesh.remove_attributes(['UV3', D3DDECLUSAGE.UV4])
+            vmesh.export(self.path_export)
+
+        with VisibleMesh(self.path_export) as vmesh:
+            self.assertEqual(vmesh.vertattribnum, 8)
+            self.assertEqual(vmesh.vertstride, 64)
+            self.assertEqual(len(vmesh.vertices), 25 * 16)
+            self.assertIsNone(vmesh.get_attribute(D3DDECLUSAGE.UV3))
+            self.assertEqual(vmesh.get_attribute(D3DDECLUSAGE.UV5).offset, 44)
+            self.assertEqual(vmesh.get_attribute(D3DDECLUSAGE.TANGENT).offset, 52)
+            self.assertEqual(vmesh.vertex_attributes[-1].flag, UNUSED)
+            self.assertEqual(vmesh.get_attribute_array(D3DDECLUSAGE.UV5).tolist(), uv5_old.tolist())
+            self.assertEqual(vmesh.get_attribute_array(D3DDECLUSAGE.TANGENT).tolist(), tangent_old.tolist())
+
+    def test_can_add_attribute(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            vmesh.remove_attributes(['UV5'])
+            vmesh.add_attribute('UV5', D3DDECLTYPE.FLOAT2, (0.5, 0.25))
+
+            self.assertEqual(vmesh.vertstride, 80)
+            self.assertEqual(vmesh.get_attribute(D3DDECLUSAGE.UV5).offset, 72)
+            self.assertEqual(vmesh.vertex_attributes[-1].flag, UNUSED)
+            self.assertEqual(vmesh.get_attribute_array(D3DDECLUSAGE.UV5).tolist(), [[0.5, 0.25]] * 25)
+            self.assertRaises(AttributeError, vmesh.add_attribute, 'UV5', D3DDECLTYPE.FLOAT2)
+
+class test_visiblemesh_edit_normals(unittest.TestCase):
+
+    def setUp(self):
+        self.path_mesh = 'tests/samples/staticmesh/evil_box/Meshes/evil_box.staticmesh'
+
+    def test_can_recompute_normals(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            normals_old = vmesh.get_attribute_array(D3DDECLUSAGE.NORMAL).tolist()
+            vmesh.recompute_normals()
+            self.assertEqual(vmesh.get_attribute_array(D3DDECLUSAGE.NORMAL).tolist(), normals_old)
+
+            # box edges are 90 degrees, should stay flat shaded
+            vmesh.recompute_normals(smoothing_angle=45.0)
+            self.assertEqual(vmesh.get_attribute_array(D3DDECLUSAGE.NORMAL).tolist(), normals_old)
+
+            # smoothed over corners, vertex 18 is not indexed and keeps its normal
+            vmesh.recompute_normals(smoothing_angle=180.0)
+            normals = vmesh.get_attribute_array(D3DDECLUSAGE.NORMAL)
+            for vertId in set(vmesh.index):
+                self.assertTrue(all(abs(axis) > 0.3 for axis in normals[vertId]))
+            self.assertEqual(normals[18].tolist(), normals_old[18])
+
+    def test_vertices_array_stays_in_sync(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            vertices_old = vmesh.vertices
+            array = vmesh.get_vertices_array()
+            self.assertEqual(tuple(array.ravel().tolist()), vertices_old)
+            # returned arrays are copies, buffer changes only by set_vertices_array
+            array[:] = 0.0
+            self.assertEqual(vmesh.get_vertices_array().ravel().tolist(), list(vertices_old))
+            vmesh.set_vertices_array(array)
+            self.assertEqual(vmesh.vertices, (0.0, ) * len(vertices_old))
+            vmesh.vertices = vertices_old
+            self.assertEqual(vmesh.get_vertices_array().ravel().tolist(), list(vertices_old))
+
+    def test_can_recompute_tangents(self):
+        with VisibleMesh(self.path_mesh) as vmesh:
+            tangents_old = vmesh.get_attribute_array(D3DDECLUSAGE.TANGENT)
+            vmesh.recompute_tangents(uv='UV1')
+            tangents = vmesh.get_attribute_array(D3DDECLUSAGE.TANGENT)
+            for tangent, tangent_old in zip(tangents, tangents_old):
+                for axis, axis_old in zip(tangent, tangent_old):
+                    self.assertAlmostEqual(axis, axis_old, places=5)